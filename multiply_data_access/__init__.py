@@ -1,21 +1,85 @@
-from .data_access import DataSetMetaInfo, FileSystem, MetaInfoProvider
-from .data_set_meta_info_extraction import DataSetMetaInfoExtractor, add_data_set_meta_info_extractor, \
-    get_data_set_meta_info
-from .data_store import DataStore
-from .general_remote_access import HttpFileSystem, HttpFileSystemAccessor, HttpMetaInfoProvider, \
-    HttpMetaInfoProviderAccessor
-from .lpdaac_data_access import LpDaacFileSystem, LpDaacMetaInfoProvider
-from .aws_s2_file_system import AwsS2FileSystem, AwsS2FileSystemAccessor
-from .aws_s2_meta_info_provider import AwsS2MetaInfoProvider, AwsS2MetaInfoProviderAccessor
-from .registrations import create_file_system_from_dict, create_meta_info_provider_from_dict
-from .vrt_data_access import VrtFileSystem, VrtFileSystemAccessor, VrtMetaInfoProvider, VrtMetaInfoProviderAccessor
-from .mundi_data_access import LocallyWrappedMundiMetaInfoProvider, LocallyWrappedMundiMetaInfoProviderAccessor, \
-    MundiObsFileSystem, MundiObsFileSystemAccessor, MundiRestFileSystem, MundiRestFileSystemAccessor, \
-    MundiMetaInfoProvider, MundiMetaInfoProviderAccessor
-from .scihub_data_access import SciHubFileSystemAccessor, SciHubFileSystem, SciHubMetaInfoProviderAccessor, \
-    SciHubMetaInfoProvider
-from .data_access_component import DataAccessComponent
-from .json_meta_info_provider import JsonMetaInfoProvider
-from .local_file_system import LocalFileSystem
-from .locally_wrapped_data_access import LocallyWrappedFileSystem, LocallyWrappedMetaInfoProvider
+"""
+The modules of this package are imported on first access of one of their members, so that importing the package does
+not import the dependencies of all data stores. This requires Python 3.7 or later, on earlier versions all modules are
+imported with the package.
+"""
+from importlib import import_module
 from .version import __version__
+import sys
+
+_EXPORTS = {
+    'DataSetMetaInfo': 'data_access',
+    'FileSystem': 'data_access',
+    'MetaInfoProvider': 'data_access',
+    'Query': 'data_access',
+    'DataSetMetaInfoExtractor': 'data_set_meta_info_extraction',
+    'add_data_set_meta_info_extractor': 'data_set_meta_info_extraction',
+    'get_data_set_meta_info': 'data_set_meta_info_extraction',
+    'DataStore': 'data_store',
+    'HttpFileSystem': 'general_remote_access',
+    'HttpFileSystemAccessor': 'general_remote_access',
+    'HttpMetaInfoProvider': 'general_remote_access',
+    'HttpMetaInfoProviderAccessor': 'general_remote_access',
+    'LpDaacFileSystem': 'lpdaac_data_access',
+    'LpDaacMetaInfoProvider': 'lpdaac_data_access',
+    'AwsS2FileSystem': 'aws_s2_file_system',
+    'AwsS2FileSystemAccessor': 'aws_s2_file_system',
+    'AwsS2MetaInfoProvider': 'aws_s2_meta_info_provider',
+    'AwsS2MetaInfoProviderAccessor': 'aws_s2_meta_info_provider',
+    'create_file_system_from_dict': 'registrations',
+    'create_meta_info_provider_from_dict': 'registrations',
+    'VrtFileSystem': 'vrt_data_access',
+    'VrtFileSystemAccessor': 'vrt_data_access',
+    'VrtMetaInfoProvider': 'vrt_data_access',
+    'VrtMetaInfoProviderAccessor': 'vrt_data_access',
+    'LocallyWrappedMundiMetaInfoProvider': 'mundi_data_access',
+    'LocallyWrappedMundiMetaInfoProviderAccessor': 'mundi_data_access',
+    'MundiObsFileSystem': 'mundi_data_access',
+    'MundiObsFileSystemAccessor': 'mundi_data_access',
+    'MundiRestFileSystem': 'mundi_data_access',
+    'MundiRestFileSystemAccessor': 'mundi_data_access',
+    'MundiMetaInfoProvider': 'mundi_data_access',
+    'MundiMetaInfoProviderAccessor': 'mundi_data_access',
+    'SciHubFileSystemAccessor': 'scihub_data_access',
+    'SciHubFileSystem': 'scihub_data_access',
+    'SciHubMetaInfoProviderAccessor': 'scihub_data_access',
+    'SciHubMetaInfoProvider': 'scihub_data_access',
+    'DataAccessComponent': 'data_access_component',
+    'JsonMetaInfoProvider': 'json_meta_info_provider',
+    'SqliteMetaInfoProvider': 'sqlite_meta_info_provider',
+    'SqliteMetaInfoProviderAccessor': 'sqlite_meta_info_provider',
+    'QueryCache': 'query_cache',
+    'ExtractionCache': 'extraction_cache',
+    'LocalFileSystem': 'local_file_system',
+    'LocallyWrappedFileSystem': 'locally_wrapped_data_access',
+    'LocallyWrappedMetaInfoProvider': 'locally_wrapped_data_access',
+}
+
+__all__ = list(_EXPORTS.keys()) + ['__version__']
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(import_module('.' + _EXPORTS[name], __name__), name)
+    elif not name.startswith('_'):
+        # plugins are registered as attributes of submodules of this package, e.g., 'local_file_system.LocalFileSystem'
+        try:
+            value = import_module('.' + name, __name__)
+        except ModuleNotFoundError as e:
+            if e.name != '{}.{}'.format(__name__, name):
+                raise
+            raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name)) from None
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    # module level __getattr__ is only supported from Python 3.7 on (PEP 562)
+    for _name in _EXPORTS:
+        globals()[_name] = getattr(import_module('.' + _EXPORTS[_name], __name__), _name)
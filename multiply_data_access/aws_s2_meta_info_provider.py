@@ -8,8 +8,7 @@ from shapely.wkt import loads
 from shapely.geometry import Polygon
 import json
 import math
-import pkg_resources
-import requests
+import os
 
 __author__ = 'Tonio Fincke (Brockmann Consult GmbH),' \
              'José Luis Gómez-Dans (University College London)'
@@ -21,7 +20,7 @@ FIRST_DAY = '2016-02-01'
 
 TILE_LAT_IDENTIFIERS = \
     ['C', 'D', 'E', 'F', 'G', 'H', 'J', 'K', 'L', 'M', 'N', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X']
-PATH_TO_TILE_LOOKUP_TABLE = pkg_resources.resource_filename(__name__, 'tile_lookup_table.yaml')
+PATH_TO_TILE_LOOKUP_TABLE = os.path.join(os.path.dirname(__file__), 'tile_lookup_table.yaml')
 
 
 def _get_tile_stripes(min_lon: float, max_lon: float) -> List[int]:
@@ -78,15 +77,17 @@ class AwsS2MetaInfoProvider(LocallyWrappedMetaInfoProvider):
         if end_time is None:
             end_time = datetime.now()
         data_set_meta_infos = []
+        local_identity_keys = self._get_identity_keys(local_data_set_meta_infos)
         for tile_description in tile_descriptions:
             data_set_meta_infos_for_tile = self._get_data_set_meta_infos_for_tile_description(tile_description, start_time, end_time)
             for data_set_meta_info_for_tile in data_set_meta_infos_for_tile:
-                if not self._is_provided_locally(data_set_meta_info_for_tile, local_data_set_meta_infos):
+                if not self._is_provided_locally(data_set_meta_info_for_tile, local_identity_keys):
                     data_set_meta_infos.append(data_set_meta_info_for_tile)
         return data_set_meta_infos
 
     def _get_data_set_meta_infos_for_tile_description(self, tile_description: TileDescription, start_time: datetime,
                                                       end_time: datetime) -> List[DataSetMetaInfo]:
+        import requests
         data_set_meta_infos = []
         current_time = start_time
         while current_time < end_time:
@@ -5,35 +5,89 @@ Description
 
 This module contains the MULTIPLY data access API.
 """
-import pyproj
-
 from abc import ABCMeta, abstractmethod
+from functools import lru_cache
 from typing import List, Sequence, Optional
 from datetime import datetime
-from multiply_core.util import FileRef, are_times_equal, are_polygons_almost_equal, get_time_from_string, \
+from multiply_core.util import FileRef, are_polygons_almost_equal, get_time_from_string, \
     reproject_to_wgs84
 from multiply_core.observations import differs_by_name, get_relative_path
 from shapely.wkt import loads
 from shapely.geometry import Polygon
+from shapely.geometry.base import BaseGeometry
+from shapely.prepared import PreparedGeometry, prep
+import sys
 
 __author__ = 'Alexander Löw (Ludwig Maximilians-Universität München), ' \
              'Tonio Fincke (Brockmann Consult GmbH)'
 
 
+_NOT_PARSED = object()
+
+
+@lru_cache(maxsize=4096)
+def _load_geometry(coverage: str) -> Optional[BaseGeometry]:
+    geometry = loads(coverage)
+    if geometry.is_empty:
+        return None
+    return geometry
+
+
+def _get_ring_key(coordinates: Sequence[tuple]) -> tuple:
+    # rings are compared independently of their starting point and orientation
+    points = [tuple([round(value, 6) for value in coordinate]) for coordinate in coordinates]
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    if len(points) == 0:
+        return ()
+    start = points.index(min(points))
+    forward = points[start:] + points[:start]
+    backward = [forward[0]] + forward[:0:-1]
+    return tuple(min(forward, backward))
+
+
+def _get_coverage_key(geometry: BaseGeometry) -> tuple:
+    if geometry.geom_type == 'Polygon':
+        return geometry.geom_type, _get_ring_key(geometry.exterior.coords), \
+               tuple(sorted([_get_ring_key(interior.coords) for interior in geometry.interiors]))
+    if hasattr(geometry, 'geoms'):
+        return geometry.geom_type, tuple(sorted([_get_coverage_key(part) for part in geometry.geoms]))
+    return geometry.geom_type, tuple([tuple([round(value, 6) for value in coordinate])
+                                      for coordinate in geometry.coords])
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
 class DataSetMetaInfo(object):
     """
     A representation of meta information about a data set. To be retrieved from a query on a MetaInfoProvider or
     DataStore.
     """
 
+    __slots__ = ['_coverage', '_start_time', '_end_time', '_data_type', '_identifier', '_referenced_data',
+                 '_geometry', '_start_datetime', '_end_datetime', '_identity_key']
+
     def __init__(self, coverage: str, start_time: Optional[str], end_time: Optional[str], data_type: str,
                  identifier: str, referenced_data: Optional[str] = None):
-        self._coverage = coverage
+        self._coverage = _intern(coverage)
         self._start_time = start_time
         self._end_time = end_time
-        self._data_type = data_type
+        self._data_type = _intern(data_type)
         self._identifier = identifier
         self._referenced_data = referenced_data
+        self._geometry = _NOT_PARSED
+        self._start_datetime = _NOT_PARSED
+        self._end_datetime = _NOT_PARSED
+        self._identity_key = None
+
+    def __reduce__(self):
+        # the parsed state refers to a module level sentinel, so copies are created from the meta information only
+        return DataSetMetaInfo, (self._coverage, self._start_time, self._end_time, self._data_type, self._identifier,
+                                 self._referenced_data)
 
     def __repr__(self):
         return 'Data Set:\n' \
@@ -73,6 +127,57 @@ class DataSetMetaInfo(object):
         """A list of additional files that are referenced by this data set. Can be none."""
         return self._referenced_data
 
+    @property
+    def geometry(self) -> Optional[BaseGeometry]:
+        """The dataset's spatial coverage as shapely geometry. Parsed once, None if there is no or an empty coverage."""
+        if self._geometry is _NOT_PARSED:
+            self._geometry = None
+            if self._coverage is not None and self._coverage != '':
+                self._geometry = _load_geometry(self._coverage)
+        return self._geometry
+
+    @property
+    def bounds(self) -> Optional[tuple]:
+        """The bounds (min_x, min_y, max_x, max_y) of the dataset's spatial coverage. Can be none."""
+        if self.geometry is None:
+            return None
+        return self.geometry.bounds
+
+    @property
+    def start_datetime(self) -> Optional[datetime]:
+        """The dataset's start time as datetime. Parsed once, can be none."""
+        if self._start_datetime is _NOT_PARSED:
+            self._start_datetime = None
+            if self._start_time is not None and self._start_time != '':
+                self._start_datetime = get_time_from_string(self._start_time)
+        return self._start_datetime
+
+    @property
+    def end_datetime(self) -> Optional[datetime]:
+        """The dataset's end time as datetime. Parsed once, can be none."""
+        if self._end_datetime is _NOT_PARSED:
+            self._end_datetime = None
+            if self._end_time is not None and self._end_time != '':
+                self._end_datetime = get_time_from_string(self._end_time)
+        return self._end_datetime
+
+    @property
+    def identity_key(self) -> tuple:
+        """A hashable key which is the same for data set meta infos that are considered equal. It is built from the
+        normalized start and end times, the coordinates of the coverage rounded to six decimal places (independent of
+        the starting point and orientation of its rings), the data type and, if two different items of the data type
+        must always carry different names, the name and relative path.
+        Use it to de-duplicate data set meta infos with sets or dicts instead of comparing them pairwise."""
+        if self._identity_key is None:
+            name_key = None
+            if differs_by_name(self._data_type):
+                name_key = (self._identifier.split('/')[-1], get_relative_path(self._identifier, self._data_type))
+            coverage_key = None
+            if self.geometry is not None:
+                coverage_key = _get_coverage_key(self.geometry)
+            self._identity_key = (self.start_datetime, self.end_datetime, coverage_key, self._data_type, name_key)
+        return self._identity_key
+
     def equals(self, other: object) -> bool:
         """Checks whether two data set meta infos are equal. Does not check for referenced data sets. Only checks for
         the identifier if two different items must always carry different names."""
@@ -88,9 +193,95 @@ class DataSetMetaInfo(object):
         """Checks whether two data set meta infos are equal, except that they may have the same data type.
         Does not check the identifier or referenced data sets!"""
         return type(other) == DataSetMetaInfo and \
-            are_times_equal(self._start_time, other.start_time) and \
-            are_times_equal(self._end_time, other.end_time) and \
-            are_polygons_almost_equal(self.coverage, other.coverage)
+            self.start_datetime == other.start_datetime and \
+            self.end_datetime == other.end_datetime and \
+            (self._coverage is other.coverage or are_polygons_almost_equal(self._coverage, other.coverage))
+
+
+class Query(str):
+    """
+    A query string of the form 'roi;start_time;end_time;data_types[;roi_grid]' which parses its components only once.
+    As it is a string, it can be passed to any method expecting a query string. The static query string methods of the
+    MetaInfoProvider return the parsed components of a Query without parsing or reprojecting them again.
+    """
+
+    def __new__(cls, query_string: str):
+        query = super().__new__(cls, query_string)
+        query._parsed = {}
+        return query
+
+    def __setattr__(self, key, value):
+        if hasattr(self, '_parsed'):
+            raise AttributeError('Query is immutable')
+        super().__setattr__(key, value)
+
+    def __reduce__(self):
+        return Query, (str(self),)
+
+    def _get_parsed(self, component: str, parse):
+        if component not in self._parsed:
+            self._parsed[component] = parse(self)
+        return self._parsed[component]
+
+    @property
+    def roi(self) -> Optional[Polygon]:
+        """The region of interest in WGS 84. Can be none."""
+        return self._get_parsed('roi', _parse_roi)
+
+    @property
+    def prepared_roi(self) -> Optional[PreparedGeometry]:
+        """The prepared region of interest for fast repeated intersection tests. Can be none."""
+        return self._get_parsed('prepared_roi', lambda query: prep(query.roi) if query.roi is not None else None)
+
+    @property
+    def start_time(self) -> Optional[datetime]:
+        """The start time of the query. Can be none."""
+        return self._get_parsed('start_time', lambda query: get_time_from_string(query.split(';')[1], False))
+
+    @property
+    def end_time(self) -> Optional[datetime]:
+        """The end time of the query. Can be none."""
+        return self._get_parsed('end_time', lambda query: get_time_from_string(query.split(';')[2], True))
+
+    @property
+    def data_types(self) -> tuple:
+        """The queried data types in the order in which they are given."""
+        return self._get_parsed('data_types', _parse_data_types)
+
+    @property
+    def data_type_set(self) -> frozenset:
+        """The queried data types as set."""
+        return self._get_parsed('data_type_set', lambda query: frozenset(query.data_types))
+
+
+def _get_query(query_string: str) -> Query:
+    if isinstance(query_string, Query):
+        return query_string
+    return Query(query_string)
+
+
+def _parse_roi(query_string: str) -> Optional[Polygon]:
+    split_query_string = query_string.split(';')
+    roi_as_wkt = split_query_string[0]
+    if roi_as_wkt == '':
+        return None
+    if len(split_query_string) == 4:
+        roi = loads(roi_as_wkt)
+    else:
+        roi_grid = split_query_string[4]
+        roi = reproject_to_wgs84(roi_as_wkt, roi_grid)
+        roi = loads(roi)
+    # todo also allow MultiPolygons
+    if not isinstance(roi, Polygon):
+        raise ValueError('ROI must be a polygon')
+    return roi
+
+
+def _parse_data_types(query_string: str) -> tuple:
+    data_types = query_string.split(';')[3].split(',')
+    if len(data_types) == 1 and data_types[0] == '':
+        return ()
+    return tuple([data_type.strip() for data_type in data_types])
 
 
 class FileSystem(metaclass=ABCMeta):
@@ -129,9 +320,11 @@ class FileSystem(metaclass=ABCMeta):
         """
 
     @abstractmethod
-    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo) -> DataSetMetaInfo:
+    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo, put_mode: Optional[str] = None) \
+            -> DataSetMetaInfo:
         """Adds a data set to the file system by copying it from the given url to the expected location within
-        the file system. Returns an updated data set meta info."""
+        the file system. File systems may support other put modes than copying, such as 'move', 'hardlink', 'reflink',
+        or 'symlink'. Returns an updated data set meta info."""
 
     @abstractmethod
     def remove(self, data_set_meta_info: DataSetMetaInfo):
@@ -148,6 +341,13 @@ class FileSystem(metaclass=ABCMeta):
         :return:
         """
 
+    def get_max_concurrent_gets(self) -> Optional[int]:
+        """
+        :return: The maximum number of data sets that may be retrieved from this file system at the same time. None,
+        if the file system imposes no limit.
+        """
+        return None
+
 
 class FileSystemAccessor(metaclass=ABCMeta):
 
@@ -217,41 +417,25 @@ class MetaInfoProvider(metaclass=ABCMeta):
         :return: True if data of that type is encapsulated by one of the meta infor provider's provided data types.
         """
 
+    @staticmethod
+    def get_query_from_query_string(query_string: str) -> Query:
+        return _get_query(query_string)
+
     @staticmethod
     def get_roi_from_query_string(query_string: str) -> Optional[Polygon]:
-        split_query_string = query_string.split(';')
-        roi_as_wkt = split_query_string[0]
-        if roi_as_wkt == '':
-            return None
-        if len(split_query_string) == 4:
-            roi = loads(roi_as_wkt)
-        else:
-            roi_grid = split_query_string[4]
-            roi = reproject_to_wgs84(roi_as_wkt, roi_grid)
-            roi = loads(roi)
-        # todo also allow MultiPolygons
-        if not isinstance(roi, Polygon):
-            raise ValueError('ROI must be a polygon')
-        return roi
+        return _get_query(query_string).roi
 
     @staticmethod
     def get_start_time_from_query_string(query_string: str) -> Optional[datetime]:
-        start_time_as_string = query_string.split(';')[1]
-        return get_time_from_string(start_time_as_string, False)
+        return _get_query(query_string).start_time
 
     @staticmethod
     def get_end_time_from_query_string(query_string: str) -> Optional[datetime]:
-        end_time_as_string = query_string.split(';')[2]
-        return get_time_from_string(end_time_as_string, True)
+        return _get_query(query_string).end_time
 
     @staticmethod
     def get_data_types_from_query_string(query_string: str) -> List[str]:
-        data_types = query_string.split(';')[3].split(',')
-        if len(data_types) == 1 and data_types[0] == '':
-            return []
-        for i, data_type in enumerate(data_types):
-            data_types[i] = data_type.strip()
-        return data_types
+        return list(_get_query(query_string).data_types)
 
     def get_as_dict(self) -> dict:
         """
@@ -280,10 +464,22 @@ class MetaInfoProvider(metaclass=ABCMeta):
     def update(self, data_set_meta_info: DataSetMetaInfo):
         """Adds information about the data set to its internal registry."""
 
+    def update_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        """Adds information about the data sets to its internal registry. Implementations should override this to
+        register all data sets at once."""
+        for data_set_meta_info in data_set_meta_infos:
+            self.update(data_set_meta_info)
+
     @abstractmethod
     def remove(self, data_set_meta_info: DataSetMetaInfo):
         """Removes information about this data set from its internal registry."""
 
+    def remove_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        """Removes information about the data sets from its internal registry. Implementations should override this
+        to remove all data sets at once."""
+        for data_set_meta_info in data_set_meta_infos:
+            self.remove(data_set_meta_info)
+
     @abstractmethod
     def get_all_data(self) -> Sequence[DataSetMetaInfo]:
         """Returns all available data set meta infos."""
@@ -1,26 +1,46 @@
 from multiply_core.observations import get_valid_type, INPUT_TYPES
-from multiply_data_access import DataSetMetaInfo, DataStore, create_file_system_from_dict, \
+from multiply_data_access import DataSetMetaInfo, DataStore, Query, create_file_system_from_dict, \
     create_meta_info_provider_from_dict
+from .data_store import LazyDataStore
 from .json_meta_info_provider import JsonMetaInfoProvider
 from .local_file_system import LocalFileSystem
+from collections import deque, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from multiply_core.util import FileRef
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import hashlib
 import logging
 import os
 import json
-import pkg_resources
+import threading
+import time
 import yaml
 
 MULTIPLY_DIR_NAME = '.multiply'
 DATA_STORES_FILE_NAME = 'data_stores.yml'
+DATA_STORE_TYPES_FILE_NAME = 'data_store_types.json'
 DATA_FOLDER_NAME = 'data'
-PATH_TO_DEFAULT_DATA_STORES_FILE = pkg_resources.resource_filename(__name__, 'default_data_stores.yaml')
+PATH_TO_DEFAULT_DATA_STORES_FILE = os.path.join(os.path.dirname(__file__), 'default_data_stores.yaml')
+DEFAULT_MAX_QUERY_WORKERS = 8
+DEFAULT_QUERY_TIMEOUT = 300.
+DEFAULT_MAX_DOWNLOAD_WORKERS = 8
+DEFAULT_MAX_DOWNLOADS_PER_DATA_STORE = 4
 
 logger = logging.getLogger('ComponentProgress')
 logger.setLevel(logging.INFO)
 logging.getLogger().setLevel(logging.INFO)
 
 
+def _get_data_store_key(data_store_as_dict: dict) -> str:
+    """
+    :param data_store_as_dict: The description of a data store, as given in the data stores file
+    :return: A key which changes whenever any parameter of the data store description changes
+    """
+    data_store_as_json = json.dumps(data_store_as_dict, sort_keys=True, default=str)
+    return hashlib.sha256(data_store_as_json.encode('utf-8')).hexdigest()
+
+
 def _build_query_string(roi: str, start_time: str, end_time: str, data_types: str,
                         roi_grid: Optional[str] = 'EPSG:4326') -> str:
     """
@@ -42,8 +62,28 @@ class DataAccessComponent(object):
     and decides which data is used from which data store.
     """
 
-    def __init__(self):
+    def __init__(self, max_query_workers: int = DEFAULT_MAX_QUERY_WORKERS,
+                 query_timeout: Optional[float] = DEFAULT_QUERY_TIMEOUT,
+                 max_download_workers: int = DEFAULT_MAX_DOWNLOAD_WORKERS,
+                 max_downloads_per_data_store: int = DEFAULT_MAX_DOWNLOADS_PER_DATA_STORE):
+        """
+        :param max_query_workers: The maximum number of data store queries that are run concurrently.
+        :param query_timeout: The number of seconds after which the results of a data store which has not answered a
+        query are dismissed. If None, queries do not time out. This is a soft limit: queries which have not started
+        by then are cancelled, but queries which are already running cannot be interrupted and run to their end in the
+        background. They keep occupying one of the max_query_workers until then.
+        :param max_download_workers: The maximum number of data sets that are retrieved concurrently.
+        :param max_downloads_per_data_store: The maximum number of data sets that are retrieved concurrently from a
+        single data store.
+        """
         self._data_stores = []
+        self._max_query_workers = max_query_workers
+        self._query_timeout = query_timeout
+        self._query_executor = None
+        self._query_executor_lock = threading.Lock()
+        self._max_download_workers = max_download_workers
+        self._max_downloads_per_data_store = max_downloads_per_data_store
+        self._data_store_types_lock = threading.Lock()
         self._read_registered_data_stores()
 
     def update(self):
@@ -58,7 +98,7 @@ class DataAccessComponent(object):
             print(data_store)
 
     @classmethod
-    def _get_query_strings(cls, roi: str, start_time: str, end_time: str, data_types: str, roi_grid) -> List[str]:
+    def _get_query_strings(cls, roi: str, start_time: str, end_time: str, data_types: str, roi_grid) -> List[Query]:
         query_strings = []
         data_types = data_types.rstrip().replace(' ', '')
         for data_model_type in INPUT_TYPES:
@@ -67,13 +107,13 @@ class DataAccessComponent(object):
                 unprocessed_model_data_types = ",".join(INPUT_TYPES[data_model_type]['unprocessed'])
                 preprocessed_model_data_types = ",".join(INPUT_TYPES[data_model_type]['preprocessed'])
                 query_strings.append(
-                    _build_query_string(roi, start_time, end_time, unprocessed_model_data_types, roi_grid))
+                    Query(_build_query_string(roi, start_time, end_time, unprocessed_model_data_types, roi_grid)))
                 query_strings.append(
-                    _build_query_string(roi, start_time, end_time, preprocessed_model_data_types, roi_grid))
+                    Query(_build_query_string(roi, start_time, end_time, preprocessed_model_data_types, roi_grid)))
         while ',,' in data_types:
             data_types = data_types.replace(',,', ',')
         if data_types != ',' and data_types != '':
-            query_strings.append(_build_query_string(roi, start_time, end_time, data_types, roi_grid))
+            query_strings.append(Query(_build_query_string(roi, start_time, end_time, data_types, roi_grid)))
         return query_strings
 
     def query(self, roi: str, start_time: str, end_time: str, data_types: str, roi_grid: str = 'EPSG:4326') \
@@ -88,20 +128,16 @@ class DataAccessComponent(object):
         :param roi_grid: The EPSG code of the spatial reference system in which the roi is given. Default is WGS 84.
         :return: A list of DataSetMetaInfos that meet the conditions of the query.
         """
-        query_strings = self._get_query_strings(roi, start_time, end_time, data_types, roi_grid)
+        query_plan = self.get_query_plan(roi, start_time, end_time, data_types, roi_grid)
         meta_data_infos = []
-        for i, query_string in enumerate(query_strings):
+        for i, (query_string, data_stores) in enumerate(query_plan):
             query_meta_data_infos = []
-            for data_store in self._data_stores:
-                local_query_results = data_store.query_local(query_string)
-                for local_query_result in local_query_results:
-                    if not self._is_already_included(local_query_result, query_meta_data_infos):
-                        query_meta_data_infos.append(local_query_result)
-            for data_store in self._data_stores:
-                non_local_query_results = data_store.query_non_local(query_string)
-                for non_local_query_result in non_local_query_results:
-                    if not self._is_already_included(non_local_query_result, query_meta_data_infos):
-                        query_meta_data_infos.append(non_local_query_result)
+            included_keys = set()
+            for data_store, query_results in self._query_data_stores(query_string, data_stores):
+                for query_result in query_results:
+                    if not self._is_already_included(query_result, included_keys):
+                        query_meta_data_infos.append(query_result)
+                        included_keys.add(query_result.identity_key)
             meta_data_infos.append(query_meta_data_infos)
             if (i + 1) % 2 == 0:
                 for meta_data_on_preprocessed in meta_data_infos[i]:
@@ -114,12 +150,105 @@ class DataAccessComponent(object):
             result += meta_data_info_list
         return result
 
+    def get_query_plan(self, roi: str, start_time: str, end_time: str, data_types: str,
+                       roi_grid: str = 'EPSG:4326') -> List[Tuple[Query, List[DataStore]]]:
+        """
+        Determines how a query is distributed on the registered data stores. The query is split up into one query
+        per group of data types, each of which is only sent to the data stores which provide or encapsulate at least
+        one of its data types.
+        :param roi: The region of interest, given in the form of a wkt-string.
+        :param start_time: The start time of the query, given as a string in UTC time format
+        :param end_time: The end time of the query, given as a string in UTC time format
+        :param data_types: A list of data types to be queried for.
+        :param roi_grid: The EPSG code of the spatial reference system in which the roi is given. Default is WGS 84.
+        :return: A list of tuples of the queries and the data stores they are sent to, in the order of registration.
+        """
+        queries = self._get_query_strings(roi, start_time, end_time, data_types, roi_grid)
+        queried_data_types = set()
+        for query in queries:
+            queried_data_types.update(query.data_types)
+        data_stores_by_data_type = self._get_data_stores_by_data_type(queried_data_types)
+        query_plan = []
+        for query in queries:
+            eligible_data_stores = set()
+            for data_type in query.data_types:
+                eligible_data_stores.update(data_stores_by_data_type[data_type])
+            query_plan.append((query, [data_store for data_store in self._data_stores
+                                       if data_store in eligible_data_stores]))
+        return query_plan
+
+    def _get_data_stores_by_data_type(self, data_types: Set[str]) -> Dict[str, List[DataStore]]:
+        data_stores_by_data_type = dict([(data_type, []) for data_type in data_types])
+        for data_store in self._data_stores:
+            try:
+                if isinstance(data_store, LazyDataStore):
+                    # creates the data store only if its data types are neither declared nor cached
+                    data_store.determine_data_types(sorted(data_types))
+                provided_data_types = set(data_store.get_provided_data_types())
+                for data_type in data_types:
+                    if data_type in provided_data_types or data_store.encapsulates_data_type(data_type):
+                        data_stores_by_data_type[data_type].append(data_store)
+            except Exception as e:
+                logging.warning('Could not determine data types of data store {}: {}'.format(data_store.id, e))
+        return data_stores_by_data_type
+
+    def _query_data_stores(self, query_string: str, data_stores: List[DataStore]) \
+            -> List[Tuple[DataStore, List[DataSetMetaInfo]]]:
+        """
+        Queries data stores concurrently, first for data that is locally available, then for data that must be
+        downloaded. A data store which fails or does not answer within the query timeout contributes no results.
+        :param query_string: The query string
+        :param data_stores: The data stores to be queried
+        :return: A list of tuples of data stores and their query results. The list is ordered by data store, the
+        results of all local queries come before the results of the non-local queries.
+        """
+        if len(data_stores) == 0:
+            return []
+        queries = [(data_store, data_store.query_local) for data_store in data_stores] + \
+                  [(data_store, data_store.query_non_local) for data_store in data_stores]
+        executor = self._get_query_executor()
+        futures = [executor.submit(query, query_string) for data_store, query in queries]
+        try:
+            deadline = None if self._query_timeout is None else time.monotonic() + self._query_timeout
+            results = []
+            for (data_store, query), future in zip(queries, futures):
+                timeout = None if deadline is None else max(0., deadline - time.monotonic())
+                try:
+                    results.append((data_store, future.result(timeout=timeout)))
+                except TimeoutError:
+                    logging.warning('Data store {} did not answer query {} within {} seconds'.
+                                    format(data_store.id, query.__name__, self._query_timeout))
+                    results.append((data_store, []))
+                except Exception as e:
+                    logging.warning('Data store {} failed to answer query {}: {}'.
+                                    format(data_store.id, query.__name__, e))
+                    results.append((data_store, []))
+            return results
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _get_query_executor(self) -> ThreadPoolExecutor:
+        # the executor is shared by all queries, so that queries which have timed out and are still running cannot
+        # accumulate beyond the maximum number of query workers
+        with self._query_executor_lock:
+            if self._query_executor is None:
+                self._query_executor = ThreadPoolExecutor(max_workers=self._max_query_workers)
+            return self._query_executor
+
+    def close(self):
+        """
+        Shuts down the threads which query the data stores. Queries which are still running are not waited for. If the
+        data access component is used afterwards, new threads are started.
+        """
+        with self._query_executor_lock:
+            if self._query_executor is not None:
+                self._query_executor.shutdown(wait=False)
+                self._query_executor = None
+
     @staticmethod
-    def _is_already_included(data_set_meta_info: DataSetMetaInfo, data_set_meta_infos: List[DataSetMetaInfo]) -> bool:
-        for provided_data_set_meta_info in data_set_meta_infos:
-            if provided_data_set_meta_info.equals(data_set_meta_info):
-                return True
-        return False
+    def _is_already_included(data_set_meta_info: DataSetMetaInfo, included_keys: Set[tuple]) -> bool:
+        return data_set_meta_info.identity_key in included_keys
 
     def can_put(self, data_type: str) -> bool:
         """
@@ -131,7 +260,7 @@ class DataAccessComponent(object):
                 return True
         return False
 
-    def put(self, path: str, data_store_id: Optional[str] = None) -> None:
+    def put(self, path: str, data_store_id: Optional[str] = None, put_mode: Optional[str] = None) -> None:
         """
         Puts data into the data access component. If the id to a data store is provided, the data access component
         will attempt to put the data into the store. If data cannot be added to that particular store, it will not be
@@ -139,31 +268,64 @@ class DataAccessComponent(object):
         try to determine an apt data store. A data store is considered apt if it already holds data of the same type.
         :param path: A path to the data that shall be added to the Data Access Component.
         :param data_store_id: The id of a data store. Can be None.
+        :param put_mode: How the data is put into the data store. One of 'copy', 'move', 'hardlink', 'reflink', and
+        'symlink'. If None, the put mode configured for the data store is used, which is 'copy' by default.
         """
         data_type = get_valid_type(path)
-        if data_type is '':
+        if data_type == '':
             logging.info('Could not determine data type of data at {}. Will not add it to Data Access Component.'
                          .format(path))
             return
+        data_store = self._get_data_store_to_put(path, data_type, data_store_id)
+        if data_store is not None:
+            data_store.put(path, put_mode=put_mode)
+            if data_store_id is None:
+                logging.info('Added data to data store {}.'.format(data_store.id))
+
+    def put_many(self, paths: Sequence[str], data_store_id: Optional[str] = None, put_mode: Optional[str] = None) \
+            -> None:
+        """
+        Puts many data sets into the data access component, as described for put. The meta information of the data
+        sets is extracted in parallel.
+        :param paths: The paths to the data that shall be added to the Data Access Component.
+        :param data_store_id: The id of a data store. Can be None.
+        :param put_mode: How the data is put into the data store. One of 'copy', 'move', 'hardlink', 'reflink', and
+        'symlink'. If None, the put mode configured for the data store is used, which is 'copy' by default.
+        """
+        paths_per_data_store = {}
+        for path in paths:
+            data_type = get_valid_type(path)
+            if data_type == '':
+                logging.info('Could not determine data type of data at {}. Will not add it to Data Access Component.'
+                             .format(path))
+                continue
+            data_store = self._get_data_store_to_put(path, data_type, data_store_id)
+            if data_store is not None:
+                if data_store.id not in paths_per_data_store:
+                    paths_per_data_store[data_store.id] = (data_store, [])
+                paths_per_data_store[data_store.id][1].append(path)
+        for data_store, data_store_paths in paths_per_data_store.values():
+            data_set_meta_infos = data_store.put_many(data_store_paths, put_mode=put_mode)
+            logging.info('Added {} data sets to data store {}.'.format(len(data_set_meta_infos), data_store.id))
+
+    def _get_data_store_to_put(self, path: str, data_type: str, data_store_id: Optional[str]) -> Optional[DataStore]:
         for data_store in self._data_stores:
             if data_store_id is not None and data_store.id == data_store_id:
                 if not data_store.provides_data_type(data_type):
                     logging.info(
                         'Data Store {} is not apt for data of type {}. Will not add it to Data Access Component.'
                             .format(data_store_id, data_type))
-                    return
+                    return None
                 elif not data_store.can_put():
                     logging.info('Cannot put data into data store {}. Will not add it to Data Access Component.'.
                                  format(data_store.id))
-                data_store.put(path)
-                return
+                return data_store
             elif data_store_id is None:
                 if data_store.provides_data_type(data_type) and data_store.can_put():
-                    data_store.put(path)
-                    logging.info('Added data to data store {}.'.format(data_store.id))
-                    return
+                    return data_store
         logging.info('Could not determine apt data store for data at {}. Did not add to Data Access Component.'.
                      format(path))
+        return None
 
     def get_provided_data_types(self) -> List[str]:
         """
@@ -177,38 +339,56 @@ class DataAccessComponent(object):
                     provided_types.append(provided_data_type)
         return provided_types
 
-    def get_data_urls(self, roi: str, start_time: str, end_time: str, data_types: str, roi_grid: str = 'EPSG:4326') \
-            -> List[str]:
+    def get_data_urls(self, roi: str, start_time: str, end_time: str, data_types: str, roi_grid: str = 'EPSG:4326',
+                      download_failures: Optional[List[Tuple[DataSetMetaInfo, Exception]]] = None) -> List[str]:
         """
         Builds a query from the given parameters and asks all data stores whether they contain data that match the
         query. If datasets are found, url's to their positions are returned.
+        :param download_failures: If given, the data sets which could not be retrieved are appended to this list,
+        together with the errors.
         :return: a list of url's to locally stored files that match the conditions given by the query in the parameter.
         """
-        query_strings = self._get_query_strings(roi, start_time, end_time, data_types, roi_grid)
+        gets = self._get_data_store_gets(roi, start_time, end_time, data_types, roi_grid)
         urls = []
+        for file_refs in self._get_file_refs(gets, download_failures):
+            for file_ref in file_refs:
+                urls.append(file_ref.url)
+        return urls
+
+    def iter_data_urls(self, roi: str, start_time: str, end_time: str, data_types: str, roi_grid: str = 'EPSG:4326',
+                       download_failures: Optional[List[Tuple[DataSetMetaInfo, Exception]]] = None) \
+            -> Iterator[Tuple[str, DataSetMetaInfo]]:
+        """
+        Builds a query from the given parameters and asks all data stores whether they contain data that match the
+        query. If datasets are found, they are retrieved in the background, while the url's to their positions are
+        yielded as soon as they become available. Data sets which are already locally available are retrieved first.
+        :return: An iterator over tuples of url's to locally stored files that match the conditions given by the query
+        in the parameter and the data set meta infos of the data sets they belong to, in the order in which the data
+        sets have been retrieved.
+        :param download_failures: If given, the data sets which could not be retrieved are appended to this list,
+        together with the errors, while iterating.
+        """
+        gets = self._get_data_store_gets(roi, start_time, end_time, data_types, roi_grid)
+        for index, file_refs in self._iter_file_refs(gets, download_failures):
+            for file_ref in file_refs:
+                yield file_ref.url, gets[index][1]
+
+    def _get_data_store_gets(self, roi: str, start_time: str, end_time: str, data_types: str, roi_grid: str) \
+            -> List[Tuple[DataStore, DataSetMetaInfo]]:
+        query_plan = self.get_query_plan(roi, start_time, end_time, data_types, roi_grid)
         data_store_query_results = {}
-        num_query_results = 0
         all_query_results = []
-        for i, query_string in enumerate(query_strings):
+        for i, (query_string, data_stores) in enumerate(query_plan):
             query_results = []
-            for data_store in self._data_stores:
-                local_query_results = data_store.query_local(query_string)
-                for local_query_result in local_query_results:
-                    if not self._is_already_included(local_query_result, query_results):
-                        if data_store.id not in data_store_query_results:
-                            data_store_query_results[data_store.id] = []
-                        data_store_query_results[data_store.id].append(local_query_result)
-                        num_query_results += 1.0
-                        query_results.append(local_query_result)
-            for data_store in self._data_stores:
-                non_local_query_results = data_store.query_non_local(query_string)
-                for non_local_query_result in non_local_query_results:
-                    if not self._is_already_included(non_local_query_result, query_results):
+            included_keys = set()
+            for data_store, data_store_results in self._query_data_stores(query_string, data_stores):
+                for query_result in data_store_results:
+                    if not self._is_already_included(query_result, included_keys):
                         if data_store.id not in data_store_query_results:
                             data_store_query_results[data_store.id] = []
-                        data_store_query_results[data_store.id].append(non_local_query_result)
-                        num_query_results += 1.0
-                        query_results.append(non_local_query_result)
+                        data_store_query_results[data_store.id].append(query_result)
+                        query_results.append(query_result)
+                        included_keys.add(query_result.identity_key)
             all_query_results.append(query_results)
             if (i + 1) % 2 == 0:
                 for meta_data_on_preprocessed in all_query_results[i]:
@@ -218,39 +398,123 @@ class DataAccessComponent(object):
                             for data_store_id in data_store_query_results:
                                 if meta_data_on_unprocessed in data_store_query_results[data_store_id]:
                                     data_store_query_results[data_store_id].remove(meta_data_on_unprocessed)
-                                    num_query_results -= 1.0
                                     break
                             break
-        count = 0.0
+        gets = []
         for data_store in self._data_stores:
             if data_store.id in data_store_query_results:
                 for query_result in data_store_query_results[data_store.id]:
-                    logger.info(f'{int((count/num_query_results) * 100)}')
-                    file_refs = data_store.get(query_result)
-                    for file_ref in file_refs:
-                        urls.append(file_ref.url)
-                    count += 1.0
-        return urls
+                    gets.append((data_store, query_result))
+        return gets
 
-    def get_data_urls_from_data_set_meta_infos(self, data_set_meta_infos: List[DataSetMetaInfo]) -> List[str]:
+    def get_data_urls_from_data_set_meta_infos(self, data_set_meta_infos: List[DataSetMetaInfo],
+                                               download_failures: Optional[List[Tuple[DataSetMetaInfo, Exception]]] =
+                                               None) -> List[str]:
         """
         Builds a query from the given parameters and asks all data stores whether they contain data that match the
         query. If datasets are found, url's to their positions are returned.
+        :param download_failures: If given, the data sets which could not be retrieved are appended to this list,
+        together with the errors.
         :return: a list of url's to locally stored files that match the conditions given by the query in the parameter.
         """
         urls = []
-        count = 0.0
-        num_query_results = float(len(data_set_meta_infos))
+        gets = []
         for data_store in self._data_stores:
             for data_set_meta_info in data_set_meta_infos:
                 if data_store.provides_data_type(data_set_meta_info.data_type):
-                    logger.info(f'{int((count/num_query_results) * 100)}')
-                    file_refs = data_store.get(data_set_meta_info)
-                    for file_ref in file_refs:
-                        urls.append(file_ref.url)
-                    count += 1.0
+                    gets.append((data_store, data_set_meta_info))
+        for file_refs in self._get_file_refs(gets, download_failures):
+            for file_ref in file_refs:
+                urls.append(file_ref.url)
         return urls
 
+    def _get_file_refs(self, gets: List[Tuple[DataStore, DataSetMetaInfo]],
+                       download_failures: Optional[List[Tuple[DataSetMetaInfo, Exception]]] = None) \
+            -> List[Sequence[FileRef]]:
+        """
+        Retrieves data sets from data stores concurrently, as described for _iter_file_refs.
+        :param gets: A list of tuples of data stores and the data sets to retrieve from them.
+        :param download_failures: If given, the data sets which could not be retrieved are appended to this list,
+        together with the errors.
+        :return: A list of the retrieved file refs for each of the gets, in the order of the gets. The list is empty
+        for data sets that could not be retrieved.
+        """
+        file_refs = [[] for _ in gets]
+        for index, file_refs_of_get in self._iter_file_refs(gets, download_failures):
+            file_refs[index] = file_refs_of_get
+        return file_refs
+
+    def _iter_file_refs(self, gets: List[Tuple[DataStore, DataSetMetaInfo]],
+                        download_failures: Optional[List[Tuple[DataSetMetaInfo, Exception]]] = None) \
+            -> Iterator[Tuple[int, Sequence[FileRef]]]:
+        """
+        Retrieves data sets from data stores concurrently. At most max_download_workers data sets are retrieved at the
+        same time and at most max_downloads_per_data_store from any single data store, or fewer if the data store
+        itself imposes a lower limit. Failures are logged and collected instead of aborting the retrieval of the other
+        data sets.
+        :param gets: A list of tuples of data stores and the data sets to retrieve from them.
+        :param download_failures: If given, the data sets which could not be retrieved are appended to this list,
+        together with the errors.
+        :return: An iterator over tuples of the indexes of the gets and the retrieved file refs, in the order in which
+        the retrievals complete. Data sets that could not be retrieved are left out.
+        """
+        if len(gets) == 0:
+            return
+        num_failures = 0
+        pending = OrderedDict()
+        for index, (data_store, data_set_meta_info) in enumerate(gets):
+            if data_store not in pending:
+                pending[data_store] = deque()
+            pending[data_store].append((index, data_set_meta_info))
+        max_gets_per_data_store = {}
+        for data_store in pending:
+            max_gets_per_data_store[data_store] = self._max_downloads_per_data_store
+            if data_store.get_max_concurrent_gets() is not None:
+                max_gets_per_data_store[data_store] = min(self._max_downloads_per_data_store,
+                                                          data_store.get_max_concurrent_gets())
+        num_running_per_data_store = dict([(data_store, 0) for data_store in pending])
+        running = {}
+        count = 0.0
+        executor = ThreadPoolExecutor(max_workers=self._max_download_workers)
+
+        def submit_pending_gets():
+            for pending_data_store in list(pending.keys()):
+                while len(pending[pending_data_store]) > 0 and len(running) < self._max_download_workers and \
+                        num_running_per_data_store[pending_data_store] < max_gets_per_data_store[pending_data_store]:
+                    pending_index, pending_data_set_meta_info = pending[pending_data_store].popleft()
+                    future = executor.submit(pending_data_store.get, pending_data_set_meta_info)
+                    running[future] = (pending_index, pending_data_store, pending_data_set_meta_info)
+                    num_running_per_data_store[pending_data_store] += 1
+                if len(pending[pending_data_store]) == 0:
+                    del pending[pending_data_store]
+
+        try:
+            submit_pending_gets()
+            while len(running) > 0:
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                completed = []
+                for future in done:
+                    index, data_store, data_set_meta_info = running.pop(future)
+                    num_running_per_data_store[data_store] -= 1
+                    count += 1.0
+                    logger.info(f'{int((count / len(gets)) * 100)}')
+                    try:
+                        completed.append((index, future.result()))
+                    except Exception as e:
+                        logging.warning('Could not retrieve {} from data store {}: {}'.
+                                        format(data_set_meta_info.identifier, data_store.id, e))
+                        num_failures += 1
+                        if download_failures is not None:
+                            download_failures.append((data_set_meta_info, e))
+                # keep retrieving in the background while the completed file refs are processed
+                submit_pending_gets()
+                for index, file_refs in completed:
+                    yield index, file_refs
+        finally:
+            executor.shutdown(wait=True)
+        if num_failures > 0:
+            logging.warning('{} of {} data sets could not be retrieved'.format(num_failures, len(gets)))
+
     def _read_registered_data_stores(self) -> None:
         data_stores_file = self._get_default_data_stores_file()
         self._read_data_stores(data_stores_file)
@@ -307,6 +571,7 @@ class DataAccessComponent(object):
         data_store_lists = yaml.safe_load(stream)
         if data_store_lists is None:
             return data_stores
+        data_store_types = self._read_data_store_types()
         for index, data_store_entry in enumerate(data_store_lists):
             if 'DataStore' not in data_store_entry.keys():
                 raise UserWarning('Cannot read DataStore')
@@ -314,18 +579,73 @@ class DataAccessComponent(object):
                 raise UserWarning('DataStore is missing FileSystem: Cannot read DataStore')
             if 'MetaInfoProvider' not in data_store_entry['DataStore'].keys():
                 raise UserWarning('DataStore is missing MetaInfoProvider: Cannot read DataStore')
-            file_system = create_file_system_from_dict(data_store_entry['DataStore']['FileSystem'])
-            meta_info_provider = create_meta_info_provider_from_dict(data_store_entry['DataStore']['MetaInfoProvider'])
             if 'Id' in data_store_entry['DataStore'].keys():
                 id = data_store_entry['DataStore']['Id']
             else:
                 id = index
-            data_store = DataStore(file_system, meta_info_provider, id)
+            data_store = self._create_lazy_data_store(data_store_entry['DataStore'], id, data_store_types)
             data_stores.append(data_store)
             logging.info('Read data store {}'.format(data_store.id))
         self._data_stores = self._data_stores + data_stores
         return data_stores
 
+    def _create_lazy_data_store(self, data_store_as_dict: dict, id: str, data_store_types: dict) -> LazyDataStore:
+        """
+        Creates a data store which is only set up when it is needed. The data types it provides or encapsulates may be
+        declared in the entries 'ProvidedDataTypes' and 'EncapsulatedDataTypes' of the data store description.
+        Otherwise, they are taken from the data store types cache, if it holds them for an identical description.
+        """
+        provided_data_types = None
+        encapsulated_data_types = None
+        all_encapsulated_data_types_known = False
+        cached_types = data_store_types.get(_get_data_store_key(data_store_as_dict))
+        if cached_types is not None:
+            provided_data_types = cached_types.get('ProvidedDataTypes')
+            encapsulated_data_types = cached_types.get('EncapsulatedDataTypes')
+        if 'ProvidedDataTypes' in data_store_as_dict:
+            provided_data_types = data_store_as_dict['ProvidedDataTypes']
+            if type(provided_data_types) is str:
+                provided_data_types = provided_data_types.split(',')
+        if 'EncapsulatedDataTypes' in data_store_as_dict:
+            encapsulated_data_types = dict([(data_type, True)
+                                            for data_type in data_store_as_dict['EncapsulatedDataTypes']])
+            all_encapsulated_data_types_known = True
+        return LazyDataStore(data_store_as_dict, id, provided_data_types, encapsulated_data_types,
+                             all_encapsulated_data_types_known, self._cache_data_store_types)
+
+    def _get_data_store_types_file(self) -> str:
+        return '{0}/{1}'.format(self._get_multiply_home_dir(), DATA_STORE_TYPES_FILE_NAME)
+
+    def _read_data_store_types(self) -> dict:
+        data_store_types_file = self._get_data_store_types_file()
+        if not os.path.exists(data_store_types_file):
+            return {}
+        try:
+            with open(data_store_types_file, 'r') as stream:
+                return json.load(stream)
+        except (OSError, ValueError) as e:
+            logging.warning('Could not read data store types from {}: {}'.format(data_store_types_file, e))
+            return {}
+
+    def _cache_data_store_types(self, data_store: LazyDataStore) -> None:
+        with self._data_store_types_lock:
+            data_store_types = self._read_data_store_types()
+            # the types are cached under a key of the data store description, so that they are not used anymore once
+            # the description has changed. Entries for outdated descriptions of the same data store are removed.
+            data_store_types = dict([(key, types) for key, types in data_store_types.items()
+                                     if type(types) is dict and types.get('Id') != str(data_store.id)])
+            data_store_types[_get_data_store_key(data_store.data_store_as_dict)] = \
+                {'Id': str(data_store.id), 'ProvidedDataTypes': data_store.get_provided_data_types(),
+                 'EncapsulatedDataTypes': data_store.encapsulated_data_types}
+            data_store_types_file = self._get_data_store_types_file()
+            temp_file = '{}.{}.tmp'.format(data_store_types_file, os.getpid())
+            try:
+                with open(temp_file, 'w') as stream:
+                    json.dump(data_store_types, stream, indent=2)
+                os.replace(temp_file, data_store_types_file)
+            except (OSError, TypeError, ValueError) as e:
+                logging.warning('Could not write data store types to {}: {}'.format(data_store_types_file, e))
+
     def _put_data_store(self, data_store: DataStore, file: Optional[str] = None) -> None:
         if file is None:
             file = self._get_default_data_stores_file()
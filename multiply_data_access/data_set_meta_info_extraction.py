@@ -9,22 +9,28 @@ from an existing file.
 __author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
 
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from multiply_data_access.data_access import DataSetMetaInfo
+from multiply_data_access.extraction_cache import get_extraction_cache, get_extraction_key
 from multiply_core.observations import DataTypeConstants, get_relative_path
-from multiply_core.util import reproject, get_time_from_year_and_day_of_year, get_time_from_string
+from multiply_core.util import get_time_from_year_and_day_of_year, get_time_from_string
 from multiply_data_access.modis_tile_coverage_provider import get_tile_coverage
 from datetime import timedelta
+from functools import lru_cache
 from shapely.geometry import Polygon
-from typing import Optional
-import gdal
-import xarray
+from typing import List, Optional, Sequence, Tuple
+import logging
 import os
-import osr
+import pickle
 import zipfile
 from xml.etree import ElementTree
-from lxml.etree import XML
 
 GLOBAL = 'POLYGON((-180.0 90.0, 180.0 90.0, 180.0 -90.0, -180.0 -90.0, -180.0 90.0))'
+DEFAULT_MAX_EXTRACTION_WORKERS = os.cpu_count() or 1
+DEFAULT_EXTRACTION_CHUNK_SIZE = 8
+# starting worker processes takes longer than extracting the meta information of a few data sets
+_MIN_NUM_DATA_SETS_FOR_WORKERS = 16
 
 
 def _get_xml_root(xml_file_name: str):
@@ -32,6 +38,65 @@ def _get_xml_root(xml_file_name: str):
     return tree.getroot()
 
 
+@lru_cache(maxsize=128)
+def _get_transformation_to_wgs84(epsg_code: int):
+    import osr
+    source_srs = osr.SpatialReference()
+    source_srs.ImportFromEPSG(epsg_code)
+    target_srs = osr.SpatialReference()
+    target_srs.SetWellKnownGeogCS('EPSG:4326')
+    return osr.CoordinateTransformation(source_srs, target_srs)
+
+
+def _get_epsg_code_from_tile_id(tile_id: str) -> Optional[int]:
+    # tile ids contain the tile name, e.g., 'T29SQB', which consists of the utm zone and the latitude band
+    for part in tile_id.split('_'):
+        if len(part) == 6 and part[0] == 'T' and part[1:3].isdigit():
+            if part[3] >= 'N':
+                return 32600 + int(part[1:3])
+            return 32700 + int(part[1:3])
+
+
+def _extract_coverage_from_aws_s2_metadata(root) -> str:
+    """Extracts the coverage from the root of the XML metadata file of an S2 tile as provided by AWS."""
+    ulx = 0
+    uly = 0
+    x_dim = 0
+    y_dim = 0
+    n_rows = 0
+    n_cols = 0
+    epsg_code = None
+    tile_id = None
+    for child in root:
+        tile_geocoding_element = child.find('Tile_Geocoding')
+        if tile_geocoding_element is not None:
+            for element in tile_geocoding_element:
+                if element.tag == 'HORIZONTAL_CS_CODE' and element.text.upper().startswith('EPSG:'):
+                    epsg_code = int(element.text[5:])
+                elif element.tag == 'Size' and element.attrib['resolution'] == '60':
+                    n_rows = float(element.find('NROWS').text)
+                    n_cols = float(element.find('NCOLS').text)
+                elif element.tag == 'Geoposition' and element.attrib['resolution'] == '60':
+                    ulx = float(element.find('ULX').text)
+                    uly = float(element.find('ULY').text)
+                    x_dim = float(element.find('XDIM').text)
+                    y_dim = float(element.find('YDIM').text)
+        tile_id_element = child.find('TILE_ID')
+        if tile_id_element is not None:
+            tile_id = tile_id_element.text
+    if epsg_code is None and tile_id is not None:
+        epsg_code = _get_epsg_code_from_tile_id(tile_id)
+    if epsg_code is None:
+        raise ValueError('Could not determine spatial reference system of S2 tile')
+    llx = ulx + n_rows * x_dim
+    lly = uly + n_cols * y_dim
+    transformation = _get_transformation_to_wgs84(epsg_code)
+    transformed_coords = []
+    for x, y in [(ulx, uly), (llx, uly), (llx, lly), (ulx, lly)]:
+        transformed_coords.extend(transformation.TransformPoint(x, y)[:2])
+    return 'POLYGON(({0} {1}, {2} {3}, {4} {5}, {6} {7}, {0} {1}))'.format(*transformed_coords)
+
+
 class DataSetMetaInfoExtractor(metaclass=ABCMeta):
 
     @classmethod
@@ -39,6 +104,18 @@ class DataSetMetaInfoExtractor(metaclass=ABCMeta):
     def name(cls) -> str:
         """The name of the data type supported by this checker."""
 
+    @classmethod
+    def version(cls) -> str:
+        """The version of the extractor. Must be increased when the extracted meta information changes, so that meta
+        information extracted by earlier versions is not taken from the extraction cache."""
+        return '1'
+
+    def get_files_to_extract_from(self, path: str) -> List[str]:
+        """The files from which the meta information of the data set at the given path is extracted. Changes of these
+        files invalidate the meta information in the extraction cache. Must be overridden for data sets which are
+        directories."""
+        return [path]
+
     @abstractmethod
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
         """Whether the data at the given path is a valid data product for the type."""
@@ -50,9 +127,13 @@ class S1SlcMetaInfoExtractor(DataSetMetaInfoExtractor):
     def name(cls) -> str:
         return DataTypeConstants.S1_SLC
 
-    def extract_meta_info(self, path: str) -> Optional[DataSetMetaInfo]:
+    def get_files_to_extract_from(self, path: str) -> List[str]:
         if not path.endswith('.zip'):
             path = f'{path}.zip'
+        return [path]
+
+    def extract_meta_info(self, path: str) -> Optional[DataSetMetaInfo]:
+        path = self.get_files_to_extract_from(path)[0]
         if not os.path.exists(path):
             return None
         s1_slc_archive = zipfile.ZipFile(path, 'r')
@@ -62,6 +143,7 @@ class S1SlcMetaInfoExtractor(DataSetMetaInfoExtractor):
         return None
 
     def _create_data_set_meta_info(self, path: str, manifest_file):
+        from lxml.etree import XML
         manifest = XML(manifest_file)
         coverage = self._extract_coverage(manifest)
         start_time = self._extract_start_time(manifest)
@@ -107,6 +189,7 @@ class S1SpeckledMetaInfoExtractor(DataSetMetaInfoExtractor):
         return DataTypeConstants.S1_SPECKLED
 
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+        import xarray
         id = path.split('/')[-1]
         dataset = xarray.open_dataset(path)
         if 'lat' in dataset.coords and 'lon' in dataset.coords:
@@ -129,9 +212,13 @@ class AwsS2MetaInfoExtractor(DataSetMetaInfoExtractor):
     def name(cls) -> str:
         return 'AWS_S2_L1C'
 
+    def get_files_to_extract_from(self, path: str) -> List[str]:
+        return [path + '/metadata.xml']
+
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
-        coverage = self._extract_coverage(path)
-        time = self._extract_time_from_metadata_file(path)
+        root = self._get_xml_root(self.get_files_to_extract_from(path)[0])
+        coverage = self._extract_coverage(root)
+        time = self._extract_time_from_metadata_file(root)
         return DataSetMetaInfo(coverage, time, time, self.name(), path)
 
     @staticmethod
@@ -139,59 +226,17 @@ class AwsS2MetaInfoExtractor(DataSetMetaInfoExtractor):
         tree = ElementTree.parse(xml_file_name)
         return tree.getroot()
 
-    def _extract_time_from_metadata_file(self, filename: str) -> str:
-        """Parses the XML metadata file to extract the sensing time."""
-        root = self._get_xml_root(filename + '/metadata.xml')
+    def _extract_time_from_metadata_file(self, root) -> str:
+        """Extracts the sensing time from the root of the XML metadata file."""
         for child in root:
             for x in child.findall("SENSING_TIME"):
                 time = x.text.replace('T', ' ').replace('Z', '')
                 time = time[:time.rfind('.')]
                 return time
 
-    def _extract_coverage(self, filename: str) -> str:
-        """Parses the XML metadata file to extract the sensing time."""
-        root = self._get_xml_root(filename + '/metadata.xml')
-        ulx = 0
-        uly = 0
-        x_dim = 0
-        y_dim = 0
-        n_rows = 0
-        n_cols = 0
-        for child in root:
-            tile_geocoding_element = child.find('Tile_Geocoding')
-            if tile_geocoding_element is not None:
-                for element in tile_geocoding_element:
-                    if element.tag == 'Size' and element.attrib['resolution'] == '60':
-                        n_rows = float(element.find('NROWS').text)
-                        n_cols = float(element.find('NCOLS').text)
-                    elif element.tag == 'Geoposition' and element.attrib['resolution'] == '60':
-                        ulx = float(element.find('ULX').text)
-                        uly = float(element.find('ULY').text)
-                        x_dim = float(element.find('XDIM').text)
-                        y_dim = float(element.find('YDIM').text)
-        llx = ulx + n_rows * x_dim
-        lly = uly + n_cols * y_dim
-        gdal_dataset = gdal.Open(filename + '/B01.jp2')
-        source_srs = reproject.get_spatial_reference_system_from_dataset(gdal_dataset)
-        target_srs = osr.SpatialReference()
-        target_srs.SetWellKnownGeogCS('EPSG:4326')
-        coords = [ulx, uly, llx, uly, llx, lly, ulx, lly]
-        transformed_coords = reproject.transform_coordinates(source_srs, target_srs, coords)
-        return 'POLYGON(({0} {1}, {2} {3}, {4} {5}, {6} {7}, {0} {1}))'.format(transformed_coords[0],
-                                                                               transformed_coords[1],
-                                                                               transformed_coords[2],
-                                                                               transformed_coords[3],
-                                                                               transformed_coords[4],
-                                                                               transformed_coords[5],
-                                                                               transformed_coords[6],
-                                                                               transformed_coords[7])
-
-    def _extract_tile_id(self, filename: str) -> str:
-        """Parses the XML metadata file to extract the tile id."""
-        root = self._get_xml_root(filename + '/metadata.xml')
-        for child in root:
-            for x in child.findall("TILE_ID"):
-                return x.text
+    def _extract_coverage(self, root) -> str:
+        """Extracts the coverage from the root of the XML metadata file."""
+        return _extract_coverage_from_aws_s2_metadata(root)
 
 
 class S2L1CMetaInfoExtractor(DataSetMetaInfoExtractor):
@@ -210,10 +255,14 @@ class S2L1CMetaInfoExtractor(DataSetMetaInfoExtractor):
     def name(cls) -> str:
         return DataTypeConstants.S2_L1C
 
+    def get_files_to_extract_from(self, path: str) -> List[str]:
+        return [path + '/MTD_MSIL1C.xml']
+
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
-        coverage = self._extract_coverage(path)
-        start_time = self._extract_start_time(path)
-        end_time = self._extract_end_time(path)
+        root = self._get_xml_root(self.get_files_to_extract_from(path)[0])
+        coverage = self._extract_coverage(root)
+        start_time = self._extract_start_time(root)
+        end_time = self._extract_end_time(root)
         return DataSetMetaInfo(coverage, start_time, end_time, self.name(), path)
 
     @staticmethod
@@ -221,8 +270,8 @@ class S2L1CMetaInfoExtractor(DataSetMetaInfoExtractor):
         tree = ElementTree.parse(xml_file_name)
         return tree.getroot()
 
-    def _extract_coverage(self, path: str) -> str:
-        element = self._get_xml_root(path + '/MTD_MSIL1C.xml')
+    def _extract_coverage(self, root) -> str:
+        element = root
         for footprint_element_name in self._footprint_element_names:
             element = element.find(footprint_element_name)
             if element is None:
@@ -235,14 +284,14 @@ class S2L1CMetaInfoExtractor(DataSetMetaInfoExtractor):
             formatted_coords.append(f'{coords[2 * index + 1]} {coords[2 * index]}')
         return f"POLYGON(({', '.join(formatted_coords)}))"
 
-    def _extract_start_time(self, path: str) -> str:
-        return self._extract_time(path, self._start_time_element)
+    def _extract_start_time(self, root) -> str:
+        return self._extract_time(root, self._start_time_element)
 
-    def _extract_end_time(self, path: str) -> str:
-        return self._extract_time(path, self._stop_time_element)
+    def _extract_end_time(self, root) -> str:
+        return self._extract_time(root, self._stop_time_element)
 
-    def _extract_time(self, path: str, final_element_name: str) -> str:
-        element = self._get_xml_root(path + '/MTD_MSIL1C.xml')
+    def _extract_time(self, root, final_element_name: str) -> str:
+        element = root
         time_element_names = self._time_element_names.copy()
         time_element_names.append(final_element_name)
         for time_element_name in time_element_names:
@@ -268,10 +317,14 @@ class S2L2MetaInfoExtractor(DataSetMetaInfoExtractor):
     def name(cls) -> str:
         return DataTypeConstants.S2_L2
 
+    def get_files_to_extract_from(self, path: str) -> List[str]:
+        return [path + '/MTD_MSIL1C.xml']
+
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
-        coverage = self._extract_coverage(path)
-        start_time = self._extract_start_time(path)
-        end_time = self._extract_end_time(path)
+        root = self._get_xml_root(self.get_files_to_extract_from(path)[0])
+        coverage = self._extract_coverage(root)
+        start_time = self._extract_start_time(root)
+        end_time = self._extract_end_time(root)
         return DataSetMetaInfo(coverage, start_time, end_time, self.name(), path)
 
     @staticmethod
@@ -279,8 +332,8 @@ class S2L2MetaInfoExtractor(DataSetMetaInfoExtractor):
         tree = ElementTree.parse(xml_file_name)
         return tree.getroot()
 
-    def _extract_coverage(self, path: str) -> str:
-        element = self._get_xml_root(path + '/MTD_MSIL1C.xml')
+    def _extract_coverage(self, root) -> str:
+        element = root
         for footprint_element_name in self._footprint_element_names:
             element = element.find(footprint_element_name)
             if element is None:
@@ -293,14 +346,14 @@ class S2L2MetaInfoExtractor(DataSetMetaInfoExtractor):
             formatted_coords.append(f'{coords[2 * index + 1]} {coords[2 * index]}')
         return f"POLYGON(({', '.join(formatted_coords)}))"
 
-    def _extract_start_time(self, path: str) -> str:
-        return self._extract_time(path, self._start_time_element)
+    def _extract_start_time(self, root) -> str:
+        return self._extract_time(root, self._start_time_element)
 
-    def _extract_end_time(self, path: str) -> str:
-        return self._extract_time(path, self._stop_time_element)
+    def _extract_end_time(self, root) -> str:
+        return self._extract_time(root, self._stop_time_element)
 
-    def _extract_time(self, path: str, final_element_name: str) -> str:
-        element = self._get_xml_root(path + '/MTD_MSIL1C.xml')
+    def _extract_time(self, root, final_element_name: str) -> str:
+        element = root
         time_element_names = self._time_element_names.copy()
         time_element_names.append(final_element_name)
         for time_element_name in time_element_names:
@@ -316,9 +369,13 @@ class AwsS2L2MetaInfoExtractor(DataSetMetaInfoExtractor):
     def name(cls) -> str:
         return DataTypeConstants.AWS_S2_L2
 
+    def get_files_to_extract_from(self, path: str) -> List[str]:
+        return [path + '/metadata.xml']
+
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
-        coverage = self._extract_coverage(path)
-        time = self._extract_time_from_metadata_file(path)
+        root = self._get_xml_root(self.get_files_to_extract_from(path)[0])
+        coverage = self._extract_coverage(root)
+        time = self._extract_time_from_metadata_file(root)
         return DataSetMetaInfo(coverage, time, time, self.name(), path)
 
     @staticmethod
@@ -326,59 +383,17 @@ class AwsS2L2MetaInfoExtractor(DataSetMetaInfoExtractor):
         tree = ElementTree.parse(xml_file_name)
         return tree.getroot()
 
-    def _extract_time_from_metadata_file(self, filename: str) -> str:
-        """Parses the XML metadata file to extract the sensing time."""
-        root = self._get_xml_root(filename + '/metadata.xml')
+    def _extract_time_from_metadata_file(self, root) -> str:
+        """Extracts the sensing time from the root of the XML metadata file."""
         for child in root:
             for x in child.findall("SENSING_TIME"):
                 time = x.text.replace('T', ' ').replace('Z', '')
                 time = time[:time.rfind('.')]
                 return time
 
-    def _extract_coverage(self, filename: str) -> str:
-        """Parses the XML metadata file to extract the coverage."""
-        root = self._get_xml_root(filename + '/metadata.xml')
-        ulx = 0
-        uly = 0
-        x_dim = 0
-        y_dim = 0
-        n_rows = 0
-        n_cols = 0
-        for child in root:
-            tile_geocoding_element = child.find('Tile_Geocoding')
-            if tile_geocoding_element is not None:
-                for element in tile_geocoding_element:
-                    if element.tag == 'Size' and element.attrib['resolution'] == '60':
-                        n_rows = float(element.find('NROWS').text)
-                        n_cols = float(element.find('NCOLS').text)
-                    elif element.tag == 'Geoposition' and element.attrib['resolution'] == '60':
-                        ulx = float(element.find('ULX').text)
-                        uly = float(element.find('ULY').text)
-                        x_dim = float(element.find('XDIM').text)
-                        y_dim = float(element.find('YDIM').text)
-        llx = ulx + n_rows * x_dim
-        lly = uly + n_cols * y_dim
-        gdal_dataset = gdal.Open(filename + '/B01_sur_unc.tif')
-        source_srs = reproject.get_spatial_reference_system_from_dataset(gdal_dataset)
-        target_srs = osr.SpatialReference()
-        target_srs.SetWellKnownGeogCS('EPSG:4326')
-        coords = [ulx, uly, llx, uly, llx, lly, ulx, lly]
-        transformed_coords = reproject.transform_coordinates(source_srs, target_srs, coords)
-        return 'POLYGON(({0} {1}, {2} {3}, {4} {5}, {6} {7}, {0} {1}))'.format(transformed_coords[0],
-                                                                               transformed_coords[1],
-                                                                               transformed_coords[2],
-                                                                               transformed_coords[3],
-                                                                               transformed_coords[4],
-                                                                               transformed_coords[5],
-                                                                               transformed_coords[6],
-                                                                               transformed_coords[7])
-
-    def _extract_tile_id(self, filename: str) -> str:
-        """Parses the XML metadata file to extract the tile id."""
-        root = self._get_xml_root(filename + '/metadata.xml')
-        for child in root:
-            for x in child.findall("TILE_ID"):
-                return x.text
+    def _extract_coverage(self, root) -> str:
+        """Extracts the coverage from the root of the XML metadata file."""
+        return _extract_coverage_from_aws_s2_metadata(root)
 
 
 class AsterMetaInfoExtractor(DataSetMetaInfoExtractor):
@@ -408,13 +423,6 @@ class MODISMetaInfoExtractor(DataSetMetaInfoExtractor):
         self._Y_STEP = 463.31271653 * 2400
         self._M_Y0 = -20015109.354
         self._M_X0 = 10007554.677
-        wgs84_srs = osr.SpatialReference()  # Define a SpatialReference object
-        wgs84_srs.ImportFromEPSG(4326)  # And set it to WGS84 using the EPSG code
-        modis_sinu_srs = osr.SpatialReference()  # define the SpatialReference object
-        modis_sinu_srs.ImportFromProj4(
-            "+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +a=6371007.181 +b=6371007.181 +units=m +no_defs")
-        self._wgs84_to_modis = osr.CoordinateTransformation(wgs84_srs, modis_sinu_srs)
-        self._modis_to_wgs84 = osr.CoordinateTransformation(modis_sinu_srs, wgs84_srs)
 
     def extract_meta_info(self, path: str) -> DataSetMetaInfo:
         h = int(path[-27:-25])
@@ -530,7 +538,132 @@ add_data_set_meta_info_extractor(MODISMCD15A2MetaInfoExtractor())
 add_data_set_meta_info_extractor(CamsTiffMetaInfoExtractor())
 
 
-def get_data_set_meta_info(data_type: str, path: str) -> Optional[DataSetMetaInfo]:
+def _get_data_set_meta_info_extractor(data_type: str) -> Optional[DataSetMetaInfoExtractor]:
     for data_set_meta_info_provider in DATA_SET_META_INFO_PROVIDERS:
         if data_set_meta_info_provider.name() == data_type:
-            return data_set_meta_info_provider.extract_meta_info(path)
+            return data_set_meta_info_provider
+
+
+def _get_extraction_key(data_set_meta_info_extractor: DataSetMetaInfoExtractor, data_type: str, path: str) \
+        -> Optional[str]:
+    extractor_class = type(data_set_meta_info_extractor)
+    extractor_version = '{0}.{1}:{2}'.format(extractor_class.__module__, extractor_class.__qualname__,
+                                             data_set_meta_info_extractor.version())
+    return get_extraction_key(data_type, path, extractor_version,
+                              data_set_meta_info_extractor.get_files_to_extract_from(path))
+
+
+def get_data_set_meta_info(data_type: str, path: str) -> Optional[DataSetMetaInfo]:
+    """
+    Extracts the meta information of a data set. Meta information that has been extracted before from the data set in
+    its current state is taken from the extraction cache.
+    :param data_type: The data type of the data set.
+    :param path: The path to the data set.
+    :return: The meta information of the data set. None, if there is no extractor for the data type.
+    """
+    data_set_meta_info_extractor = _get_data_set_meta_info_extractor(data_type)
+    if data_set_meta_info_extractor is None:
+        return None
+    extraction_cache = get_extraction_cache()
+    key = None
+    if extraction_cache is not None:
+        key = _get_extraction_key(data_set_meta_info_extractor, data_type, path)
+        if key is not None:
+            data_set_meta_info = extraction_cache.get(key)
+            if data_set_meta_info is not None:
+                return data_set_meta_info
+    data_set_meta_info = data_set_meta_info_extractor.extract_meta_info(path)
+    if key is not None and data_set_meta_info is not None:
+        extraction_cache.put(key, data_set_meta_info)
+    return data_set_meta_info
+
+
+def _can_be_sent_to_worker(data_set_meta_info_extractor: DataSetMetaInfoExtractor) -> bool:
+    # extractors which have been defined locally cannot be sent to another process
+    try:
+        pickle.dumps(data_set_meta_info_extractor)
+        return True
+    except (AttributeError, TypeError, pickle.PicklingError):
+        return False
+
+
+def _extract(data_set_meta_info_extractor: DataSetMetaInfoExtractor, path: str) \
+        -> Tuple[Optional[DataSetMetaInfo], Optional[str]]:
+    try:
+        data_set_meta_info = data_set_meta_info_extractor.extract_meta_info(path)
+    except Exception as e:
+        return None, '{}: {}'.format(type(e).__name__, e)
+    return data_set_meta_info, None
+
+
+def get_data_set_meta_infos(data_types_and_paths: Sequence[Tuple[str, str]], max_workers: Optional[int] = None,
+                            chunk_size: int = DEFAULT_EXTRACTION_CHUNK_SIZE) -> List[Optional[DataSetMetaInfo]]:
+    """
+    Extracts the meta information of many data sets. The extraction is distributed on a pool of worker processes.
+    If the meta information cannot be extracted from a data set, the error is logged and the extraction of the other
+    data sets continues. Meta information that has been extracted before from a data set in its current state is taken
+    from the extraction cache.
+    :param data_types_and_paths: Tuples of the data type and the path of each data set.
+    :param max_workers: The maximum number of worker processes. If None, one is used per CPU. If 1, the meta information
+    is extracted in the calling process.
+    :param chunk_size: The number of data sets that are passed to a worker process at once.
+    :return: The meta information of the data sets, in the order of the data sets. An entry is None if no meta
+    information could be extracted from the data set.
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_EXTRACTION_WORKERS
+    results = [(None, None)] * len(data_types_and_paths)
+    extractors = [_get_data_set_meta_info_extractor(data_type) for data_type, path in data_types_and_paths]
+    keys = [None] * len(data_types_and_paths)
+    cached_data_set_meta_infos = [None] * len(data_types_and_paths)
+    extraction_cache = get_extraction_cache()
+    if extraction_cache is not None:
+        for i, (data_type, path) in enumerate(data_types_and_paths):
+            if extractors[i] is not None:
+                keys[i] = _get_extraction_key(extractors[i], data_type, path)
+        indexes_with_keys = [i for i, key in enumerate(keys) if key is not None]
+        for i, cached_data_set_meta_info in zip(indexes_with_keys,
+                                                extraction_cache.get_many([keys[i] for i in indexes_with_keys])):
+            cached_data_set_meta_infos[i] = cached_data_set_meta_info
+    indexes_for_workers = []
+    extractors_for_workers = []
+    paths_for_workers = []
+    for i, (data_type, path) in enumerate(data_types_and_paths):
+        data_set_meta_info_extractor = extractors[i]
+        if data_set_meta_info_extractor is None or cached_data_set_meta_infos[i] is not None:
+            continue
+        if max_workers > 1 and len(data_types_and_paths) >= _MIN_NUM_DATA_SETS_FOR_WORKERS and \
+                _can_be_sent_to_worker(data_set_meta_info_extractor):
+            indexes_for_workers.append(i)
+            extractors_for_workers.append(data_set_meta_info_extractor)
+            paths_for_workers.append(path)
+        else:
+            results[i] = _extract(data_set_meta_info_extractor, path)
+    if len(indexes_for_workers) > 0:
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(indexes_for_workers))) as executor:
+                for i, result in zip(indexes_for_workers, executor.map(_extract, extractors_for_workers,
+                                                                       paths_for_workers, chunksize=chunk_size)):
+                    results[i] = result
+        except (BrokenProcessPool, OSError) as e:
+            logging.warning('Could not extract meta information in worker processes, will extract it in this process: '
+                            '{}'.format(e))
+            for i, data_set_meta_info_extractor, path in zip(indexes_for_workers, extractors_for_workers,
+                                                             paths_for_workers):
+                results[i] = _extract(data_set_meta_info_extractor, path)
+    data_set_meta_infos = []
+    to_be_cached = []
+    for i, (data_type, path) in enumerate(data_types_and_paths):
+        data_set_meta_info, error = results[i]
+        if error is not None:
+            logging.warning('Could not extract meta information of {0} data set {1}: {2}'.format(data_type, path,
+                                                                                                 error))
+        if cached_data_set_meta_infos[i] is not None:
+            data_set_meta_infos.append(cached_data_set_meta_infos[i])
+        else:
+            data_set_meta_infos.append(data_set_meta_info)
+            if data_set_meta_info is not None and keys[i] is not None:
+                to_be_cached.append((keys[i], data_set_meta_infos[i]))
+    if extraction_cache is not None:
+        extraction_cache.put_many(to_be_cached)
+    return data_set_meta_infos
@@ -1,8 +1,11 @@
-from .data_set_meta_info_extraction import get_data_set_meta_info
+from .data_set_meta_info_extraction import get_data_set_meta_info, get_data_set_meta_infos
 from multiply_core.observations import get_valid_type
 from multiply_core.util import FileRef
 from multiply_data_access.data_access import DataSetMetaInfo, FileSystem, MetaInfoProvider
-from typing import List, Sequence
+from multiply_data_access.registrations import create_file_system_from_dict, create_meta_info_provider_from_dict
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+import threading
 
 
 class DataStore(object):
@@ -14,6 +17,7 @@ class DataStore(object):
         self._file_system = file_system
         self._meta_info_provider = meta_info_provider
         self._id = identifier
+        self._notify_lock = threading.Lock()
 
     def __repr__(self):
         return 'Data store {}'.format(self._id)
@@ -32,9 +36,18 @@ class DataStore(object):
             return []
         file_refs = self._file_system.get(data_set_meta_info)
         if len(file_refs) > 0:
-            self._meta_info_provider.notify_got(data_set_meta_info)
+            # data sets may be retrieved concurrently, but meta info providers need not be thread-safe
+            with self._notify_lock:
+                self._meta_info_provider.notify_got(data_set_meta_info)
         return file_refs
 
+    def get_max_concurrent_gets(self) -> Optional[int]:
+        """
+        :return: The maximum number of data sets that may be retrieved from this data store at the same time. None,
+        if the data store imposes no limit.
+        """
+        return self._file_system.get_max_concurrent_gets()
+
     def query(self, query_string: str) -> List[DataSetMetaInfo]:
         """
         Evaluates a query and retrieves a result set for it.
@@ -70,6 +83,14 @@ class DataStore(object):
         """
         return self._meta_info_provider.get_provided_data_types()
 
+    def encapsulates_data_type(self, data_type: str) -> bool:
+        """
+        Whether the data store provides encapsulated access to data of the queried type.
+        :param data_type: A string labelling the data
+        :return: True if data of that type is encapsulated by one of the data store's provided data types.
+        """
+        return self._meta_info_provider.encapsulates_data_type(data_type)
+
     def get_as_dict(self) -> dict:
         """
         :return: A representation of this data store in a dictionary format
@@ -84,9 +105,12 @@ class DataStore(object):
         """
         return self._file_system.can_put()
 
-    def put(self, from_url: str):
+    def put(self, from_url: str, put_mode: Optional[str] = None):
         """
         Puts a data set into the data store.
+        :param from_url: The path to the data set.
+        :param put_mode: How the data set is put into the data store, e.g., 'copy', 'move', 'hardlink', 'reflink', or
+        'symlink'. If None, the put mode configured for the file system of the data store is used.
         :return:
         """
         if not self._file_system.can_put():
@@ -97,9 +121,46 @@ class DataStore(object):
         if not self._meta_info_provider.provides_data_type(data_type):
             raise UserWarning('Data Store {0} does not support data of type {1}'.format(self.id, data_type))
         data_set_meta_info = get_data_set_meta_info(data_type, from_url)
-        updated_data_set_meta_info = self._file_system.put(from_url, data_set_meta_info)
+        updated_data_set_meta_info = self._file_system.put(from_url, data_set_meta_info, put_mode=put_mode)
         self._meta_info_provider.update(updated_data_set_meta_info)
 
+    def put_many(self, from_urls: Sequence[str], put_mode: Optional[str] = None,
+                 max_extraction_workers: Optional[int] = None) -> List[DataSetMetaInfo]:
+        """
+        Puts many data sets into the data store. The meta information of the data sets is extracted in parallel. Data
+        sets which cannot be put into the data store are skipped, the others are registered nevertheless.
+        :param from_urls: The paths to the data sets.
+        :param put_mode: How the data sets are put into the data store, e.g., 'copy', 'move', 'hardlink', 'reflink', or
+        'symlink'. If None, the put mode configured for the file system of the data store is used.
+        :param max_extraction_workers: The maximum number of processes which extract the meta information of the data
+        sets. If None, one process is used per CPU.
+        :return: The meta information of the data sets which have been put into the data store.
+        """
+        if not self._file_system.can_put():
+            raise UserWarning('Cannot put data to data store')
+        data_types_and_urls = []
+        for from_url in from_urls:
+            data_type = get_valid_type(from_url)
+            if data_type == '':
+                logging.warning('Could not determine data type of {}'.format(from_url))
+            elif not self._meta_info_provider.provides_data_type(data_type):
+                logging.warning('Data Store {0} does not support data of type {1}'.format(self.id, data_type))
+            else:
+                data_types_and_urls.append((data_type, from_url))
+        data_set_meta_infos = get_data_set_meta_infos(data_types_and_urls, max_extraction_workers)
+        updated_data_set_meta_infos = []
+        for (data_type, from_url), data_set_meta_info in zip(data_types_and_urls, data_set_meta_infos):
+            if data_set_meta_info is None:
+                logging.warning('Could not put {0} into data store {1}'.format(from_url, self.id))
+                continue
+            try:
+                updated_data_set_meta_infos.append(self._file_system.put(from_url, data_set_meta_info,
+                                                                         put_mode=put_mode))
+            except Exception as e:
+                logging.warning('Could not put {0} into data store {1}: {2}'.format(from_url, self.id, e))
+        self._meta_info_provider.update_many(updated_data_set_meta_infos)
+        return updated_data_set_meta_infos
+
     def update(self):
         """
         Causes the data store to update its registry: Newly found data will be registered, faulty registry entries
@@ -107,26 +168,139 @@ class DataStore(object):
         """
         found_data_set_meta_infos = self._file_system.scan()
         registered_data_set_meta_infos = self._meta_info_provider.get_all_data()
+        registered_keys = set([registered_data_set_meta_info.identity_key
+                               for registered_data_set_meta_info in registered_data_set_meta_infos])
+        found_keys = set()
+        to_be_registered = []
         for found_data_set_meta_info in found_data_set_meta_infos:
+            found_keys.add(found_data_set_meta_info.identity_key)
             if not self._meta_info_provider.provides_data_type(found_data_set_meta_info.data_type) and \
                     not self._meta_info_provider.encapsulates_data_type(found_data_set_meta_info.data_type):
                 continue
-            already_registered = False
-            for registered_data_set_meta_info in registered_data_set_meta_infos:
-                if found_data_set_meta_info.equals(registered_data_set_meta_info):
-                    already_registered = True
-                    break
-            if not already_registered:
-                self._meta_info_provider.update(found_data_set_meta_info)
+            if found_data_set_meta_info.identity_key not in registered_keys:
+                registered_keys.add(found_data_set_meta_info.identity_key)
+                to_be_registered.append(found_data_set_meta_info)
+        self._meta_info_provider.update_many(to_be_registered)
+        to_be_removed = []
         for registered_data_set_meta_info in registered_data_set_meta_infos:
-            found = False
-            for found_data_set_meta_info in found_data_set_meta_infos:
-                if found_data_set_meta_info.equals(registered_data_set_meta_info):
-                    found = True
-                    break
-            if not found:
-                self._meta_info_provider.remove(registered_data_set_meta_info)
+            if registered_data_set_meta_info.identity_key not in found_keys:
+                to_be_removed.append(registered_data_set_meta_info)
+        self._meta_info_provider.remove_many(to_be_removed)
 
     def clear_cache(self):
         self._file_system.clear_cache()
         self.update()
+
+
+class LazyDataStore(DataStore):
+    """
+    A data store which creates its file system and meta info provider only when they are first needed. As long as the
+    data types provided and encapsulated by it are known, it may be asked about them without being created.
+    """
+
+    def __init__(self, data_store_as_dict: dict, identifier: str, provided_data_types: Optional[List[str]] = None,
+                 encapsulated_data_types: Optional[Dict[str, bool]] = None,
+                 all_encapsulated_data_types_known: bool = False,
+                 on_data_types_determined: Optional[Callable[['LazyDataStore'], None]] = None):
+        """
+        :param data_store_as_dict: The dictionary describing the data store, with entries 'FileSystem' and
+        'MetaInfoProvider'.
+        :param identifier: The identifier of the data store.
+        :param provided_data_types: The data types provided by the data store, if known.
+        :param encapsulated_data_types: A dictionary stating for data types whether they are encapsulated by the data
+        store, if known.
+        :param all_encapsulated_data_types_known: If true, no data type is encapsulated that is not stated as
+        encapsulated in encapsulated_data_types.
+        :param on_data_types_determined: Called when the data store had to be created to determine its data types.
+        """
+        self._data_store_as_dict = data_store_as_dict
+        self._id = identifier
+        self._notify_lock = threading.Lock()
+        self._materialize_lock = threading.Lock()
+        self._determine_lock = threading.Lock()
+        self._materialized_file_system = None
+        self._materialized_meta_info_provider = None
+        self._provided_data_types = provided_data_types
+        self._encapsulated_data_types = {} if encapsulated_data_types is None else dict(encapsulated_data_types)
+        self._all_encapsulated_data_types_known = all_encapsulated_data_types_known
+        self._on_data_types_determined = on_data_types_determined
+
+    @property
+    def is_materialized(self) -> bool:
+        """Whether the file system and the meta info provider of this data store have been created."""
+        return self._materialized_meta_info_provider is not None
+
+    @property
+    def data_store_as_dict(self) -> dict:
+        """The dictionary describing the data store."""
+        return self._data_store_as_dict
+
+    @property
+    def encapsulated_data_types(self) -> Dict[str, bool]:
+        """The data types for which it is known whether they are encapsulated by the data store."""
+        return dict(self._encapsulated_data_types)
+
+    @property
+    def _file_system(self) -> FileSystem:
+        self._materialize()
+        return self._materialized_file_system
+
+    @property
+    def _meta_info_provider(self) -> MetaInfoProvider:
+        self._materialize()
+        return self._materialized_meta_info_provider
+
+    def _materialize(self):
+        with self._materialize_lock:
+            if self._materialized_meta_info_provider is not None:
+                return
+            logging.info('Creating data store {}'.format(self._id))
+            self._materialized_file_system = create_file_system_from_dict(self._data_store_as_dict['FileSystem'])
+            self._materialized_meta_info_provider = \
+                create_meta_info_provider_from_dict(self._data_store_as_dict['MetaInfoProvider'])
+
+    def provides_data_type(self, data_type: str) -> bool:
+        if self._provided_data_types is None:
+            self.determine_data_types([])
+        if self.is_materialized:
+            return self._meta_info_provider.provides_data_type(data_type)
+        return data_type in self._provided_data_types
+
+    def get_provided_data_types(self) -> List[str]:
+        if self._provided_data_types is None:
+            self.determine_data_types([])
+        elif self.is_materialized:
+            self._provided_data_types = list(self._meta_info_provider.get_provided_data_types())
+        return list(self._provided_data_types)
+
+    def encapsulates_data_type(self, data_type: str) -> bool:
+        self.determine_data_types([data_type])
+        return self._encapsulated_data_types.get(data_type, False)
+
+    def determine_data_types(self, data_types: Sequence[str]):
+        """
+        Determines whether the data store provides or encapsulates the given data types. The data store is only created
+        if this is not known from the declared or cached data types. Data types which are provided are not considered
+        to be encapsulated. Newly determined data types are reported once for all of the given data types.
+        :param data_types: The data types
+        """
+        determined = False
+        with self._determine_lock:
+            if self._provided_data_types is None:
+                self._provided_data_types = list(self._meta_info_provider.get_provided_data_types())
+                determined = True
+            if not self._all_encapsulated_data_types_known:
+                for data_type in data_types:
+                    if data_type not in self._provided_data_types and data_type not in self._encapsulated_data_types:
+                        self._encapsulated_data_types[data_type] = \
+                            self._meta_info_provider.encapsulates_data_type(data_type)
+                        determined = True
+        if determined and self._on_data_types_determined is not None:
+            self._on_data_types_determined(self)
+
+    def get_as_dict(self) -> dict:
+        if self.is_materialized:
+            return super().get_as_dict()
+        inner_dict = dict(self._data_store_as_dict)
+        inner_dict['Id'] = self.id
+        return {'DataStore': inner_dict}
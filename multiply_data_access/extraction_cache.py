@@ -0,0 +1,154 @@
+"""
+Description
+===========
+
+This module contains a persistent cache for the meta information extracted from data sets. Entries are kept in an
+SQLite database so that they are shared between processes. An entry is identified by the path of the data set, by the
+size and modification time of the files the meta information is read from and by the extractor that created it, so
+that entries of data sets which have changed are not used anymore. When the cache exceeds its maximum size, the least
+recently used entries are evicted.
+"""
+from .data_access import DataSetMetaInfo
+from .sqlite_cache import DefaultCache, SqliteLruCache
+from typing import List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import time
+
+__author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
+
+EXTRACTION_CACHE_FILE_NAME = 'extraction_cache.sqlite'
+DEFAULT_MAX_EXTRACTION_CACHE_SIZE = 64 * 1024 * 1024
+
+_SCHEMA_VERSION = 1
+_CREATE_STATEMENTS = [
+    'CREATE TABLE IF NOT EXISTS extracted_meta_infos (key TEXT PRIMARY KEY, last_access REAL NOT NULL, '
+    'size INTEGER NOT NULL, data_set_meta_info TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS extracted_meta_infos_last_access ON extracted_meta_infos (last_access)'
+]
+# the number of keys that are looked up in a single statement
+_MAX_KEYS_PER_STATEMENT = 500
+
+
+def get_extraction_key(data_type: str, path: str, extractor_version: str,
+                       files_to_extract_from: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    :param data_type: The data type of the data set
+    :param path: The path to the data set
+    :param extractor_version: The version of the extractor which extracts the meta information
+    :param files_to_extract_from: The files from which the extractor reads the meta information. Changes of these files
+    change the key. If not given, this is the data set itself. Must be given for data sets which are directories, as
+    changing a file within a directory does not change the size or modification time of the directory.
+    :return: A key identifying the meta information extracted from the data set in its current state. None, if the
+    data set or one of the files to extract from does not exist.
+    """
+    if files_to_extract_from is None:
+        files_to_extract_from = [path]
+    file_states = []
+    for file_to_extract_from in files_to_extract_from:
+        try:
+            stat = os.stat(file_to_extract_from)
+        except OSError:
+            return None
+        file_states.append([os.path.abspath(file_to_extract_from), stat.st_size, stat.st_mtime_ns])
+    # the path is part of the key as given, as extractors may use it for the identifier of the data set
+    key = json.dumps([data_type, path, os.path.abspath(path), file_states, extractor_version])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _serialize(data_set_meta_info: DataSetMetaInfo) -> str:
+    return json.dumps([data_set_meta_info.coverage, data_set_meta_info.start_time, data_set_meta_info.end_time,
+                       data_set_meta_info.data_type, data_set_meta_info.identifier,
+                       data_set_meta_info.referenced_data])
+
+
+def _deserialize(serialized_data_set_meta_info: str) -> DataSetMetaInfo:
+    return DataSetMetaInfo(*json.loads(serialized_data_set_meta_info))
+
+
+class ExtractionCache(SqliteLruCache):
+    """
+    A persistent cache for the meta information extracted from data sets.
+    """
+
+    def __init__(self, path_to_cache_file: str, max_size: int = DEFAULT_MAX_EXTRACTION_CACHE_SIZE):
+        """
+        :param path_to_cache_file: The path to the SQLite file in which the meta information is stored.
+        :param max_size: The maximum size in bytes of the stored meta information.
+        """
+        super().__init__(path_to_cache_file, max_size, 'extracted_meta_infos', _SCHEMA_VERSION, _CREATE_STATEMENTS)
+
+    def get(self, key: str) -> Optional[DataSetMetaInfo]:
+        """
+        Retrieves meta information from the cache.
+        :param key: The key of the meta information, as created by get_extraction_key
+        :return: The data set meta info. None, if the cache holds no meta information for the key.
+        """
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[DataSetMetaInfo]]:
+        """
+        Retrieves meta information from the cache.
+        :param keys: The keys of the meta information, as created by get_extraction_key
+        :return: The data set meta infos, in the order of the keys. An entry is None if the cache holds no meta
+        information for the key.
+        """
+        serialized_data_set_meta_infos = {}
+        with self._lock, self._connection:
+            for i in range(0, len(keys), _MAX_KEYS_PER_STATEMENT):
+                keys_of_statement = list(keys[i:i + _MAX_KEYS_PER_STATEMENT])
+                statement = 'SELECT key, data_set_meta_info FROM extracted_meta_infos WHERE key IN ({})'.\
+                    format(', '.join(['?'] * len(keys_of_statement)))
+                serialized_data_set_meta_infos.update(self._connection.execute(statement, keys_of_statement))
+            now = time.time()
+            self._connection.executemany('UPDATE extracted_meta_infos SET last_access = ? WHERE key = ?',
+                                         [(now, key) for key in serialized_data_set_meta_infos.keys()])
+            self._hits += len(serialized_data_set_meta_infos)
+            self._misses += len(keys) - len(serialized_data_set_meta_infos)
+        return [_deserialize(serialized_data_set_meta_infos[key]) if key in serialized_data_set_meta_infos else None
+                for key in keys]
+
+    def put(self, key: str, data_set_meta_info: DataSetMetaInfo):
+        """
+        Stores meta information in the cache. Least recently used entries are evicted if the cache grows too large.
+        :param key: The key of the meta information, as created by get_extraction_key
+        :param data_set_meta_info: The data set meta info
+        """
+        self.put_many([(key, data_set_meta_info)])
+
+    def put_many(self, keys_and_data_set_meta_infos: Sequence[Tuple[str, DataSetMetaInfo]]):
+        """
+        Stores meta information in the cache. Least recently used entries are evicted if the cache grows too large.
+        :param keys_and_data_set_meta_infos: Tuples of the key of the meta information, as created by
+        get_extraction_key, and the data set meta info
+        """
+        now = time.time()
+        rows = []
+        for key, data_set_meta_info in keys_and_data_set_meta_infos:
+            serialized_data_set_meta_info = _serialize(data_set_meta_info)
+            rows.append((key, now, len(serialized_data_set_meta_info), serialized_data_set_meta_info))
+        if len(rows) == 0:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO extracted_meta_infos VALUES (?, ?, ?, ?)', rows)
+            self._evict()
+
+
+_default_extraction_cache = DefaultCache('extraction cache', EXTRACTION_CACHE_FILE_NAME, ExtractionCache)
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """
+    :return: The cache for the meta information extracted from data sets. Unless set otherwise, this is a cache in the
+    MULTIPLY home directory. None, if extracted meta information shall not be cached.
+    """
+    return _default_extraction_cache.get()
+
+
+def set_extraction_cache(extraction_cache: Optional[ExtractionCache]):
+    """
+    Sets the cache for the meta information extracted from data sets.
+    :param extraction_cache: The extraction cache. Pass None to disable caching of extracted meta information.
+    """
+    _default_extraction_cache.set(extraction_cache)
@@ -7,10 +7,8 @@ This module contains the functionality to access data from a remote directory ac
 import logging
 import os
 import re
-import requests
 import shutil
 
-from bs4 import BeautifulSoup
 from sys import stdout
 from typing import List, Sequence
 import urllib.request as urllib2
@@ -57,6 +55,8 @@ class HttpMetaInfoProvider(LocallyWrappedMetaInfoProvider):
 
     def _query_wrapped_meta_info_provider(self, query_string: str, local_data_set_meta_infos: List[DataSetMetaInfo]) \
             -> List[DataSetMetaInfo]:
+        import requests
+        from bs4 import BeautifulSoup
         data_set_meta_infos = []
         queried_data_types = self.get_data_types_from_query_string(query_string)
         may_continue = False
@@ -75,6 +75,7 @@ class HttpMetaInfoProvider(LocallyWrappedMetaInfoProvider):
         links = soup.find_all('a')
 
         roi = self.get_roi_from_query_string(query_string)
+        local_identity_keys = self._get_identity_keys(local_data_set_meta_infos)
         start_time = self.get_start_time_from_query_string(query_string)
         end_time = self.get_end_time_from_query_string(query_string)
         for data_type in queried_data_types:
@@ -86,7 +87,7 @@ class HttpMetaInfoProvider(LocallyWrappedMetaInfoProvider):
             for file in available_files:
                 if is_valid_for(file, data_type, roi, start_time, end_time):
                     data_set_meta_info = get_data_set_meta_info(data_type, file)
-                    if not self._is_provided_locally(data_set_meta_info, local_data_set_meta_infos):
+                    if not self._is_provided_locally(data_set_meta_info, local_identity_keys):
                         data_set_meta_infos.append(data_set_meta_info)
         return data_set_meta_infos
 
@@ -136,6 +137,8 @@ class HttpFileSystem(LocallyWrappedFileSystem):
         return file_refs
 
     def _download_url(self, url: str, destination_dir: str, file_name: str) -> bool:
+        import requests
+        from bs4 import BeautifulSoup
         destination = os.path.join(destination_dir, file_name)
         try:
             request = requests.get(url, stream=True)
@@ -1,18 +1,177 @@
 from .data_access import DataSetMetaInfo, MetaInfoProvider, MetaInfoProviderAccessor
 from multiply_core.util import get_time_from_string
-from typing import List, Optional, Sequence
+from datetime import datetime
+from typing import List, Optional, Sequence, Set, Tuple
+from shapely.geometry import Polygon
+from shapely.prepared import PreparedGeometry, prep
 from shapely.wkt import loads
+import bisect
+import calendar
 import json
+import logging
+import math
 import os
 
 __author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
 
 _NAME = 'JsonMetaInfoProvider'
+_GRID_CELL_SIZE = 10.0
+_JOURNAL_SUFFIX = '.journal'
+_MIN_JOURNAL_SIZE_FOR_COMPACTION = 1000
+_ADD = 'add'
+_REMOVE = 'remove'
+_DATA_SET_INFO_KEYS = ['coverage', 'start_time', 'end_time', 'data_type', 'name']
+
+
+class _CoverageIndex(object):
+    """
+    A spatial index on the coverages of data sets. The bounding box of each coverage is registered in the cells of a
+    regular grid, so that the candidates for a region of interest can be found without looking at every coverage.
+    Exact intersection tests are only performed on these candidates.
+    """
+
+    def __init__(self, cell_size: float = _GRID_CELL_SIZE):
+        self._cell_size = cell_size
+        self._cells = {}
+        self._cells_of_keys = {}
+        self._geometries = {}
+        self._unbounded_keys = set()
+
+    def insert(self, key: int, coverage: Optional[str]):
+        if coverage is None or coverage == '':
+            self._unbounded_keys.add(key)
+            return
+        geometry = loads(coverage)
+        if geometry.is_empty:
+            self._unbounded_keys.add(key)
+            return
+        cells = self._get_cells(geometry.bounds)
+        for cell in cells:
+            if cell not in self._cells:
+                self._cells[cell] = set()
+            self._cells[cell].add(key)
+        self._cells_of_keys[key] = cells
+        self._geometries[key] = geometry
+
+    def remove(self, key: int):
+        self._unbounded_keys.discard(key)
+        self._geometries.pop(key, None)
+        for cell in self._cells_of_keys.pop(key, []):
+            self._cells[cell].discard(key)
+            if len(self._cells[cell]) == 0:
+                del self._cells[cell]
+
+    def query(self, roi: Polygon, restrict_to: Optional[Set[int]] = None,
+              prepared_roi: Optional[PreparedGeometry] = None) -> Set[int]:
+        """
+        :param roi: The region of interest
+        :param restrict_to: If given, only data sets with these keys are considered.
+        :param prepared_roi: The prepared region of interest. Will be created from the roi if not given.
+        :return: The keys of all data sets whose coverage intersects the region of interest or which have no coverage.
+        """
+        candidates = set()
+        for cell in self._get_cells(roi.bounds):
+            if cell in self._cells:
+                candidates.update(self._cells[cell])
+        keys = set(self._unbounded_keys)
+        if restrict_to is not None:
+            candidates &= restrict_to
+            keys &= restrict_to
+        min_x, min_y, max_x, max_y = roi.bounds
+        if prepared_roi is None:
+            prepared_roi = prep(roi)
+        for key in candidates:
+            geometry = self._geometries[key]
+            geometry_min_x, geometry_min_y, geometry_max_x, geometry_max_y = geometry.bounds
+            if geometry_min_x > max_x or geometry_max_x < min_x or geometry_min_y > max_y or geometry_max_y < min_y:
+                continue
+            if prepared_roi.intersects(geometry):
+                keys.add(key)
+        return keys
+
+    def _get_cells(self, bounds: Tuple[float, float, float, float]) -> List[Tuple[int, int]]:
+        min_x, min_y, max_x, max_y = bounds
+        min_column = int(math.floor(min_x / self._cell_size))
+        max_column = int(math.floor(max_x / self._cell_size))
+        min_row = int(math.floor(min_y / self._cell_size))
+        max_row = int(math.floor(max_y / self._cell_size))
+        return [(column, row) for column in range(min_column, max_column + 1) for row in range(min_row, max_row + 1)]
+
+
+class _TimeIndex(object):
+    """
+    An index on the temporal extents of data sets. Data sets are grouped by the magnitude of their durations: data sets
+    of duration class c last less than 2 ** c seconds. Within a group, start times are kept as a list of epoch seconds
+    sorted in ascending order, so that the data sets overlapping a time window can be found by bisection, starting at
+    the bound of the group's durations before the window. Long or open-ended data sets therefore do not widen the
+    search for the others.
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._extents = {}
+
+    def insert(self, key: int, start_time: Optional[datetime], end_time: Optional[datetime]):
+        start = -math.inf if start_time is None else _to_seconds(start_time)
+        end = math.inf if end_time is None else _to_seconds(end_time)
+        duration_class = _get_duration_class(end - start)
+        if duration_class not in self._starts:
+            self._starts[duration_class] = []
+        bisect.insort(self._starts[duration_class], (start, key))
+        self._extents[key] = (start, end, duration_class)
+
+    def remove(self, key: int):
+        if key in self._extents:
+            start, end, duration_class = self._extents.pop(key)
+            starts = self._starts[duration_class]
+            del starts[bisect.bisect_left(starts, (start, key))]
+            if len(starts) == 0:
+                del self._starts[duration_class]
+
+    def query(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> Set[int]:
+        """
+        :param start_time: The start of the time window. If None, the window is open towards the past.
+        :param end_time: The end of the time window. If None, the window is open towards the future.
+        :return: The keys of all data sets whose temporal extent overlaps the time window.
+        """
+        query_start = -math.inf if start_time is None else _to_seconds(start_time)
+        query_end = math.inf if end_time is None else _to_seconds(end_time)
+        keys = set()
+        for duration_class, starts in self._starts.items():
+            # a data set may only overlap the window if it starts no earlier than its maximum duration before the window
+            lower_index = bisect.bisect_left(starts, (query_start - 2. ** duration_class, -math.inf))
+            upper_index = bisect.bisect_right(starts, (query_end, math.inf))
+            for start, key in starts[lower_index:upper_index]:
+                if self._extents[key][1] >= query_start:
+                    keys.add(key)
+        return keys
+
+
+def _get_duration_class(duration: float) -> float:
+    if duration == math.inf:
+        return math.inf
+    # the exponent e of the duration satisfies 2 ** (e - 1) <= duration < 2 ** e
+    return max(math.frexp(duration)[1], 0)
+
+
+def _to_seconds(time: datetime) -> float:
+    return calendar.timegm(time.utctimetuple()) + time.microsecond / 1e6
+
+
+def _get_file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _get_identity(data_set_info: dict) -> tuple:
+    return tuple(data_set_info.get(key) for key in _DATA_SET_INFO_KEYS)
 
 
 class JsonMetaInfoProvider(MetaInfoProvider):
     """
-    A MetaInfoProvider that retrieves its meta information from a JSON file.
+    A MetaInfoProvider that retrieves its meta information from a JSON file. Changes are not written to the JSON file
+    directly, but appended to a journal file next to it, which is replayed when the provider is loaded. Once the
+    journal has grown larger than the number of registered data sets, it is merged into the JSON file.
     """
 
     def __init__(self, path_to_json_file: str, supported_data_types: Optional[str]):
@@ -26,9 +185,18 @@ class JsonMetaInfoProvider(MetaInfoProvider):
                 os.makedirs(relative_path)
             with open(path_to_json_file, 'w') as json_file:
                 json.dump({'data_sets': []}, json_file, indent=2)
+        self._path_to_journal_file = path_to_json_file + _JOURNAL_SUFFIX
+        self._journal_size = 0
+        self._data_set_infos = {}
+        self._keys_by_identity = {}
+        self._next_key = 0
+        self._coverage_index = _CoverageIndex()
+        self._time_index = _TimeIndex()
         with open(path_to_json_file, "r") as json_file:
-            self.data_set_infos = json.load(json_file)
-            self._init_provided_data_types_and_sets()
+            for data_set_info in json.load(json_file)['data_sets']:
+                self._add_data_set_info(data_set_info)
+        self._replay_journal()
+        self._init_provided_data_types_and_sets()
 
     @classmethod
     def name(cls) -> str:
@@ -36,24 +204,20 @@ class JsonMetaInfoProvider(MetaInfoProvider):
         return _NAME
 
     def query(self, query_string: str) -> List[DataSetMetaInfo]:
-        roi = self.get_roi_from_query_string(query_string)
-        query_start_time = self.get_start_time_from_query_string(query_string)
-        query_end_time = self.get_end_time_from_query_string(query_string)
-        data_types = self.get_data_types_from_query_string(query_string)
+        query = self.get_query_from_query_string(query_string)
+        data_types = query.data_type_set
         data_set_meta_infos = []
-        for data_set_info in self.data_set_infos['data_sets']:
-            if data_set_info.get('coverage') is not None and roi is not None:
-                data_set_coverage = loads(data_set_info.get('coverage'))
-                if not roi.intersects(data_set_coverage):
-                    continue
-            if query_start_time is not None and data_set_info.get('start_time') is not None:
-                data_set_start_time = get_time_from_string(data_set_info.get('start_time'), False)
-                if query_end_time < data_set_start_time:
-                    continue
-            if query_end_time is not None and data_set_info.get('end_time') is not None:
-                data_set_end_time = get_time_from_string(data_set_info.get('end_time'), True)
-                if data_set_end_time < query_start_time:
-                    continue
+        keys = None
+        if query.start_time is not None or query.end_time is not None:
+            keys = self._time_index.query(query.start_time, query.end_time)
+        if query.roi is not None:
+            keys = self._coverage_index.query(query.roi, keys, query.prepared_roi)
+        if keys is None:
+            keys = self._data_set_infos.keys()
+        else:
+            keys = sorted(keys)
+        for key in keys:
+            data_set_info = self._data_set_infos[key]
             if data_set_info.get('data_type') in data_types:
                 data_set_meta_info = DataSetMetaInfo(coverage=data_set_info.get('coverage'),
                                                      start_time=data_set_info.get('start_time'),
@@ -82,15 +246,24 @@ class JsonMetaInfoProvider(MetaInfoProvider):
         return True
 
     def update(self, data_set_meta_info: DataSetMetaInfo):
+        self.update_many([data_set_meta_info])
+
+    def update_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        data_set_infos = [self._create_data_set_info(data_set_meta_info) for data_set_meta_info in data_set_meta_infos]
+        journal_entries = []
+        for data_set_info in data_set_infos:
+            if self._add_data_set_info(data_set_info):
+                journal_entries.append((_ADD, data_set_info))
+        self._write_to_journal(journal_entries)
+
+    def _create_data_set_info(self, data_set_meta_info: DataSetMetaInfo) -> dict:
         data_type = data_set_meta_info.data_type
         if data_type is None:
             raise ValueError('Data must have Data Type')
         if not self.provides_data_type(data_type):
             raise ValueError('Data Type {} is not provided.'.format(data_type))
-        if self._contains(data_set_meta_info):
-            return
         data_set_info = {}
-        if data_set_meta_info.coverage is not None and loads(data_set_meta_info.coverage) is not None:
+        if data_set_meta_info.geometry is not None:
             data_set_info['coverage'] = data_set_meta_info.coverage
         data_set_start_time = None
         if data_set_meta_info.start_time is not None:
@@ -106,62 +279,136 @@ class JsonMetaInfoProvider(MetaInfoProvider):
             data_set_info['end_time'] = data_set_meta_info.end_time
         data_set_info['data_type'] = data_type
         data_set_info['name'] = data_set_meta_info.identifier
-        self.data_set_infos['data_sets'].append(data_set_info)
-        self._update_json_file()
+        return data_set_info
+
+    def _add_data_set_info(self, data_set_info: dict) -> bool:
+        identity = _get_identity(data_set_info)
+        if identity in self._keys_by_identity:
+            return False
+        key = self._next_key
+        self._next_key += 1
+        self._data_set_infos[key] = data_set_info
+        self._keys_by_identity[identity] = key
+        self._coverage_index.insert(key, data_set_info.get('coverage'))
+        start_time = None
+        if data_set_info.get('start_time') is not None:
+            start_time = get_time_from_string(data_set_info.get('start_time'), False)
+        end_time = None
+        if data_set_info.get('end_time') is not None:
+            end_time = get_time_from_string(data_set_info.get('end_time'), True)
+        self._time_index.insert(key, start_time, end_time)
+        return True
+
+    def _remove_data_set_info(self, data_set_info: dict) -> bool:
+        key = self._keys_by_identity.pop(_get_identity(data_set_info), None)
+        if key is None:
+            return False
+        del self._data_set_infos[key]
+        self._coverage_index.remove(key)
+        self._time_index.remove(key)
+        return True
 
     def _contains(self, data_set_meta_info: DataSetMetaInfo):
-        #todo consider making this an interface function
-        for data_set_info in self.data_set_infos['data_sets']:
-            if data_set_info.get('coverage') != data_set_meta_info.coverage:
-                continue
-            if data_set_info.get('start_time') != data_set_meta_info.start_time:
-                continue
-            if data_set_info.get('end_time') != data_set_meta_info.end_time:
-                continue
-            if data_set_info.get('data_type') != data_set_meta_info.data_type:
-                continue
-            if data_set_info.get('name') != data_set_meta_info.identifier:
-                continue
-            return True
-        return False
+        return _get_identity(self._get_identifying_data_set_info(data_set_meta_info)) in self._keys_by_identity
 
     def remove(self, data_set_meta_info: DataSetMetaInfo):
-        for data_set_info in self.data_set_infos['data_sets']:
-            if data_set_info.get('coverage') != data_set_meta_info.coverage:
-                continue
-            if data_set_info.get('start_time') != data_set_meta_info.start_time:
-                continue
-            if data_set_info.get('end_time') != data_set_meta_info.end_time:
-                continue
-            if data_set_info.get('data_type') != data_set_meta_info.data_type:
-                continue
-            if data_set_info.get('name') != data_set_meta_info.identifier:
-                continue
-            self.data_set_infos['data_sets'].remove(data_set_info)
-        self._update_json_file()
+        self.remove_many([data_set_meta_info])
+
+    def remove_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        journal_entries = []
+        for data_set_meta_info in data_set_meta_infos:
+            data_set_info = self._get_identifying_data_set_info(data_set_meta_info)
+            if self._remove_data_set_info(data_set_info):
+                journal_entries.append((_REMOVE, data_set_info))
+        self._write_to_journal(journal_entries)
+
+    @staticmethod
+    def _get_identifying_data_set_info(data_set_meta_info: DataSetMetaInfo) -> dict:
+        return {'coverage': data_set_meta_info.coverage, 'start_time': data_set_meta_info.start_time,
+                'end_time': data_set_meta_info.end_time, 'data_type': data_set_meta_info.data_type,
+                'name': data_set_meta_info.identifier}
+
+    def _replay_journal(self):
+        if not os.path.exists(self._path_to_journal_file):
+            return
+        with open(self._path_to_journal_file, 'r') as journal_file:
+            lines = journal_file.readlines()
+        try:
+            journal_of = json.loads(lines[0])['journal_of']
+        except (IndexError, KeyError, ValueError):
+            journal_of = None
+        if journal_of != _get_file_signature(self.path_to_json_file):
+            # the journal belongs to an earlier state of the json file which already contains its changes
+            logging.info('Discarding outdated journal {}'.format(self._path_to_journal_file))
+            os.remove(self._path_to_journal_file)
+            return
+        complete_lines = lines[:1]
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry['operation'] == _ADD:
+                self._add_data_set_info(entry['data_set'])
+            elif entry['operation'] == _REMOVE:
+                self._remove_data_set_info(entry['data_set'])
+            self._journal_size += 1
+            complete_lines.append(line)
+        if len(complete_lines) < len(lines) or not lines[-1].endswith('\n'):
+            # the journal has not been written completely, e.g., because the process writing it was interrupted.
+            # Cut it back to its complete entries, as entries appended after an incomplete one could not be read.
+            logging.warning('Discarding incomplete entry in journal {}'.format(self._path_to_journal_file))
+            self._rewrite_journal(complete_lines)
+
+    def _rewrite_journal(self, lines: List[str]):
+        temp_file_path = self._path_to_journal_file + '.tmp'
+        with open(temp_file_path, 'w') as journal_file:
+            for line in lines:
+                journal_file.write(line if line.endswith('\n') else line + '\n')
+        os.replace(temp_file_path, self._path_to_journal_file)
+
+    def _write_to_journal(self, journal_entries: List[Tuple[str, dict]]):
+        if len(journal_entries) == 0:
+            return
+        journal_exists = os.path.exists(self._path_to_journal_file)
+        with open(self._path_to_journal_file, 'a') as journal_file:
+            if not journal_exists:
+                journal_file.write(json.dumps({'journal_of': _get_file_signature(self.path_to_json_file)}) + '\n')
+            for operation, data_set_info in journal_entries:
+                journal_file.write(json.dumps({'operation': operation, 'data_set': data_set_info}) + '\n')
+        self._journal_size += len(journal_entries)
+        if self._journal_size > max(_MIN_JOURNAL_SIZE_FOR_COMPACTION, len(self._data_set_infos)):
+            self._update_json_file()
 
     def _update_json_file(self):
-        with open(self.path_to_json_file, "w") as json_file:
-            json.dump(self.data_set_infos, json_file, indent=2)
+        """Writes all data set infos to the json file and removes the journal. The json file is replaced atomically,
+        so that it is always in a consistent state."""
+        temp_file_path = self.path_to_json_file + '.tmp'
+        with open(temp_file_path, "w") as json_file:
+            json.dump({'data_sets': list(self._data_set_infos.values())}, json_file, indent=2)
+        os.replace(temp_file_path, self.path_to_json_file)
+        if os.path.exists(self._path_to_journal_file):
+            os.remove(self._path_to_journal_file)
+        self._journal_size = 0
 
     def _init_provided_data_types_and_sets(self):
         if self.provided_data_types is not None and len(self.provided_data_types) > 0:
             removed = False
-            for data_set_info in self.data_set_infos['data_sets']:
+            for data_set_info in list(self._data_set_infos.values()):
                 if data_set_info.get('data_type') not in self.provided_data_types:
-                    self.data_set_infos['data_sets'].remove(data_set_info)
+                    self._remove_data_set_info(data_set_info)
                     removed = True
             if removed:
                 self._update_json_file()
         else:
             self.provided_data_types = []
-            for data_set_info in self.data_set_infos['data_sets']:
+            for data_set_info in self._data_set_infos.values():
                 if data_set_info.get('data_type') not in self.provided_data_types:
                     self.provided_data_types.append(data_set_info.get('data_type'))
 
     def get_all_data(self) -> Sequence[DataSetMetaInfo]:
         data_set_meta_infos = []
-        for data_set_info in self.data_set_infos['data_sets']:
+        for data_set_info in self._data_set_infos.values():
             data_set_meta_info = DataSetMetaInfo(coverage=data_set_info.get('coverage'),
                                                  start_time=data_set_info.get('start_time'),
                                                  end_time=data_set_info.get('end_time'),
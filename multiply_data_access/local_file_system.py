@@ -7,13 +7,22 @@ This module contains an implementation of a file system that allows to get and p
 from multiply_core.observations import data_validation, get_data_type_path
 from multiply_core.util import FileRef, get_days_of_month, get_mime_type, get_time_from_string, is_leap_year
 from .data_access import DataSetMetaInfo, FileSystem, FileSystemAccessor
-from .data_set_meta_info_extraction import get_data_set_meta_info
+from .data_set_meta_info_extraction import get_data_set_meta_infos
 from datetime import datetime, timedelta, MAXYEAR
 from enum import Enum
-from typing import Sequence
+from typing import List, Optional, Sequence
+import errno
 import glob
+import json
+import logging
 import os.path
 import shutil
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 __author__ = "Tonio Fincke (Brockmann Consult GmbH)"
 
@@ -23,6 +32,113 @@ _MONTH_PATTERN = 'mm'
 _YEAR_PATTERN = 'yy'
 _ALLOWED_PATTERNS = [_DATA_TYPE_PATTERN, _YEAR_PATTERN, _MONTH_PATTERN, _DAY_PATTERN]
 _NAME = 'LocalFileSystem'
+_STAGING_DIR_NAME = '.staging'
+_MANIFEST_FILE_NAME = '.scan_manifest.json'
+_MANIFEST_VERSION = 1
+# ioctl request to share the blocks of one file with another on copy-on-write file systems, see ioctl_ficlone(2)
+_FICLONE = 0x40049409
+
+PUT_MODE_COPY = 'copy'
+PUT_MODE_MOVE = 'move'
+PUT_MODE_HARDLINK = 'hardlink'
+PUT_MODE_REFLINK = 'reflink'
+PUT_MODE_SYMLINK = 'symlink'
+PUT_MODES = [PUT_MODE_COPY, PUT_MODE_MOVE, PUT_MODE_HARDLINK, PUT_MODE_REFLINK, PUT_MODE_SYMLINK]
+
+
+def _validate_put_mode(put_mode: str) -> str:
+    if put_mode not in PUT_MODES:
+        raise ValueError('Invalid put mode: {0}. Must be one of {1}'.format(put_mode, ', '.join(PUT_MODES)))
+    return put_mode
+
+
+def _link(from_path: str, to_path: str):
+    try:
+        os.link(from_path, to_path)
+    except OSError as e:
+        logging.info('Could not create hard link to {0}, will copy it instead: {1}'.format(from_path, e))
+        shutil.copy2(from_path, to_path)
+
+
+def _reflink(from_path: str, to_path: str):
+    if fcntl is not None:
+        try:
+            with open(from_path, 'rb') as from_file, open(to_path, 'wb') as to_file:
+                fcntl.ioctl(to_file.fileno(), _FICLONE, from_file.fileno())
+            shutil.copystat(from_path, to_path)
+            return
+        except OSError as e:
+            # the file system does not support copy-on-write or the files are on different file systems
+            logging.info('Could not create reflink to {0}, will copy it instead: {1}'.format(from_path, e))
+    shutil.copy2(from_path, to_path)
+
+
+def _move(from_path: str, to_path: str, staging_dir: str):
+    try:
+        os.replace(from_path, to_path)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    # the data set is on another file system, so it is copied to the staging directory first. It is on the same file
+    # system as the target, so that the data set appears at its target only when it is complete.
+    if not os.path.exists(staging_dir):
+        os.makedirs(staging_dir, exist_ok=True)
+    staging_path = os.path.join(staging_dir, uuid.uuid4().hex)
+    try:
+        if os.path.isdir(from_path):
+            shutil.copytree(from_path, staging_path)
+        else:
+            shutil.copyfile(from_path, staging_path)
+        os.replace(staging_path, to_path)
+    finally:
+        if os.path.isdir(staging_path):
+            shutil.rmtree(staging_path)
+        elif os.path.exists(staging_path):
+            os.remove(staging_path)
+    if os.path.isdir(from_path):
+        shutil.rmtree(from_path)
+    else:
+        os.remove(from_path)
+
+
+def _get_file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _to_dict(data_set_meta_info: Optional[DataSetMetaInfo]) -> Optional[dict]:
+    if data_set_meta_info is None:
+        return None
+    return {'coverage': data_set_meta_info.coverage, 'start_time': data_set_meta_info.start_time,
+            'end_time': data_set_meta_info.end_time, 'data_type': data_set_meta_info.data_type,
+            'identifier': data_set_meta_info.identifier, 'referenced_data': data_set_meta_info.referenced_data}
+
+
+def _from_dict(data_set_meta_info_as_dict: Optional[dict]) -> Optional[DataSetMetaInfo]:
+    if data_set_meta_info_as_dict is None:
+        return None
+    return DataSetMetaInfo(**data_set_meta_info_as_dict)
+
+
+def _transfer(from_path: str, to_path: str, put_mode: str, staging_dir: str):
+    if put_mode == PUT_MODE_MOVE:
+        _move(from_path, to_path, staging_dir)
+    elif put_mode == PUT_MODE_SYMLINK:
+        os.symlink(os.path.abspath(from_path), to_path)
+    elif os.path.isdir(from_path):
+        if put_mode == PUT_MODE_HARDLINK:
+            shutil.copytree(from_path, to_path, copy_function=_link)
+        elif put_mode == PUT_MODE_REFLINK:
+            shutil.copytree(from_path, to_path, copy_function=_reflink)
+        else:
+            shutil.copytree(from_path, to_path)
+    elif put_mode == PUT_MODE_HARDLINK:
+        _link(from_path, to_path)
+    elif put_mode == PUT_MODE_REFLINK:
+        _reflink(from_path, to_path)
+    else:
+        shutil.copy(from_path, to_path)
 
 
 class LocalFileSystem(FileSystem):
@@ -30,10 +146,22 @@ class LocalFileSystem(FileSystem):
     A representation of a file system on the local disk.
     """
 
-    def __init__(self, path: str, pattern: str):
+    def __init__(self, path: str, pattern: str, put_mode: str = PUT_MODE_COPY,
+                 max_extraction_workers: Optional[int] = None):
+        """
+        :param path: The root directory of the file system.
+        :param pattern: The pattern by which data sets are ordered below the root directory.
+        :param put_mode: How data sets are put into the file system, unless stated otherwise when putting them. One of
+        'copy', 'move', 'hardlink', 'reflink', and 'symlink'. Hard links and reflinks fall back to copying if the data
+        set cannot be linked.
+        :param max_extraction_workers: The maximum number of processes which extract meta information from data sets
+        when the file system is scanned. If None, one process is used per CPU.
+        """
         self.path = self._get_validated_path(path)
         pattern = self._validate_pattern(pattern)
         self.pattern = pattern
+        self.put_mode = _validate_put_mode(put_mode)
+        self.max_extraction_workers = max_extraction_workers
         self._derive_timestep(self.pattern)
 
     @classmethod
@@ -141,7 +269,24 @@ class LocalFileSystem(FileSystem):
     def can_put(self) -> bool:
         return True
 
-    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo):
+    def get_staging_dir(self) -> str:
+        """
+        :return: A directory within this file system into which data sets may be written before they are put. Data sets
+        from this directory can be moved into place by renaming them.
+        """
+        return os.path.join(self.path, _STAGING_DIR_NAME)
+
+    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo, put_mode: Optional[str] = None):
+        """
+        Puts a data set into this file system.
+        :param from_url: The path to the data set
+        :param data_set_meta_info: The meta information about the data set
+        :param put_mode: How the data set is put into the file system. One of 'copy', 'move', 'hardlink', 'reflink',
+        and 'symlink'. If None, the put mode of the file system is used. Data sets that are moved are renamed if they
+        are on the same file system, otherwise they are copied and removed afterwards.
+        :return: The meta information about the data set at its new location
+        """
+        put_mode = self.put_mode if put_mode is None else _validate_put_mode(put_mode)
         # we assume here that it suffices to consider the start time for putting a data set correctly
         data_type_path = get_data_type_path(data_set_meta_info.data_type, from_url)
         relative_path = self.path + self.pattern + data_type_path
@@ -156,13 +301,21 @@ class LocalFileSystem(FileSystem):
             relative_path = relative_path.replace('/{}/'.format(_DAY_PATTERN), '/{:02d}/'.format(time.day))
         if not from_url == relative_path:
             if os.path.isdir(from_url):
-                if os.path.exists(relative_path):
-                    shutil.rmtree(relative_path)
-                shutil.copytree(from_url, relative_path)
+                to_path = relative_path.rstrip('/')
+                if os.path.islink(to_path):
+                    os.remove(to_path)
+                elif os.path.exists(to_path):
+                    shutil.rmtree(to_path)
+                parent_dir = os.path.dirname(to_path)
+                if not os.path.exists(parent_dir):
+                    os.makedirs(parent_dir)
             else:
                 if not os.path.exists(relative_path):
                     os.makedirs(relative_path)
-                shutil.copy(from_url, relative_path)
+                to_path = os.path.join(relative_path, os.path.basename(from_url))
+                if os.path.lexists(to_path):
+                    os.remove(to_path)
+            _transfer(from_url, to_path, put_mode, self.get_staging_dir())
 
         return DataSetMetaInfo(data_set_meta_info.coverage, data_set_meta_info.start_time, data_set_meta_info.end_time,
                                data_set_meta_info.data_type, relative_path)
@@ -186,7 +339,20 @@ class LocalFileSystem(FileSystem):
             relative_path = relative_path[:relative_path[:relative_path.rfind('/')].rfind('/')]
 
     def scan(self) -> Sequence[DataSetMetaInfo]:
-        data_set_meta_infos = []
+        """
+        Retrieves the meta information of all data sets found in the file system. The meta information is kept in a
+        manifest along with the size and modification time of the files it was extracted from, so that it needs only be
+        extracted from files which are new or have changed since the last scan. The files inside of a directory which
+        is a data set are not considered.
+        :return: The meta information of all data sets in the file system
+        """
+        # the manifest is only valid as long as the same data types are known, as these determine which files are valid
+        manifest_header = {'version': _MANIFEST_VERSION, 'path': self.path, 'pattern': self.pattern,
+                           'data_types': sorted(data_validation.get_valid_types())}
+        manifest = self._read_manifest(manifest_header)
+        updated_manifest = {}
+        scanned_files = []
+        files_to_extract = []
         relative_path = self.path + self.pattern
         relative_path = relative_path.replace('/{}/'.format(_YEAR_PATTERN), '/{}/'.format('*'))
         relative_path = relative_path.replace('/{}/'.format(_MONTH_PATTERN), '/{}/'.format('*'))
@@ -198,18 +364,79 @@ class LocalFileSystem(FileSystem):
         for valid_type in valid_types:
             adjusted_relative_path = relative_path.replace('/{}/'.format(_DATA_TYPE_PATTERN), '/{}/'.format(valid_type))
             found_files = glob.glob(adjusted_relative_path + '/**', recursive=True)
+            # the contents of a directory are found right after the directory itself
+            data_set_dir = None
             for found_file in found_files:
                 found_file = found_file.replace('\\', '/')
-                data_type = data_validation.get_valid_type(found_file)
-                if data_type is not '':
-                    data_set_meta_info = get_data_set_meta_info(data_type, found_file)
-                    if data_set_meta_info is not None:
-                        data_set_meta_infos.append(data_set_meta_info)
+                if data_set_dir is not None and found_file.startswith(data_set_dir):
+                    continue
+                data_set_dir = None
+                try:
+                    signature = _get_file_signature(found_file)
+                except OSError:
+                    continue
+                entry = manifest.get(found_file)
+                if entry is None or entry[:2] != signature:
+                    data_type = data_validation.get_valid_type(found_file)
+                    entry = signature + [data_type, None]
+                    if data_type != '':
+                        files_to_extract.append((data_type, found_file))
+                updated_manifest[found_file] = entry
+                scanned_files.append(found_file)
+                if entry[2] != '' and os.path.isdir(found_file):
+                    data_set_dir = found_file.rstrip('/') + '/'
+        extracted_data_set_meta_infos = get_data_set_meta_infos(files_to_extract, self.max_extraction_workers)
+        for (data_type, found_file), data_set_meta_info in zip(files_to_extract, extracted_data_set_meta_infos):
+            updated_manifest[found_file][3] = _to_dict(data_set_meta_info)
+        data_set_meta_infos = []
+        for scanned_file in scanned_files:
+            data_set_meta_info = _from_dict(updated_manifest[scanned_file][3])
+            if data_set_meta_info is not None:
+                data_set_meta_infos.append(data_set_meta_info)
+        if updated_manifest != manifest:
+            self._write_manifest(manifest_header, updated_manifest)
         return data_set_meta_infos
 
+    def _get_manifest_file(self) -> str:
+        return os.path.join(self.path, _MANIFEST_FILE_NAME)
+
+    def _read_manifest(self, manifest_header: dict) -> dict:
+        manifest_file = self._get_manifest_file()
+        if not os.path.exists(manifest_file):
+            return {}
+        try:
+            with open(manifest_file, 'r') as stream:
+                manifest = json.load(stream)
+        except (OSError, ValueError) as e:
+            logging.warning('Could not read scan manifest from {}: {}'.format(manifest_file, e))
+            return {}
+        for key, value in manifest_header.items():
+            if manifest.get(key) != value:
+                return {}
+        return manifest.get('files', {})
+
+    def _write_manifest(self, manifest_header: dict, files: dict):
+        manifest_file = self._get_manifest_file()
+        temp_file = '{}.{}.tmp'.format(manifest_file, os.getpid())
+        try:
+            with open(temp_file, 'w') as stream:
+                manifest = dict(manifest_header)
+                manifest['files'] = files
+                json.dump(manifest, stream)
+            os.replace(temp_file, manifest_file)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning('Could not write scan manifest to {}: {}'.format(manifest_file, e))
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
     def get_parameters_as_dict(self) -> dict:
-        return {'path': self.path,
-                'pattern': self.pattern}
+        parameters = {'path': self.path,
+                      'pattern': self.pattern}
+        if self.put_mode != PUT_MODE_COPY:
+            parameters['put_mode'] = self.put_mode
+        if self.max_extraction_workers is not None:
+            parameters['max_extraction_workers'] = self.max_extraction_workers
+        return parameters
 
     def clear_cache(self):
         pass
@@ -234,4 +461,7 @@ class LocalFileSystemAccessor(FileSystemAccessor):
             raise ValueError('Required parameter path is missing')
         if 'pattern' not in parameters.keys():
             raise ValueError('Required parameter pattern is missing')
-        return LocalFileSystem(path=parameters['path'], pattern=parameters['pattern'])
+        put_mode = parameters.get('put_mode', PUT_MODE_COPY)
+        max_extraction_workers = parameters.get('max_extraction_workers')
+        return LocalFileSystem(path=parameters['path'], pattern=parameters['pattern'], put_mode=put_mode,
+                               max_extraction_workers=max_extraction_workers)
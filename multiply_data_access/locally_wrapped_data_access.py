@@ -9,15 +9,63 @@ by
 """
 
 from abc import abstractmethod
+from contextlib import contextmanager
+import hashlib
 import logging
+import os
+import tempfile
+import threading
 from multiply_core.util import FileRef
-from multiply_data_access.data_access import DataSetMetaInfo, FileSystem, MetaInfoProvider
-from multiply_data_access.local_file_system import LocalFileSystem
+from multiply_data_access.data_access import DataSetMetaInfo, FileSystem, MetaInfoProvider, Query
+from multiply_data_access.local_file_system import LocalFileSystem, PUT_MODE_MOVE
 from multiply_data_access.json_meta_info_provider import JsonMetaInfoProvider
-from typing import List, Sequence
+from multiply_data_access.sqlite_meta_info_provider import SqliteMetaInfoProvider
+from multiply_data_access.query_cache import DEFAULT_QUERY_CACHE_TTL, get_hash, get_query_cache
+from typing import Dict, List, Optional, Sequence, Set
+import json
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 __author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
 
+_LOCK_DIR_NAME = '.locks'
+_IN_PROCESS_LOCKS = {}  # type: Dict[str, list]
+_IN_PROCESS_LOCKS_LOCK = threading.Lock()
+
+
+@contextmanager
+def _single_flight(lock_dir: str, key: str):
+    """
+    Ensures that only one thread of all processes using the same lock directory is in the context for a key at a time.
+    Within a process, threads are coordinated with a lock per key, across processes with a lock file per key.
+    """
+    with _IN_PROCESS_LOCKS_LOCK:
+        if key not in _IN_PROCESS_LOCKS:
+            _IN_PROCESS_LOCKS[key] = [threading.Lock(), 0]
+        _IN_PROCESS_LOCKS[key][1] += 1
+        in_process_lock = _IN_PROCESS_LOCKS[key][0]
+    try:
+        with in_process_lock:
+            if fcntl is None:
+                yield
+                return
+            if not os.path.exists(lock_dir):
+                os.makedirs(lock_dir, exist_ok=True)
+            with open(os.path.join(lock_dir, '{}.lock'.format(key)), 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    finally:
+        with _IN_PROCESS_LOCKS_LOCK:
+            _IN_PROCESS_LOCKS[key][1] -= 1
+            if _IN_PROCESS_LOCKS[key][1] == 0:
+                del _IN_PROCESS_LOCKS[key]
+
 
 class LocallyWrappedFileSystem(FileSystem):
 
@@ -27,6 +75,13 @@ class LocallyWrappedFileSystem(FileSystem):
         if 'pattern' not in parameters.keys():
             raise ValueError('Missing parameter \'pattern\'')
         self._local_file_system = LocalFileSystem(parameters['path'], parameters['pattern'])
+        self._download_dirs = []
+        # lock files must be in the same place for all processes retrieving data for the same local file system
+        if 'temp_dir' in parameters.keys():
+            self._download_dirs.append(parameters['temp_dir'])
+            self._lock_dir = os.path.join(parameters['temp_dir'], _LOCK_DIR_NAME)
+        else:
+            self._lock_dir = os.path.join(tempfile.gettempdir(), 'multiply_data_access', _LOCK_DIR_NAME)
         self._init_wrapped_file_system(parameters)
 
     @abstractmethod
@@ -37,12 +92,33 @@ class LocallyWrappedFileSystem(FileSystem):
         file_refs = self._local_file_system.get(data_set_meta_info)
         if len(file_refs) > 0:
             return file_refs
-        file_refs_from_wrapped = self._get_from_wrapped(data_set_meta_info)
-        if len(file_refs_from_wrapped) == 0:
-            return []
-        self._local_file_system.put(file_refs_from_wrapped[0].url, data_set_meta_info)
-        self._notify_copied_to_local(data_set_meta_info)
-        return self._local_file_system.get(data_set_meta_info)
+        with _single_flight(self._lock_dir, self._get_single_flight_key(data_set_meta_info)):
+            # the data set might have been retrieved by another thread or process while waiting
+            file_refs = self._local_file_system.get(data_set_meta_info)
+            if len(file_refs) > 0:
+                return file_refs
+            file_refs_from_wrapped = self._get_from_wrapped(data_set_meta_info)
+            if len(file_refs_from_wrapped) == 0:
+                return []
+            url = file_refs_from_wrapped[0].url
+            # downloaded data sets are moved into the local file system, so that they need not be written twice
+            put_mode = PUT_MODE_MOVE if self._is_downloaded(url) else None
+            self._local_file_system.put(url, data_set_meta_info, put_mode=put_mode)
+            self._notify_copied_to_local(data_set_meta_info)
+            return self._local_file_system.get(data_set_meta_info)
+
+    def _is_downloaded(self, url: str) -> bool:
+        path = os.path.abspath(url)
+        for download_dir in self._download_dirs:
+            if path.startswith(os.path.join(os.path.abspath(download_dir), '')):
+                return True
+        return False
+
+    def _get_single_flight_key(self, data_set_meta_info: DataSetMetaInfo) -> str:
+        key = '{};{};{};{};{}'.format(os.path.abspath(self._local_file_system.path), data_set_meta_info.data_type,
+                                      data_set_meta_info.identifier, data_set_meta_info.start_time,
+                                      data_set_meta_info.end_time)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
 
     @abstractmethod
     def _get_from_wrapped(self, data_set_meta_info: DataSetMetaInfo) -> Sequence[FileRef]:
@@ -67,7 +143,8 @@ class LocallyWrappedFileSystem(FileSystem):
     def can_put(self) -> bool:
         return False
 
-    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo) -> DataSetMetaInfo:
+    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo, put_mode: Optional[str] = None) \
+            -> DataSetMetaInfo:
         raise UserWarning('Method not supported')
 
     def remove(self, data_set_meta_info: DataSetMetaInfo):
@@ -81,13 +158,21 @@ class LocallyWrappedFileSystem(FileSystem):
 class LocallyWrappedMetaInfoProvider(MetaInfoProvider):
 
     def __init__(self, parameters: dict):
-        if 'path_to_json_file' not in parameters.keys():
-            raise ValueError('Missing path to json file')
+        if 'path_to_json_file' not in parameters.keys() and 'path_to_sqlite_file' not in parameters.keys():
+            raise ValueError('Missing path to json or sqlite file')
         if 'supported_data_types' in parameters.keys():
             provided_data_types = parameters['supported_data_types']
         else:
             provided_data_types = ','.join(self.get_provided_data_types())
-        self._json_meta_info_provider = JsonMetaInfoProvider(parameters['path_to_json_file'], provided_data_types)
+        if 'path_to_sqlite_file' in parameters.keys():
+            self._local_meta_info_provider = SqliteMetaInfoProvider(parameters['path_to_sqlite_file'],
+                                                                    provided_data_types)
+        else:
+            self._local_meta_info_provider = JsonMetaInfoProvider(parameters['path_to_json_file'],
+                                                                  provided_data_types)
+        self._query_cache_ttl = None
+        if 'query_cache_ttl' in parameters.keys():
+            self._query_cache_ttl = float(parameters['query_cache_ttl'])
         self._init_wrapped_meta_info_provider(parameters)
 
     @abstractmethod
@@ -96,35 +181,79 @@ class LocallyWrappedMetaInfoProvider(MetaInfoProvider):
         To be called instead of __init__"""
 
     def query(self, query_string: str) -> List[DataSetMetaInfo]:
-        local_data_meta_set_infos = self._json_meta_info_provider.query(query_string)
-        wrapped_data_set_meta_infos = self._query_wrapped_meta_info_provider(query_string, local_data_meta_set_infos)
-        to_be_appended = []
+        local_data_meta_set_infos = self._local_meta_info_provider.query(query_string)
+        wrapped_data_set_meta_infos = self._get_wrapped_data_set_meta_infos(query_string, local_data_meta_set_infos)
+        local_identity_keys = self._get_identity_keys(local_data_meta_set_infos)
         for wrapped_data_set_meta_info in wrapped_data_set_meta_infos:
-            already_contained = False
-            for local_data_meta_set_info in local_data_meta_set_infos:
-                if wrapped_data_set_meta_info.equals(local_data_meta_set_info):
-                    already_contained = True
-                    break
-            if not already_contained:
-                to_be_appended.append(wrapped_data_set_meta_info)
-        for data_set_meta_info in to_be_appended:
-            local_data_meta_set_infos.append(data_set_meta_info)
+            if not self._is_provided_locally(wrapped_data_set_meta_info, local_identity_keys):
+                local_identity_keys.add(wrapped_data_set_meta_info.identity_key)
+                local_data_meta_set_infos.append(wrapped_data_set_meta_info)
         return local_data_meta_set_infos
 
     def query_local(self, query_string: str) -> List[DataSetMetaInfo]:
-        return self._json_meta_info_provider.query(query_string)
+        return self._local_meta_info_provider.query(query_string)
 
     def query_non_local(self, query_string: str) -> List[DataSetMetaInfo]:
-        local_data_meta_set_infos = self._json_meta_info_provider.query(query_string)
-        return self._query_wrapped_meta_info_provider(query_string, local_data_meta_set_infos)
+        local_data_meta_set_infos = self._local_meta_info_provider.query(query_string)
+        return self._get_wrapped_data_set_meta_infos(query_string, local_data_meta_set_infos)
+
+    def _get_wrapped_data_set_meta_infos(self, query_string: str, local_data_set_meta_infos: List[DataSetMetaInfo]) \
+            -> List[DataSetMetaInfo]:
+        query_cache = get_query_cache()
+        query_cache_ttl = self.get_query_cache_ttl()
+        if query_cache is None or query_cache_ttl <= 0:
+            return self._query_wrapped_meta_info_provider(query_string, local_data_set_meta_infos)
+        query = self.get_query_from_query_string(query_string)
+        query_cache_key = self._get_query_cache_key(query)
+        local_identity_keys = self._get_identity_keys(local_data_set_meta_infos)
+        cached_data_set_meta_infos = query_cache.find(query_cache_key, self._get_query_cache_provider_key(), query,
+                                                      query_cache_ttl, local_identity_keys)
+        if cached_data_set_meta_infos is not None:
+            logging.info('Retrieved result of query for {} from query cache'.format(self.name()))
+            return [data_set_meta_info for data_set_meta_info in cached_data_set_meta_infos
+                    if not self._is_provided_locally(data_set_meta_info, local_identity_keys)]
+        wrapped_data_set_meta_infos = self._query_wrapped_meta_info_provider(query_string, local_data_set_meta_infos)
+        # empty results are not cached, as they might be caused by a failed connection
+        if len(wrapped_data_set_meta_infos) > 0:
+            query_cache.put(query_cache_key, self._get_query_cache_provider_key(), query, wrapped_data_set_meta_infos,
+                            local_data_set_meta_infos)
+        return wrapped_data_set_meta_infos
+
+    def get_query_cache_ttl(self) -> float:
+        """
+        :return: The time in seconds for which results of queries to the wrapped meta info provider are cached.
+        """
+        if self._query_cache_ttl is None:
+            return DEFAULT_QUERY_CACHE_TTL
+        return self._query_cache_ttl
+
+    def invalidate_query_cache(self):
+        """
+        Removes the cached results of queries to the wrapped meta info provider.
+        """
+        query_cache = get_query_cache()
+        if query_cache is not None:
+            query_cache.invalidate(self._get_query_cache_provider_key())
+
+    def _get_query_cache_provider_key(self) -> str:
+        wrapped_parameters = json.dumps(self._get_wrapped_parameters_as_dict(), sort_keys=True)
+        return get_hash('{};{};{}'.format(self.name(), wrapped_parameters, ','.join(self.get_provided_data_types())))
+
+    def _get_query_cache_key(self, query: Query) -> str:
+        roi = query.roi.wkt if query.roi is not None else ''
+        start_time = query.start_time.isoformat() if query.start_time is not None else ''
+        end_time = query.end_time.isoformat() if query.end_time is not None else ''
+        data_types = ','.join(sorted(query.data_type_set))
+        return get_hash('{};{};{};{};{}'.format(self._get_query_cache_provider_key(), roi, start_time, end_time,
+                                                data_types))
 
     @staticmethod
-    def _is_provided_locally(data_set_meta_info: DataSetMetaInfo,
-                                 local_data_set_meta_infos: List[DataSetMetaInfo]) -> bool:
-        for local_data_set_meta_info in local_data_set_meta_infos:
-            if local_data_set_meta_info.equals(data_set_meta_info):
-                return True
-        return False
+    def _get_identity_keys(data_set_meta_infos: List[DataSetMetaInfo]) -> Set[tuple]:
+        return set([data_set_meta_info.identity_key for data_set_meta_info in data_set_meta_infos])
+
+    @staticmethod
+    def _is_provided_locally(data_set_meta_info: DataSetMetaInfo, local_identity_keys: Set[tuple]) -> bool:
+        return data_set_meta_info.identity_key in local_identity_keys
 
     @abstractmethod
     def _query_wrapped_meta_info_provider(self, query_string: str, local_data_set_meta_infos: List[DataSetMetaInfo]) \
@@ -132,10 +261,12 @@ class LocallyWrappedMetaInfoProvider(MetaInfoProvider):
         """Queries a wrapped file system."""
 
     def _get_parameters_as_dict(self) -> dict:
-        local_parameters = self._json_meta_info_provider._get_parameters_as_dict()
+        local_parameters = self._local_meta_info_provider._get_parameters_as_dict()
         del local_parameters['supported_data_types']
         wrapped_parameters = self._get_wrapped_parameters_as_dict()
         local_parameters.update(wrapped_parameters)
+        if self._query_cache_ttl is not None:
+            local_parameters['query_cache_ttl'] = self._query_cache_ttl
         return local_parameters
 
     @abstractmethod
@@ -145,7 +276,7 @@ class LocallyWrappedMetaInfoProvider(MetaInfoProvider):
         """
 
     def notify_got(self, data_set_meta_info: DataSetMetaInfo):
-        self._json_meta_info_provider.update(data_set_meta_info)
+        self._local_meta_info_provider.update(data_set_meta_info)
 
     def can_update(self) -> bool:
         return True
@@ -153,10 +284,19 @@ class LocallyWrappedMetaInfoProvider(MetaInfoProvider):
     def update(self, data_set_meta_info: DataSetMetaInfo):
         logging.info('Updating local meta info provider, not remote')
         if self.provides_data_type(data_set_meta_info.data_type):
-            self._json_meta_info_provider.update(data_set_meta_info)
+            self._local_meta_info_provider.update(data_set_meta_info)
+
+    def update_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        logging.info('Updating local meta info provider, not remote')
+        provided_data_set_meta_infos = [data_set_meta_info for data_set_meta_info in data_set_meta_infos
+                                        if self.provides_data_type(data_set_meta_info.data_type)]
+        self._local_meta_info_provider.update_many(provided_data_set_meta_infos)
 
     def remove(self, data_set_meta_info: DataSetMetaInfo):
-        self._json_meta_info_provider.remove(data_set_meta_info)
+        self._local_meta_info_provider.remove(data_set_meta_info)
+
+    def remove_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        self._local_meta_info_provider.remove_many(data_set_meta_infos)
 
     def get_all_data(self) -> Sequence[DataSetMetaInfo]:
-        return self._json_meta_info_provider.get_all_data()
+        return self._local_meta_info_provider.get_all_data()
@@ -2,7 +2,6 @@ import base64
 import datetime
 import logging
 import os
-import osr
 import re
 import shutil
 from sys import stdout
@@ -14,7 +13,7 @@ from multiply_core.util import FileRef, get_mime_type, get_time_from_string
 from multiply_core.observations import DataTypeConstants
 from multiply_data_access.data_access import DataSetMetaInfo, FileSystemAccessor, MetaInfoProviderAccessor
 from multiply_data_access.locally_wrapped_data_access import LocallyWrappedFileSystem, LocallyWrappedMetaInfoProvider
-from multiply_data_access.modis_tile_coverage_provider import get_tile_coverage
+from multiply_data_access.modis_tile_coverage_provider import get_tile_coverage, get_wgs84_to_modis_transformation
 from typing import List, Sequence
 
 __author__ = 'Tonio Fincke (Brockmann Consult GmbH),' \
@@ -40,13 +39,6 @@ class LpDaacMetaInfoProvider(LocallyWrappedMetaInfoProvider):
         return _META_INFO_PROVIDER_NAME
 
     def _init_wrapped_meta_info_provider(self, parameters: dict) -> None:
-        wgs84_srs = osr.SpatialReference()  # Define a SpatialReference object
-        wgs84_srs.ImportFromEPSG(4326)  # And set it to WGS84 using the EPSG code
-        modis_sinu_srs = osr.SpatialReference()  # define the SpatialReference object
-        modis_sinu_srs.ImportFromProj4(
-            "+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +a=6371007.181 +b=6371007.181 +units=m +no_defs")
-        self._wgs84_to_modis = osr.CoordinateTransformation(wgs84_srs, modis_sinu_srs)
-        self._modis_to_wgs84 = osr.CoordinateTransformation(modis_sinu_srs, wgs84_srs)
         if 'supported_data_types' not in parameters:
             # use this as default for backwards compatibility
             self._supported_data_types = [DataTypeConstants.MODIS_MCD_43]
@@ -137,7 +129,7 @@ class LpDaacMetaInfoProvider(LocallyWrappedMetaInfoProvider):
         return h_id_range, v_id_range
 
     def _get_h_v_tile_ids(self, min_x: float, min_y: float) -> (int, int):
-        h, v, z = self._wgs84_to_modis.TransformPoint(min_x, min_y)
+        h, v, z = get_wgs84_to_modis_transformation().TransformPoint(min_x, min_y)
         h_id = int((h - _M_Y0) / _Y_STEP)
         v_id = int((v - _M_X0) / _X_STEP)
         return h_id, v_id
@@ -1,4 +1,4 @@
-import osr
+from functools import lru_cache
 from shapely.geometry import LineString, Point, Polygon
 from typing import Optional
 
@@ -25,12 +25,36 @@ _H_MIN = [14, 11, 9, 6, 4, 2, 1, 0, 0, 0, 0, 1, 2, 4, 6, 9, 11, 14]
 _H_MAX = [21, 24, 26, 29, 31, 33, 34, 35, 35, 35, 35, 34, 33, 31, 29, 26, 24, 21]
 _MERIDIAN = LineString([[0.0, 90.0], [0.0, -90.0]])
 
-wgs84_srs = osr.SpatialReference()  # Define a SpatialReference object
-wgs84_srs.ImportFromEPSG(4326)  # And set it to WGS84 using the EPSG code
-modis_sinu_srs = osr.SpatialReference()  # define the SpatialReference object
-modis_sinu_srs.ImportFromProj4(
-    "+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +a=6371007.181 +b=6371007.181 +units=m +no_defs")
-_modis_to_wgs84 = osr.CoordinateTransformation(modis_sinu_srs, wgs84_srs)
+_MODIS_SINUSOIDAL_PROJ4 = '+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +a=6371007.181 +b=6371007.181 +units=m +no_defs'
+
+
+def _get_spatial_reference_systems() -> tuple:
+    import osr
+    wgs84_srs = osr.SpatialReference()  # Define a SpatialReference object
+    wgs84_srs.ImportFromEPSG(4326)  # And set it to WGS84 using the EPSG code
+    modis_sinu_srs = osr.SpatialReference()  # define the SpatialReference object
+    modis_sinu_srs.ImportFromProj4(_MODIS_SINUSOIDAL_PROJ4)
+    return wgs84_srs, modis_sinu_srs
+
+
+@lru_cache(maxsize=1)
+def get_modis_to_wgs84_transformation():
+    """
+    :return: The transformation from the MODIS sinusoidal grid to WGS84. It is created on first use.
+    """
+    import osr
+    wgs84_srs, modis_sinu_srs = _get_spatial_reference_systems()
+    return osr.CoordinateTransformation(modis_sinu_srs, wgs84_srs)
+
+
+@lru_cache(maxsize=1)
+def get_wgs84_to_modis_transformation():
+    """
+    :return: The transformation from WGS84 to the MODIS sinusoidal grid. It is created on first use.
+    """
+    import osr
+    wgs84_srs, modis_sinu_srs = _get_spatial_reference_systems()
+    return osr.CoordinateTransformation(wgs84_srs, modis_sinu_srs)
 
 
 def get_tile_coverage(h: int, v: int) -> Optional[Polygon]:
@@ -40,14 +64,15 @@ def get_tile_coverage(h: int, v: int) -> Optional[Polygon]:
     sinu_max_lat = (h + 1) * _Y_STEP + _M_Y0
     sinu_min_lon = v * _X_STEP + _M_X0
     sinu_max_lon = (v + 1) * _X_STEP + _M_X0
+    modis_to_wgs84 = get_modis_to_wgs84_transformation()
     points = []
-    lat0, lon0, z0 = _modis_to_wgs84.TransformPoint(sinu_min_lat, sinu_min_lon)
+    lat0, lon0, z0 = modis_to_wgs84.TransformPoint(sinu_min_lat, sinu_min_lon)
     points.append(Point(lat0, lon0))
-    lat2, lon2, z2 = _modis_to_wgs84.TransformPoint(sinu_max_lat, sinu_min_lon)
+    lat2, lon2, z2 = modis_to_wgs84.TransformPoint(sinu_max_lat, sinu_min_lon)
     points.append(Point(lat2, lon2))
-    lat3, lon3, z3 = _modis_to_wgs84.TransformPoint(sinu_max_lat, sinu_max_lon)
+    lat3, lon3, z3 = modis_to_wgs84.TransformPoint(sinu_max_lat, sinu_max_lon)
     points.append(Point(lat3, lon3))
-    lat1, lon1, z1 = _modis_to_wgs84.TransformPoint(sinu_min_lat, sinu_max_lon)
+    lat1, lon1, z1 = modis_to_wgs84.TransformPoint(sinu_min_lat, sinu_max_lon)
     points.append(Point(lat1, lon1))
     points.append(Point(lat0, lon0))
     polygon = Polygon([[p.x, p.y] for p in points])
@@ -4,13 +4,10 @@ Description
 
 This module contains the functionality to access data from the MUNDI DIAS.
 """
-from bs4 import BeautifulSoup
 from datetime import datetime
-from lxml.etree import XML
 import glob
 import logging
 import os
-import requests
 import shutil
 import time
 from http.cookiejar import CookieJar
@@ -84,6 +81,7 @@ def _convert_mundi_coverage(mundi_coverage_string: str):
 
 
 def _get_provided_data_types() -> List[str]:
+    from lxml.etree import XML
     collections_description_url = '{}{}'.format(_BASE_URL, _COLLECTIONS_DESCRIPTIONS_ADDITION)
     descriptions = urllib2.urlopen(collections_description_url).read()
     descriptions_root = XML(descriptions)
@@ -134,11 +132,14 @@ class LocallyWrappedMundiMetaInfoProvider(LocallyWrappedMetaInfoProvider):
 
     def _query_wrapped_meta_info_provider(self, query_string: str, local_data_set_meta_infos: List[DataSetMetaInfo]) -> \
             List[DataSetMetaInfo]:
+        import requests
+        from lxml.etree import XML
         roi = dumps(self.get_roi_from_query_string(query_string))
         data_types = self.get_data_types_from_query_string(query_string)
         start_time = datetime.strftime(self.get_start_time_from_query_string(query_string), "%Y-%m-%dT%H:%M:%SZ")
         end_time = datetime.strftime(self.get_end_time_from_query_string(query_string), "%Y-%m-%dT%H:%M:%SZ")
         data_set_meta_infos = []
+        local_identity_keys = self._get_identity_keys(local_data_set_meta_infos)
         for data_type in data_types:
             if self.provides_data_type(data_type):
                 run = 0
@@ -164,7 +165,7 @@ class LocallyWrappedMundiMetaInfoProvider(LocallyWrappedMetaInfoProvider):
                             data_set_meta_info = DataSetMetaInfo(data_set_meta_info_coverage, data_set_meta_info_time,
                                                                  data_set_meta_info_time, data_type,
                                                                  data_set_meta_info_id)
-                            if not self._is_provided_locally(data_set_meta_info, local_data_set_meta_infos):
+                            if not self._is_provided_locally(data_set_meta_info, local_identity_keys):
                                 data_set_meta_infos.append(data_set_meta_info)
                             continue_checking_for_data_sets = True
         return data_set_meta_infos
@@ -218,6 +219,8 @@ class MundiMetaInfoProvider(MetaInfoProvider):
         return []
 
     def query_non_local(self, query_string: str) -> List[DataSetMetaInfo]:
+        import requests
+        from lxml.etree import XML
         roi = dumps(self.get_roi_from_query_string(query_string))
         data_types = self.get_data_types_from_query_string(query_string)
         start_time = datetime.strftime(self.get_start_time_from_query_string(query_string), "%Y-%m-%dT%H:%M:%SZ")
@@ -445,6 +448,8 @@ class MundiRestFileSystem(LocallyWrappedFileSystem):
         return file_refs
 
     def _download_url(self, url: str, file_name: str, bucket: str, excludes: List[str]) -> bool:
+        import requests
+        from bs4 import BeautifulSoup
         try:
             request = requests.get(url, stream=True)
         except ConnectionError:
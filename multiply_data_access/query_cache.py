@@ -0,0 +1,253 @@
+"""
+Description
+===========
+
+This module contains a persistent cache for the results of queries to remote catalogues. Results are kept in an SQLite
+database so that they are shared between processes. Entries expire after a time to live which is set by the querying
+meta info provider. When the cache exceeds its maximum size, the least recently used entries are evicted.
+"""
+from .data_access import DataSetMetaInfo, Query
+from .sqlite_cache import DefaultCache, SqliteLruCache
+from datetime import datetime
+from multiply_core.util import get_time_from_string
+from shapely.wkt import loads
+from typing import List, Optional, Sequence, Set, Tuple
+import calendar
+import hashlib
+import json
+import logging
+import time
+
+__author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
+
+QUERY_CACHE_FILE_NAME = 'query_cache.sqlite'
+DEFAULT_MAX_QUERY_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_QUERY_CACHE_TTL = 3600.
+
+_SCHEMA_VERSION = 1
+_CREATE_STATEMENTS = [
+    'CREATE TABLE IF NOT EXISTS query_results (key TEXT PRIMARY KEY, provider TEXT NOT NULL, '
+    'created REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL, local_data_set_meta_infos TEXT NOT NULL, '
+    'data_set_meta_infos TEXT NOT NULL, roi TEXT, min_x REAL, max_x REAL, min_y REAL, max_y REAL, '
+    'start_seconds REAL, end_seconds REAL, data_types TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS query_results_last_access ON query_results (last_access)',
+    'CREATE INDEX IF NOT EXISTS query_results_provider ON query_results (provider)'
+]
+
+
+def get_hash(value: str) -> str:
+    """
+    :param value: A string, e.g., a query or a representation of the parameters of a meta info provider.
+    :return: A hash of the string which may be used as a key for the query cache
+    """
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def is_within_query(data_set_meta_info: DataSetMetaInfo, query: Query) -> bool:
+    """
+    :param data_set_meta_info: A data set meta info
+    :param query: A query
+    :return: True, if the data set is of one of the queried data types and overlaps the region and time of the query
+    """
+    if data_set_meta_info.data_type not in query.data_type_set:
+        return False
+    if query.roi is not None and data_set_meta_info.geometry is not None and \
+            not query.prepared_roi.intersects(data_set_meta_info.geometry):
+        return False
+    if query.end_time is not None and data_set_meta_info.start_time is not None and \
+            get_time_from_string(data_set_meta_info.start_time, False) > query.end_time:
+        return False
+    if query.start_time is not None and data_set_meta_info.end_time is not None and \
+            get_time_from_string(data_set_meta_info.end_time, True) < query.start_time:
+        return False
+    return True
+
+
+def _to_seconds(time: Optional[datetime]) -> Optional[float]:
+    if time is None:
+        return None
+    return calendar.timegm(time.utctimetuple()) + time.microsecond / 1e6
+
+
+def _to_list(data_set_meta_info: DataSetMetaInfo) -> list:
+    return [data_set_meta_info.coverage, data_set_meta_info.start_time, data_set_meta_info.end_time,
+            data_set_meta_info.data_type, data_set_meta_info.identifier, data_set_meta_info.referenced_data]
+
+
+def _from_list(data_set_meta_info_as_list: list) -> DataSetMetaInfo:
+    return DataSetMetaInfo(coverage=data_set_meta_info_as_list[0], start_time=data_set_meta_info_as_list[1],
+                           end_time=data_set_meta_info_as_list[2], data_type=data_set_meta_info_as_list[3],
+                           identifier=data_set_meta_info_as_list[4], referenced_data=data_set_meta_info_as_list[5])
+
+
+def _serialize(data_set_meta_infos: Sequence[DataSetMetaInfo]) -> str:
+    return json.dumps([_to_list(data_set_meta_info) for data_set_meta_info in data_set_meta_infos])
+
+
+def _deserialize(serialized_data_set_meta_infos: str) -> List[DataSetMetaInfo]:
+    return [_from_list(data_set_meta_info_as_list) for data_set_meta_info_as_list in
+            json.loads(serialized_data_set_meta_infos)]
+
+
+class QueryCache(SqliteLruCache):
+    """
+    A persistent cache for the results of queries to remote catalogues. Along with a result, the cache keeps the data
+    sets that were locally available at the time of the query, as these are not part of the result, and the extent of
+    the query, so that results may also be retrieved for queries which are contained in that extent.
+    """
+
+    def __init__(self, path_to_cache_file: str, max_size: int = DEFAULT_MAX_QUERY_CACHE_SIZE):
+        """
+        :param path_to_cache_file: The path to the SQLite file in which query results are stored.
+        :param max_size: The maximum size in bytes of the stored query results.
+        """
+        super().__init__(path_to_cache_file, max_size, 'query_results', _SCHEMA_VERSION, _CREATE_STATEMENTS)
+
+    def get(self, key: str, time_to_live: float) -> Optional[Tuple[List[DataSetMetaInfo], List[DataSetMetaInfo]]]:
+        """
+        Retrieves a query result from the cache.
+        :param key: The key of the query
+        :param time_to_live: The time in seconds for which the query result is valid
+        :return: The data set meta infos of the query result together with the data set meta infos that were locally
+        available when the query was issued. None, if the cache holds no valid result for the key.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute('SELECT created, local_data_set_meta_infos, data_set_meta_infos '
+                                           'FROM query_results WHERE key = ?', (key,)).fetchone()
+            if row is None or row[0] + time_to_live < now:
+                if row is not None:
+                    self._connection.execute('DELETE FROM query_results WHERE key = ?', (key,))
+                self._misses += 1
+                return None
+            self._connection.execute('UPDATE query_results SET last_access = ? WHERE key = ?', (now, key))
+            self._hits += 1
+        return _deserialize(row[2]), _deserialize(row[1])
+
+    def find(self, key: str, provider: str, query: Query, time_to_live: float, local_identity_keys: Set[tuple]) \
+            -> Optional[List[DataSetMetaInfo]]:
+        """
+        Retrieves the result of the given query or, if there is none, the result of a query whose extent contains the
+        extent of the given query. A result is only considered if the data sets which were locally available when its
+        query was issued and which are relevant to the given query are still locally available.
+        :param key: The key of the query
+        :param provider: A key identifying the meta info provider which is queried
+        :param query: The query
+        :param time_to_live: The time in seconds for which query results are valid
+        :param local_identity_keys: The identity keys of the data sets that are locally available now
+        :return: The data set meta infos of the result, restricted to the given query. None, if there is no such
+        result.
+        """
+        conditions = ['provider = ?', 'created >= ?']
+        parameters = [provider, time.time() - time_to_live]
+        if query.roi is None:
+            conditions.append('roi IS NULL')
+        else:
+            conditions.append('(roi IS NULL OR (min_x <= ? AND max_x >= ? AND min_y <= ? AND max_y >= ?))')
+            min_x, min_y, max_x, max_y = query.roi.bounds
+            parameters.extend([min_x, max_x, min_y, max_y])
+        if query.start_time is None:
+            conditions.append('start_seconds IS NULL')
+        else:
+            conditions.append('(start_seconds IS NULL OR start_seconds <= ?)')
+            parameters.append(_to_seconds(query.start_time))
+        if query.end_time is None:
+            conditions.append('end_seconds IS NULL')
+        else:
+            conditions.append('(end_seconds IS NULL OR end_seconds >= ?)')
+            parameters.append(_to_seconds(query.end_time))
+        parameters.append(key)
+        statement = 'SELECT key, roi, data_types, local_data_set_meta_infos, data_set_meta_infos FROM query_results ' \
+                    'WHERE {} ORDER BY key = ? DESC, size'.format(' AND '.join(conditions))
+        with self._lock:
+            rows = self._connection.execute(statement, parameters).fetchall()
+        for row_key, roi, data_types, serialized_local_data_set_meta_infos, serialized_data_set_meta_infos in rows:
+            if not query.data_type_set.issubset(data_types.split(',')):
+                continue
+            if query.roi is not None and roi is not None and not loads(roi).covers(query.roi):
+                continue
+            # the result does not contain the data sets which were local then, so these must still be local now
+            is_result_of_query = row_key == key
+            is_missing_local_data_set = False
+            for local_data_set_meta_info in _deserialize(serialized_local_data_set_meta_infos):
+                if local_data_set_meta_info.identity_key not in local_identity_keys and \
+                        (is_result_of_query or is_within_query(local_data_set_meta_info, query)):
+                    is_missing_local_data_set = True
+                    break
+            if is_missing_local_data_set:
+                continue
+            with self._lock, self._connection:
+                self._connection.execute('UPDATE query_results SET last_access = ? WHERE key = ?',
+                                         (time.time(), row_key))
+                self._hits += 1
+            data_set_meta_infos = _deserialize(serialized_data_set_meta_infos)
+            if is_result_of_query:
+                logging.debug('Retrieved query result from query cache')
+                return data_set_meta_infos
+            logging.debug('Retrieved query result from result of containing query in query cache')
+            return [data_set_meta_info for data_set_meta_info in data_set_meta_infos
+                    if is_within_query(data_set_meta_info, query)]
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: str, provider: str, query: Query, data_set_meta_infos: Sequence[DataSetMetaInfo],
+            local_data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        """
+        Stores a query result in the cache. Least recently used entries are evicted if the cache grows too large.
+        :param key: The key of the query
+        :param provider: A key identifying the meta info provider which has been queried
+        :param query: The query. Its extent is stored so that contained queries may be answered from its result.
+        :param data_set_meta_infos: The data set meta infos of the query result
+        :param local_data_set_meta_infos: The data set meta infos that were locally available when the query was
+        issued
+        """
+        serialized_data_set_meta_infos = _serialize(data_set_meta_infos)
+        serialized_local_data_set_meta_infos = _serialize(local_data_set_meta_infos)
+        size = len(serialized_data_set_meta_infos) + len(serialized_local_data_set_meta_infos)
+        if size > self._max_size:
+            return
+        roi = None
+        min_x, min_y, max_x, max_y = None, None, None, None
+        if query.roi is not None:
+            roi = query.roi.wkt
+            min_x, min_y, max_x, max_y = query.roi.bounds
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO query_results VALUES '
+                                     '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     (key, provider, now, now, size, serialized_local_data_set_meta_infos,
+                                      serialized_data_set_meta_infos, roi, min_x, max_x, min_y, max_y,
+                                      _to_seconds(query.start_time), _to_seconds(query.end_time),
+                                      ','.join(sorted(query.data_type_set))))
+            self._evict()
+
+    def invalidate(self, provider: Optional[str] = None):
+        """
+        Removes query results from the cache.
+        :param provider: If given, only the query results of this meta info provider are removed.
+        """
+        with self._lock, self._connection:
+            if provider is None:
+                self._connection.execute('DELETE FROM query_results')
+            else:
+                self._connection.execute('DELETE FROM query_results WHERE provider = ?', (provider,))
+
+
+_default_query_cache = DefaultCache('query cache', QUERY_CACHE_FILE_NAME, QueryCache)
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    """
+    :return: The query cache used by meta info providers which query remote catalogues. Unless set otherwise, this is
+    a cache in the MULTIPLY home directory. None, if query results shall not be cached.
+    """
+    return _default_query_cache.get()
+
+
+def set_query_cache(query_cache: Optional[QueryCache]):
+    """
+    Sets the query cache used by meta info providers which query remote catalogues.
+    :param query_cache: The query cache. Pass None to disable caching of query results.
+    """
+    _default_query_cache.set(query_cache)
@@ -1,5 +1,16 @@
-import pkg_resources
 from multiply_data_access.data_access import FileSystem, MetaInfoProvider
+from typing import Dict, List, Optional
+import logging
+import threading
+
+try:
+    from importlib.metadata import entry_points
+except ImportError:
+    # importlib.metadata is part of the standard library from Python 3.8 on
+    try:
+        from importlib_metadata import entry_points
+    except ImportError:
+        entry_points = None
 
 __author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
 
@@ -15,34 +26,90 @@ FILE_SYSTEM_REGISTRY = []
 #: MULTIPLY plugins may extend this list by their implementations during plugin initialisation.
 META_INFO_PROVIDER_REGISTRY = []
 
+_FILE_SYSTEM_PLUGINS = 'file_system_plugins'
+_META_INFO_PROVIDER_PLUGINS = 'meta_info_provider_plugins'
+
+# accessors which have been loaded from entry points, by the name of their implementation
+_LOADED_ACCESSORS = {_FILE_SYSTEM_PLUGINS: {}, _META_INFO_PROVIDER_PLUGINS: {}}
+# entry points which have not been loaded yet, by their name
+_UNLOADED_ENTRY_POINTS = {}
+_LOCK = threading.RLock()
+
+
+def _get_unloaded_entry_points(group: str) -> Dict[str, object]:
+    if group not in _UNLOADED_ENTRY_POINTS:
+        if entry_points is None:
+            import pkg_resources
+            group_entry_points = pkg_resources.iter_entry_points(group)
+        else:
+            all_entry_points = entry_points()
+            if hasattr(all_entry_points, 'select'):
+                group_entry_points = all_entry_points.select(group=group)
+            else:
+                group_entry_points = all_entry_points.get(group, [])
+        _UNLOADED_ENTRY_POINTS[group] = dict([(entry_point.name, entry_point) for entry_point in group_entry_points])
+    return _UNLOADED_ENTRY_POINTS[group]
+
+
+def _normalize(name: str) -> str:
+    return name.replace('_', '').lower()
+
 
-def _set_up_file_system_registry():
-    registered_file_systems = pkg_resources.iter_entry_points('file_system_plugins')
-    for registered_file_system in registered_file_systems:
-        FILE_SYSTEM_REGISTRY.append(registered_file_system.load())
+def _load_entry_point(group: str, entry_point_name: str) -> Optional[object]:
+    unloaded_entry_points = _get_unloaded_entry_points(group)
+    try:
+        accessor = unloaded_entry_points[entry_point_name].load()
+        accessor_name = accessor.name()
+    except Exception as e:
+        # the entry point is kept, so that loading it is attempted again when it is needed next time
+        logging.warning('Could not load plugin {} from {}: {}'.format(entry_point_name, group, e))
+        return None
+    unloaded_entry_points.pop(entry_point_name)
+    _LOADED_ACCESSORS[group][accessor_name] = accessor
+    return accessor
 
 
-def _set_up_meta_info_provider_registry():
-    registered_meta_info_providers = pkg_resources.iter_entry_points('meta_info_provider_plugins')
-    for registered_meta_info_provider in registered_meta_info_providers:
-        META_INFO_PROVIDER_REGISTRY.append(registered_meta_info_provider.load())
+def _get_accessor(group: str, registry: List, type_name: str) -> Optional[object]:
+    """
+    Finds the accessor for an implementation. Entry points are only loaded when needed: First, the entry point whose
+    name matches the name of the implementation is tried (e.g., 'local_file_system' for 'LocalFileSystem'). Only if
+    this does not yield the implementation, the other entry points are loaded, too. Loaded accessors are remembered.
+    Entry points should therefore be named after the name of their accessor.
+    """
+    for accessor in registry:
+        if accessor.name() == type_name:
+            return accessor
+    with _LOCK:
+        if type_name in _LOADED_ACCESSORS[group]:
+            return _LOADED_ACCESSORS[group][type_name]
+        unloaded_entry_points = _get_unloaded_entry_points(group)
+        normalized_type_name = _normalize(type_name)
+        for entry_point_name in list(unloaded_entry_points.keys()):
+            if _normalize(entry_point_name) == normalized_type_name:
+                _load_entry_point(group, entry_point_name)
+                if type_name in _LOADED_ACCESSORS[group]:
+                    return _LOADED_ACCESSORS[group][type_name]
+        for entry_point_name in list(unloaded_entry_points.keys()):
+            if _normalize(entry_point_name) == normalized_type_name:
+                continue
+            _load_entry_point(group, entry_point_name)
+            if type_name in _LOADED_ACCESSORS[group]:
+                return _LOADED_ACCESSORS[group][type_name]
+    return None
 
 
 def create_file_system_from_dict(file_system_as_dict: dict) -> FileSystem:
-    if len(FILE_SYSTEM_REGISTRY) == 0:
-        _set_up_file_system_registry()
     parameters = file_system_as_dict['parameters']
-    for file_system_accessor in FILE_SYSTEM_REGISTRY:
-        if file_system_accessor.name() == file_system_as_dict['type']:
-            return file_system_accessor.create_from_parameters(parameters)
-    raise UserWarning('Could not find file system of type {0}'.format(file_system_as_dict['type']))
+    file_system_accessor = _get_accessor(_FILE_SYSTEM_PLUGINS, FILE_SYSTEM_REGISTRY, file_system_as_dict['type'])
+    if file_system_accessor is None:
+        raise UserWarning('Could not find file system of type {0}'.format(file_system_as_dict['type']))
+    return file_system_accessor.create_from_parameters(parameters)
 
 
 def create_meta_info_provider_from_dict(meta_info_provider_as_dict: dict) -> MetaInfoProvider:
-    if len(META_INFO_PROVIDER_REGISTRY) == 0:
-        _set_up_meta_info_provider_registry()
     parameters = meta_info_provider_as_dict['parameters']
-    for meta_info_provider_accessor in META_INFO_PROVIDER_REGISTRY:
-        if meta_info_provider_accessor.name() == meta_info_provider_as_dict['type']:
-            return meta_info_provider_accessor.create_from_parameters(parameters)
-    raise UserWarning('Could not find meta info provider of type {0}'.format(meta_info_provider_as_dict['type']))
+    meta_info_provider_accessor = _get_accessor(_META_INFO_PROVIDER_PLUGINS, META_INFO_PROVIDER_REGISTRY,
+                                                meta_info_provider_as_dict['type'])
+    if meta_info_provider_accessor is None:
+        raise UserWarning('Could not find meta info provider of type {0}'.format(meta_info_provider_as_dict['type']))
+    return meta_info_provider_accessor.create_from_parameters(parameters)
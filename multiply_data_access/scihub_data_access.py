@@ -6,19 +6,17 @@ This module contains the functionality to access data from the MUNDI DIAS.
 """
 from datetime import datetime
 from http.cookiejar import CookieJar
-from lxml.etree import XML
 from zipfile import ZipFile
 import base64
 import glob
 import logging
 import os
-import requests
 import shutil
 import time
 from shapely.geometry import Polygon
 from shapely.wkt import dumps
 from sys import stdout
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 import urllib.request as urllib2
 from urllib.error import HTTPError
 
@@ -38,6 +36,8 @@ _DATA_TYPE_PARAMETER_DICTS = {
     DataTypeConstants.S2_L1C: {'platformname': 'Sentinel-2', 'productType': 'S2MSI1C', 'unzip': True}
 }
 _DOWNLOAD_URL = "https://scihub.copernicus.eu/dhus/odata/v1/Products(\'{}\')/$value"
+# SciHub allows only two concurrent downloads per user
+_MAX_CONCURRENT_GETS = 2
 
 
 class SciHubMetaInfoProvider(LocallyWrappedMetaInfoProvider):
@@ -56,11 +56,14 @@ class SciHubMetaInfoProvider(LocallyWrappedMetaInfoProvider):
 
     def _query_wrapped_meta_info_provider(self, query_string: str,
                                           local_data_set_meta_infos: List[DataSetMetaInfo]) -> List[DataSetMetaInfo]:
+        import requests
+        from lxml.etree import XML
         roi = dumps(self.get_roi_from_query_string(query_string))
         data_types = self.get_data_types_from_query_string(query_string)
         start_time = datetime.strftime(self.get_start_time_from_query_string(query_string), "%Y-%m-%dT%H:%M:%SZ")
         end_time = datetime.strftime(self.get_end_time_from_query_string(query_string), "%Y-%m-%dT%H:%M:%SZ")
         data_set_meta_infos = []
+        local_identity_keys = self._get_identity_keys(local_data_set_meta_infos)
         for data_type in data_types:
             if self.provides_data_type(data_type):
                 run = 0
@@ -96,7 +99,7 @@ class SciHubMetaInfoProvider(LocallyWrappedMetaInfoProvider):
                                 DataSetMetaInfo(data_set_meta_info_coverage, data_set_meta_info_start_time,
                                                 data_set_meta_info_end_time, data_type, data_set_meta_info_id,
                                                 data_set_meta_info_reference)
-                            if not self._is_provided_locally(data_set_meta_info, local_data_set_meta_infos):
+                            if not self._is_provided_locally(data_set_meta_info, local_identity_keys):
                                 data_set_meta_infos.append(data_set_meta_info)
                             continue_checking_for_data_sets = True
                     response.close()
@@ -234,6 +237,9 @@ class SciHubFileSystem(LocallyWrappedFileSystem):
     def _get_wrapped_parameters_as_dict(self) -> dict:
         return {'username': self._username, 'password': self._password, 'temp_dir': self._temp_dir}
 
+    def get_max_concurrent_gets(self) -> Optional[int]:
+        return _MAX_CONCURRENT_GETS
+
     def clear_cache(self):
         if os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir)
@@ -0,0 +1,133 @@
+"""
+Description
+===========
+
+This module contains the base of the persistent caches of this package. Entries are kept in a table of an SQLite
+database so that they are shared between processes. When the cache exceeds its maximum size, the least recently used
+entries are evicted.
+"""
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+import logging
+import os
+import sqlite3
+import threading
+
+__author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
+
+
+class SqliteLruCache(object):
+    """
+    The base of a persistent cache which keeps its entries in a single table of an SQLite database. The table must
+    have the columns 'key', 'last_access' and 'size', the latter holding the size of an entry in bytes. Subclasses
+    define the table and access it through the connection, while holding the lock.
+    """
+
+    def __init__(self, path_to_cache_file: str, max_size: int, table_name: str, schema_version: int,
+                 create_statements: Sequence[str]):
+        """
+        :param path_to_cache_file: The path to the SQLite file in which the entries are stored.
+        :param max_size: The maximum size in bytes of the stored entries.
+        :param table_name: The name of the table which holds the entries.
+        :param schema_version: The version of the schema of the table. Entries stored with another version are dropped.
+        :param create_statements: The statements which create the table and its indexes, if they do not exist.
+        """
+        self._path_to_cache_file = path_to_cache_file
+        self._max_size = max_size
+        self._table_name = table_name
+        self._hits = 0
+        self._misses = 0
+        relative_path = os.path.dirname(path_to_cache_file)
+        if relative_path != '' and not os.path.exists(relative_path):
+            os.makedirs(relative_path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path_to_cache_file, timeout=30., check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] != schema_version:
+                self._connection.execute('DROP TABLE IF EXISTS {}'.format(table_name))
+                self._connection.execute('PRAGMA user_version = {}'.format(schema_version))
+            for create_statement in create_statements:
+                self._connection.execute(create_statement)
+
+    @property
+    def path_to_cache_file(self) -> str:
+        """The path to the file in which the entries are stored."""
+        return self._path_to_cache_file
+
+    @property
+    def hits(self) -> int:
+        """The number of look-ups which could be answered from this cache."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """The number of look-ups which could not be answered from this cache."""
+        return self._misses
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache does not exceed its maximum size. Must be called
+        while holding the lock, within a transaction."""
+        total_size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM {}'.format(self._table_name)).\
+            fetchone()[0]
+        if total_size <= self._max_size:
+            return
+        evicted_keys = []
+        for key, size in self._connection.execute('SELECT key, size FROM {} ORDER BY last_access'.
+                                                  format(self._table_name)):
+            if total_size <= self._max_size:
+                break
+            evicted_keys.append((key,))
+            total_size -= size
+        self._connection.executemany('DELETE FROM {} WHERE key = ?'.format(self._table_name), evicted_keys)
+        logging.info('Evicted {} entries from {}'.format(len(evicted_keys), os.path.basename(self._path_to_cache_file)))
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM {}'.format(self._table_name))
+
+
+_NOT_SET = object()
+
+
+class DefaultCache(object):
+    """
+    Holds the cache which is used unless set otherwise. Unless set, this is a cache in the MULTIPLY home directory which
+    is created when it is first requested.
+    """
+
+    def __init__(self, name: str, file_name: str, create_cache: Callable[[str], SqliteLruCache]):
+        """
+        :param name: The name of the cache, used in log messages
+        :param file_name: The name of the file of the cache in the MULTIPLY home directory
+        :param create_cache: Creates the cache from the path to its file
+        """
+        self._name = name
+        self._file_name = file_name
+        self._create_cache = create_cache
+        self._cache = _NOT_SET
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[SqliteLruCache]:
+        """
+        :return: The cache. None, if caching is disabled or if the cache could not be opened.
+        """
+        with self._lock:
+            if self._cache is _NOT_SET:
+                path_to_cache_file = os.path.join(str(Path.home()), '.multiply', self._file_name)
+                try:
+                    self._cache = self._create_cache(path_to_cache_file)
+                except (OSError, sqlite3.Error) as e:
+                    logging.warning('Could not open {} at {}: {}'.format(self._name, path_to_cache_file, e))
+                    self._cache = None
+            return self._cache
+
+    def set(self, cache: Optional[SqliteLruCache]):
+        """
+        :param cache: The cache to be used. Pass None to disable caching.
+        """
+        with self._lock:
+            self._cache = cache
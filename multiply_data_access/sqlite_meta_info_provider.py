@@ -0,0 +1,206 @@
+"""
+Description
+===========
+
+This module contains a MetaInfoProvider that keeps its meta information in an SQLite database. Coverages are indexed
+in an R*Tree, times are stored as indexed epoch seconds. It is meant for catalogues which are too large to be held in a
+single JSON file.
+"""
+from .data_access import DataSetMetaInfo, MetaInfoProvider, MetaInfoProviderAccessor
+from multiply_core.util import get_time_from_string
+from datetime import datetime
+from typing import List, Optional, Sequence
+import calendar
+import json
+import os
+import sqlite3
+import threading
+
+__author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
+
+_NAME = 'SqliteMetaInfoProvider'
+
+_CREATE_STATEMENTS = [
+    'CREATE TABLE IF NOT EXISTS data_sets (id INTEGER PRIMARY KEY, identity TEXT NOT NULL UNIQUE, coverage TEXT, '
+    'start_time TEXT, end_time TEXT, start_seconds INTEGER, end_seconds INTEGER, data_type TEXT NOT NULL, name TEXT)',
+    'CREATE INDEX IF NOT EXISTS data_sets_start_seconds ON data_sets (start_seconds)',
+    'CREATE INDEX IF NOT EXISTS data_sets_end_seconds ON data_sets (end_seconds)',
+    'CREATE INDEX IF NOT EXISTS data_sets_data_type ON data_sets (data_type)',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS coverages USING rtree(id, min_x, max_x, min_y, max_y)',
+    'CREATE TRIGGER IF NOT EXISTS remove_coverage AFTER DELETE ON data_sets '
+    'BEGIN DELETE FROM coverages WHERE id = old.id; END'
+]
+_SELECT_COLUMNS = 'SELECT coverage, start_time, end_time, data_type, name FROM data_sets'
+
+
+def _get_seconds(time: datetime) -> int:
+    return calendar.timegm(time.utctimetuple())
+
+
+def _get_identity(data_set_meta_info: DataSetMetaInfo) -> str:
+    return json.dumps([data_set_meta_info.coverage, data_set_meta_info.start_time, data_set_meta_info.end_time,
+                       data_set_meta_info.data_type, data_set_meta_info.identifier])
+
+
+class SqliteMetaInfoProvider(MetaInfoProvider):
+    """
+    A MetaInfoProvider that retrieves its meta information from an SQLite database. Updates and removals are committed
+    in a single transaction per call, the database may be read concurrently by other processes.
+    """
+
+    def __init__(self, path_to_sqlite_file: str, supported_data_types: Optional[str]):
+        self.path_to_sqlite_file = path_to_sqlite_file
+        self.provided_data_types = None
+        if supported_data_types is not None and len(supported_data_types) > 0:
+            self.provided_data_types = supported_data_types.split(',')
+        relative_path = os.path.dirname(path_to_sqlite_file)
+        if relative_path != '' and not os.path.exists(relative_path):
+            os.makedirs(relative_path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path_to_sqlite_file, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            for create_statement in _CREATE_STATEMENTS:
+                self._connection.execute(create_statement)
+        self._init_provided_data_types_and_sets()
+
+    @classmethod
+    def name(cls) -> str:
+        """The name of the meta info provider implementation."""
+        return _NAME
+
+    def query(self, query_string: str) -> List[DataSetMetaInfo]:
+        query = self.get_query_from_query_string(query_string)
+        roi = query.roi
+        query_start_time = query.start_time
+        query_end_time = query.end_time
+        data_types = query.data_types
+        if len(data_types) == 0:
+            return []
+        conditions = ['data_type IN ({})'.format(','.join('?' * len(data_types)))]
+        parameters = list(data_types)
+        if query_end_time is not None:
+            conditions.append('(start_seconds IS NULL OR start_seconds <= ?)')
+            parameters.append(_get_seconds(query_end_time))
+        if query_start_time is not None:
+            conditions.append('(end_seconds IS NULL OR end_seconds >= ?)')
+            parameters.append(_get_seconds(query_start_time))
+        if roi is not None:
+            conditions.append('(id IN (SELECT id FROM coverages WHERE min_x <= ? AND max_x >= ? AND min_y <= ? AND '
+                              'max_y >= ?) OR id NOT IN (SELECT id FROM coverages))')
+            min_x, min_y, max_x, max_y = roi.bounds
+            parameters.extend([max_x, min_x, max_y, min_y])
+        statement = '{} WHERE {} ORDER BY id'.format(_SELECT_COLUMNS, ' AND '.join(conditions))
+        with self._lock:
+            rows = self._connection.execute(statement, parameters).fetchall()
+        data_set_meta_infos = []
+        prepared_roi = query.prepared_roi
+        for row in rows:
+            data_set_meta_info = self._create_data_set_meta_info(row)
+            if prepared_roi is not None and data_set_meta_info.geometry is not None and \
+                    not prepared_roi.intersects(data_set_meta_info.geometry):
+                continue
+            data_set_meta_infos.append(data_set_meta_info)
+        return data_set_meta_infos
+
+    def query_local(self, query_string: str) -> List[DataSetMetaInfo]:
+        return self.query(query_string)
+
+    def query_non_local(self, query_string: str) -> List[DataSetMetaInfo]:
+        return []
+
+    def provides_data_type(self, data_type: str):
+        return data_type in self.provided_data_types
+
+    def encapsulates_data_type(self, data_type: str) -> bool:
+        return False
+
+    def get_provided_data_types(self) -> List[str]:
+        return self.provided_data_types
+
+    def can_update(self) -> bool:
+        return True
+
+    def update(self, data_set_meta_info: DataSetMetaInfo):
+        self.update_many([data_set_meta_info])
+
+    def update_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        rows = [self._create_row(data_set_meta_info) for data_set_meta_info in data_set_meta_infos]
+        with self._lock, self._connection:
+            for row, bounds in rows:
+                cursor = self._connection.execute(
+                    'INSERT OR IGNORE INTO data_sets (identity, coverage, start_time, end_time, start_seconds, '
+                    'end_seconds, data_type, name) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', row)
+                if cursor.rowcount == 1 and bounds is not None:
+                    min_x, min_y, max_x, max_y = bounds
+                    self._connection.execute('INSERT INTO coverages VALUES (?, ?, ?, ?, ?)',
+                                             [cursor.lastrowid, min_x, max_x, min_y, max_y])
+
+    def _create_row(self, data_set_meta_info: DataSetMetaInfo) -> tuple:
+        data_type = data_set_meta_info.data_type
+        if data_type is None:
+            raise ValueError('Data must have Data Type')
+        if not self.provides_data_type(data_type):
+            raise ValueError('Data Type {} is not provided.'.format(data_type))
+        bounds = data_set_meta_info.bounds
+        start_seconds = None
+        if data_set_meta_info.start_time is not None:
+            start_seconds = _get_seconds(get_time_from_string(data_set_meta_info.start_time, False))
+        end_seconds = None
+        if data_set_meta_info.end_time is not None:
+            end_seconds = _get_seconds(get_time_from_string(data_set_meta_info.end_time, True))
+        row = (_get_identity(data_set_meta_info), data_set_meta_info.coverage, data_set_meta_info.start_time,
+               data_set_meta_info.end_time, start_seconds, end_seconds, data_type, data_set_meta_info.identifier)
+        return row, bounds
+
+    def remove(self, data_set_meta_info: DataSetMetaInfo):
+        self.remove_many([data_set_meta_info])
+
+    def remove_many(self, data_set_meta_infos: Sequence[DataSetMetaInfo]):
+        identities = [(_get_identity(data_set_meta_info),) for data_set_meta_info in data_set_meta_infos]
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM data_sets WHERE identity = ?', identities)
+
+    def _init_provided_data_types_and_sets(self):
+        if self.provided_data_types is not None:
+            with self._lock, self._connection:
+                self._connection.execute('DELETE FROM data_sets WHERE data_type NOT IN ({})'.
+                                         format(','.join('?' * len(self.provided_data_types))),
+                                         self.provided_data_types)
+        else:
+            with self._lock:
+                rows = self._connection.execute('SELECT data_type FROM data_sets GROUP BY data_type '
+                                                'ORDER BY MIN(id)').fetchall()
+            self.provided_data_types = [row[0] for row in rows]
+
+    def get_all_data(self) -> Sequence[DataSetMetaInfo]:
+        with self._lock:
+            rows = self._connection.execute('{} ORDER BY id'.format(_SELECT_COLUMNS)).fetchall()
+        return [self._create_data_set_meta_info(row) for row in rows]
+
+    @staticmethod
+    def _create_data_set_meta_info(row: tuple) -> DataSetMetaInfo:
+        return DataSetMetaInfo(coverage=row[0], start_time=row[1], end_time=row[2], data_type=row[3],
+                               identifier=row[4])
+
+    def _get_parameters_as_dict(self):
+        supported_data_types = ','.join(self.provided_data_types)
+        return {'path_to_sqlite_file': self.path_to_sqlite_file, 'supported_data_types': supported_data_types}
+
+
+class SqliteMetaInfoProviderAccessor(MetaInfoProviderAccessor):
+
+    @classmethod
+    def name(cls) -> str:
+        """The name of the meta info provider implementation."""
+        return _NAME
+
+    @classmethod
+    def create_from_parameters(cls, parameters: dict) -> SqliteMetaInfoProvider:
+        if 'path_to_sqlite_file' not in parameters.keys():
+            raise ValueError('Required parameter path_to_sqlite_file is missing')
+        supported_data_types = None
+        if 'supported_data_types' in parameters.keys():
+            supported_data_types = parameters['supported_data_types']
+        return SqliteMetaInfoProvider(path_to_sqlite_file=parameters['path_to_sqlite_file'],
+                                      supported_data_types=supported_data_types)
@@ -6,15 +6,13 @@ This module contains the functionality to access data that is encapsulated in th
 format that is globally an.
 """
 
-import gdal
 import os
 import shutil
 import xml.etree.ElementTree as ET
 
 from shapely.geometry import Polygon
 from shapely.ops import cascaded_union
-from shapely.wkt import loads
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 
 from multiply_core.util import FileRef, get_mime_type
 from multiply_data_access.data_access import DataSetMetaInfo, FileSystem, FileSystemAccessor, MetaInfoProvider, \
@@ -114,7 +112,7 @@ class VrtMetaInfoProvider(MetaInfoProvider):
         coverages = []
         names = []
         for data_set_meta_info in local_data_meta_set_infos:
-            coverages.append(loads(data_set_meta_info.coverage))
+            coverages.append(data_set_meta_info.geometry)
             names.append(data_set_meta_info.identifier)
         return coverages, names
 
@@ -126,7 +124,7 @@ class VrtMetaInfoProvider(MetaInfoProvider):
         coverages = []
         names = []
         for data_set_meta_info in encapsulated_data_meta_set_infos:
-            coverages.append(loads(data_set_meta_info.coverage))
+            coverages.append(data_set_meta_info.geometry)
             names.append(data_set_meta_info.identifier)
         return coverages, names
 
@@ -190,6 +188,7 @@ class VrtFileSystem(FileSystem):
         return _FILE_SYSTEM_NAME
 
     def get(self, data_set_meta_info: DataSetMetaInfo) -> Sequence[FileRef]:
+        import gdal
         if data_set_meta_info.referenced_data is None:
             return []
         required_datasets = []
@@ -234,7 +233,7 @@ class VrtFileSystem(FileSystem):
     def can_put(self):
         return False
 
-    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo):
+    def put(self, from_url: str, data_set_meta_info: DataSetMetaInfo, put_mode: Optional[str] = None):
         raise UserWarning('Method not supported')
 
     def remove(self, data_set_meta_info: DataSetMetaInfo):
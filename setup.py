@@ -46,15 +46,17 @@ setup(name='multiply-data-access',
           ],
           'meta_info_provider_plugins': [
               'json_meta_info_provider = multiply_data_access:json_meta_info_provider.JsonMetaInfoProviderAccessor',
+              'sqlite_meta_info_provider = '
+              'multiply_data_access:sqlite_meta_info_provider.SqliteMetaInfoProviderAccessor',
               'aws_s2_meta_info_provider = '
               'multiply_data_access:aws_s2_meta_info_provider.AwsS2MetaInfoProviderAccessor',
               'lpdaac_meta_info_provider = '
               'multiply_data_access:lpdaac_data_access.LpDaacMetaInfoProviderAccessor',
               'http_meta_info_provider = multiply_data_access:general_remote_access.HttpMetaInfoProviderAccessor',
               'vrt_meta_info_provider = multiply_data_access:vrt_data_access.VrtMetaInfoProviderAccessor',
-              'locally_wrapped_mundi_meta_info_provider = '
+              'mundi_meta_info_provider = '
               'multiply_data_access:mundi_data_access.LocallyWrappedMundiMetaInfoProviderAccessor',
-              'mundi_meta_info_provider = multiply_data_access:mundi_data_access.MundiMetaInfoProviderAccessor',
+              'mundi_dias_meta_info_provider = multiply_data_access:mundi_data_access.MundiMetaInfoProviderAccessor',
               'scihub_meta_info_provider = multiply_data_access:scihub_data_access.SciHubMetaInfoProviderAccessor'
           ],
       },
@@ -0,0 +1,47 @@
+from multiply_data_access import extraction_cache, query_cache
+import glob
+import os
+import pytest
+
+__author__ = 'Tonio Fincke (Brockmann Consult GmbH)'
+
+_TEST_DATA_DIRS = ['./test/test_data', './test/test_data_2']
+# files which are written next to the test data, i.e., the journals of JsonMetaInfoProviders and the scan manifests of
+# LocalFileSystems
+_WRITTEN_FILE_PATTERNS = ['*.journal', '.scan_manifest.json']
+
+
+def _get_written_files() -> set:
+    written_files = set()
+    for test_data_dir in _TEST_DATA_DIRS:
+        for written_file_pattern in _WRITTEN_FILE_PATTERNS:
+            written_files.update(glob.glob(os.path.join(test_data_dir, '**', written_file_pattern), recursive=True))
+    return written_files
+
+
+@pytest.fixture(autouse=True)
+def remove_written_files():
+    """Removes the journals and scan manifests which have been written next to the test data during a test."""
+    existing_files = _get_written_files()
+    yield
+    for written_file in _get_written_files() - existing_files:
+        os.remove(written_file)
+
+
+@pytest.fixture(autouse=True)
+def temporary_query_cache(tmpdir):
+    """Lets each test use an empty query cache in a temporary directory instead of the one in the user's home."""
+    previous_query_cache = query_cache._default_query_cache._cache
+    query_cache.set_query_cache(query_cache.QueryCache(str(tmpdir.join(query_cache.QUERY_CACHE_FILE_NAME))))
+    yield
+    query_cache.set_query_cache(previous_query_cache)
+
+
+@pytest.fixture(autouse=True)
+def temporary_extraction_cache(tmpdir):
+    """Lets each test use an empty extraction cache in a temporary directory instead of the one in the user's home."""
+    previous_extraction_cache = extraction_cache._default_extraction_cache._cache
+    extraction_cache.set_extraction_cache(extraction_cache.ExtractionCache(
+        str(tmpdir.join(extraction_cache.EXTRACTION_CACHE_FILE_NAME))))
+    yield
+    extraction_cache.set_extraction_cache(previous_extraction_cache)
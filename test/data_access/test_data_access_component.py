@@ -1,10 +1,19 @@
+from multiply_core.observations import data_validation
+from multiply_core.util import FileRef
+from multiply_data_access import DataSetMetaInfo
 from multiply_data_access.data_access_component import DataAccessComponent, _build_query_string
 from multiply_data_access.json_meta_info_provider import JsonMetaInfoProvider
 from multiply_data_access.local_file_system import LocalFileSystem
-from multiply_data_access.data_store import DataStore
+from multiply_data_access.data_store import DataStore, LazyDataStore
+from datetime import datetime
+from shapely.geometry import Polygon
 
+import json
 import os
 import shutil
+import threading
+import time
+import yaml
 
 __author__ = "Tonio Fincke (Brockmann Consult GmbH)"
 
@@ -146,3 +155,366 @@ def test_get_query_strings_sentinel_2_and_other_types():
            "S2_L2,AWS_S2_L2;EPSG:3301" == query_strings[1]
     assert "POLYGON((15 15, 25 15, 25 25, 15 25, 15 15));2017-03-21 14:33:00;2017-03-21 14:45:00;" \
            "TYPE_A,TYPE_B;EPSG:3301" == query_strings[2]
+
+
+class SlowDataStore(object):
+
+    def __init__(self, id: str, seconds: float):
+        self.id = id
+        self._seconds = seconds
+        self.num_queries = 0
+
+    def query_local(self, query_string: str):
+        self.num_queries += 1
+        time.sleep(self._seconds)
+        return ['{}_local'.format(self.id)]
+
+    def query_non_local(self, query_string: str):
+        self.num_queries += 1
+        time.sleep(self._seconds)
+        return ['{}_non_local'.format(self.id)]
+
+
+def test_query_data_stores_keeps_order_of_data_stores():
+    data_access_component = DataAccessComponent()
+    data_access_component._data_stores = [SlowDataStore('first', 0.2), SlowDataStore('second', 0.)]
+    results = data_access_component._query_data_stores(';;;TYPE_A', data_access_component._data_stores)
+    assert 4 == len(results)
+    assert ['first_local'] == results[0][1]
+    assert ['second_local'] == results[1][1]
+    assert ['first_non_local'] == results[2][1]
+    assert ['second_non_local'] == results[3][1]
+
+
+def test_query_data_stores_dismisses_timed_out_data_stores():
+    data_access_component = DataAccessComponent(query_timeout=0.1)
+    data_access_component._data_stores = [SlowDataStore('slow', 0.5), SlowDataStore('fast', 0.)]
+    start = time.monotonic()
+    results = data_access_component._query_data_stores(';;;TYPE_A', data_access_component._data_stores)
+    assert time.monotonic() - start < 0.5
+    assert [] == results[0][1]
+    assert ['fast_local'] == results[1][1]
+    assert [] == results[2][1]
+    assert ['fast_non_local'] == results[3][1]
+
+
+def test_query_data_stores_cancels_timed_out_queries_that_have_not_started():
+    data_access_component = DataAccessComponent(max_query_workers=1, query_timeout=0.1)
+    slow_data_store = SlowDataStore('slow', 0.3)
+    results = data_access_component._query_data_stores(';;;TYPE_A', [slow_data_store])
+    assert [] == results[0][1]
+    assert [] == results[1][1]
+    time.sleep(0.5)
+    assert 1 == slow_data_store.num_queries
+    assert data_access_component._get_query_executor() is data_access_component._get_query_executor()
+
+
+def test_close_shuts_down_query_threads():
+    data_access_component = DataAccessComponent(max_query_workers=2)
+    data_stores = [SlowDataStore('first', 0.), SlowDataStore('second', 0.)]
+    data_access_component._query_data_stores(';;;TYPE_A', data_stores)
+    query_threads = list(data_access_component._get_query_executor()._threads)
+    assert 0 < len(query_threads)
+
+    data_access_component.close()
+    for query_thread in query_threads:
+        query_thread.join(timeout=1.)
+        assert not query_thread.is_alive()
+
+    results = data_access_component._query_data_stores(';;;TYPE_A', data_stores)
+    assert ['first_local'] == results[0][1]
+    data_access_component.close()
+
+
+class CountingDataStore(object):
+
+    def __init__(self, id: str, max_concurrent_gets=None):
+        self.id = id
+        self._max_concurrent_gets = max_concurrent_gets
+        self._lock = threading.Lock()
+        self.num_running = 0
+        self.max_num_running = 0
+
+    def get_max_concurrent_gets(self):
+        return self._max_concurrent_gets
+
+    def get(self, data_set_meta_info):
+        with self._lock:
+            self.num_running += 1
+            self.max_num_running = max(self.num_running, self.max_num_running)
+        time.sleep(0.05)
+        with self._lock:
+            self.num_running -= 1
+        if data_set_meta_info.identifier == 'broken':
+            raise IOError('Could not download')
+        return [FileRef(data_set_meta_info.identifier, None, None, None)]
+
+
+def test_get_file_refs_keeps_order_and_limits_concurrency():
+    data_access_component = DataAccessComponent(max_download_workers=4, max_downloads_per_data_store=3)
+    limited_data_store = CountingDataStore('limited', 2)
+    other_data_store = CountingDataStore('other')
+    gets = []
+    for i in range(6):
+        gets.append((limited_data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'limited_{}'.format(i))))
+    for i in range(6):
+        gets.append((other_data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'other_{}'.format(i))))
+    download_failures = []
+    file_refs = data_access_component._get_file_refs(gets, download_failures)
+    assert 12 == len(file_refs)
+    for i in range(6):
+        assert 'limited_{}'.format(i) == file_refs[i][0].url
+        assert 'other_{}'.format(i) == file_refs[i + 6][0].url
+    assert 2 == limited_data_store.max_num_running
+    assert 2 <= other_data_store.max_num_running <= 3
+    assert 0 == len(download_failures)
+
+
+def test_get_file_refs_collects_failures():
+    data_access_component = DataAccessComponent()
+    data_store = CountingDataStore('store')
+    broken = DataSetMetaInfo(None, None, None, 'TYPE_A', 'broken')
+    gets = [(data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'first')), (data_store, broken),
+            (data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'third'))]
+    download_failures = []
+    file_refs = data_access_component._get_file_refs(gets, download_failures)
+    assert 'first' == file_refs[0][0].url
+    assert [] == file_refs[1]
+    assert 'third' == file_refs[2][0].url
+    assert 1 == len(download_failures)
+    assert broken is download_failures[0][0]
+
+
+def test_iter_file_refs_collects_failures_per_call():
+    data_access_component = DataAccessComponent()
+    data_store = CountingDataStore('store')
+    broken = DataSetMetaInfo(None, None, None, 'TYPE_A', 'broken')
+    download_failures = []
+    file_refs_iterator = data_access_component._iter_file_refs(
+        [(data_store, broken), (data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'first'))], download_failures)
+    next(file_refs_iterator)
+
+    other_download_failures = []
+    other_file_refs = data_access_component._get_file_refs(
+        [(data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'other'))], other_download_failures)
+    assert 'other' == other_file_refs[0][0].url
+    assert 0 == len(other_download_failures)
+
+    list(file_refs_iterator)
+    assert 1 == len(download_failures)
+    assert broken is download_failures[0][0]
+
+
+def test_iter_file_refs_yields_in_order_of_completion():
+    data_access_component = DataAccessComponent(max_download_workers=2)
+    slow_data_store = CountingDataStore('slow')
+    slow_data_store.get = lambda data_set_meta_info: time.sleep(0.3) or [FileRef('slow', None, None, None)]
+    fast_data_store = CountingDataStore('fast')
+    gets = [(slow_data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'slow')),
+            (fast_data_store, DataSetMetaInfo(None, None, None, 'TYPE_A', 'fast'))]
+    results = list(data_access_component._iter_file_refs(gets))
+    assert 2 == len(results)
+    assert 1 == results[0][0]
+    assert 'fast' == results[0][1][0].url
+    assert 0 == results[1][0]
+    assert 'slow' == results[1][1][0].url
+
+
+class TypedDataStore(object):
+
+    def __init__(self, id: str, provided_data_types, encapsulated_data_types=()):
+        self.id = id
+        self._provided_data_types = provided_data_types
+        self._encapsulated_data_types = encapsulated_data_types
+
+    def get_provided_data_types(self):
+        return self._provided_data_types
+
+    def encapsulates_data_type(self, data_type: str):
+        return data_type in self._encapsulated_data_types
+
+
+def test_get_query_plan():
+    data_access_component = DataAccessComponent()
+    store_a = TypedDataStore('a', ['TYPE_A'])
+    store_b = TypedDataStore('b', ['TYPE_B'], ['TYPE_A'])
+    store_c = TypedDataStore('c', ['TYPE_C'])
+    data_access_component._data_stores = [store_a, store_b, store_c]
+    query_plan = data_access_component.get_query_plan(roi="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                                      start_time="2017-03-21 14:33:00",
+                                                      end_time="2017-03-21 14:45:00",
+                                                      data_types="TYPE_A,TYPE_B")
+    assert 1 == len(query_plan)
+    assert "POLYGON((15 15, 25 15, 25 25, 15 25, 15 15));2017-03-21 14:33:00;2017-03-21 14:45:00;" \
+           "TYPE_A,TYPE_B;EPSG:4326" == query_plan[0][0]
+    assert [store_a, store_b] == query_plan[0][1]
+
+    query_plan = data_access_component.get_query_plan(roi="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                                      start_time="2017-03-21 14:33:00",
+                                                      end_time="2017-03-21 14:45:00",
+                                                      data_types="TYPE_D")
+    assert 1 == len(query_plan)
+    assert [] == query_plan[0][1]
+
+
+def test_get_query_plan_creates_lazy_data_stores_only_if_data_types_are_unknown():
+    data_store_as_dict = {'FileSystem': {'type': 'LocalFileSystem',
+                                         'parameters': {'path': './test/test_data/', 'pattern': '/dt/yy/mm/dd/'}},
+                          'MetaInfoProvider': {'type': 'JsonMetaInfoProvider',
+                                               'parameters': {'path_to_json_file':
+                                                              './test/test_data/test_meta_info.json'}}}
+    determined_data_stores = []
+    declared_data_store = LazyDataStore(data_store_as_dict, 'declared', ['TYPE_A', 'TYPE_B', 'TYPE_C'], {}, True,
+                                        determined_data_stores.append)
+    cached_data_store = LazyDataStore(data_store_as_dict, 'cached', ['TYPE_A', 'TYPE_B', 'TYPE_C'], {}, False,
+                                      determined_data_stores.append)
+    unknown_data_store = LazyDataStore(data_store_as_dict, 'unknown', None, None, False,
+                                       determined_data_stores.append)
+    data_access_component = DataAccessComponent()
+    data_access_component._data_stores = [declared_data_store, cached_data_store, unknown_data_store]
+
+    query_plan = data_access_component.get_query_plan(roi="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                                      start_time="2017-03-21 14:33:00",
+                                                      end_time="2017-03-21 14:45:00",
+                                                      data_types="TYPE_A,TYPE_B")
+    assert [declared_data_store, cached_data_store, unknown_data_store] == query_plan[0][1]
+    assert not declared_data_store.is_materialized
+    assert not cached_data_store.is_materialized
+    assert unknown_data_store.is_materialized
+    assert [unknown_data_store] == determined_data_stores
+
+    query_plan = data_access_component.get_query_plan(roi="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                                      start_time="2017-03-21 14:33:00",
+                                                      end_time="2017-03-21 14:45:00",
+                                                      data_types="TYPE_A,TYPE_D,TYPE_E")
+    assert [declared_data_store, cached_data_store, unknown_data_store] == query_plan[0][1]
+    assert not declared_data_store.is_materialized
+    assert cached_data_store.is_materialized
+    # the encapsulation of both unknown data types is reported at once
+    assert [unknown_data_store, cached_data_store, unknown_data_store] == determined_data_stores
+
+    data_access_component.get_query_plan(roi="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00", end_time="2017-03-21 14:45:00",
+                                         data_types="TYPE_A,TYPE_D,TYPE_E")
+    assert 3 == len(determined_data_stores)
+
+
+def test_read_data_stores_creates_data_stores_lazily():
+    path_to_yaml_file_2 = './test/test_data/test_data_stores_4.yml'
+    data_store_as_dict = {'FileSystem': {'type': 'UnknownFileSystem', 'parameters': {}},
+                          'MetaInfoProvider': {'type': 'UnknownMetaInfoProvider', 'parameters': {}},
+                          'ProvidedDataTypes': 'TYPE_A,TYPE_B',
+                          'EncapsulatedDataTypes': ['TYPE_C'],
+                          'Id': 'lazy'}
+    with open(path_to_yaml_file_2, 'w') as stream:
+        yaml.safe_dump([{'DataStore': data_store_as_dict}], stream)
+    try:
+        data_access_component = DataAccessComponent()
+        data_stores = data_access_component._read_data_stores(path_to_yaml_file_2)
+        assert 1 == len(data_stores)
+        assert 'lazy' == data_stores[0].id
+        assert ['TYPE_A', 'TYPE_B'] == data_stores[0].get_provided_data_types()
+        assert data_stores[0].provides_data_type('TYPE_A')
+        assert not data_stores[0].provides_data_type('TYPE_C')
+        assert data_stores[0].encapsulates_data_type('TYPE_C')
+        assert not data_stores[0].encapsulates_data_type('TYPE_D')
+        assert not data_stores[0].is_materialized
+        assert 'UnknownFileSystem' == data_stores[0].get_as_dict()['DataStore']['FileSystem']['type']
+    finally:
+        os.remove(path_to_yaml_file_2)
+
+
+def test_read_data_stores_caches_data_types(monkeypatch, tmpdir):
+    data_store_types_file = str(tmpdir.join('data_store_types.json'))
+    monkeypatch.setattr(DataAccessComponent, '_get_data_store_types_file', lambda self: data_store_types_file)
+    path_to_yaml_file_2 = './test/test_data/test_data_stores_5.yml'
+    data_store_as_dict = {'FileSystem': {'type': 'LocalFileSystem',
+                                         'parameters': {'path': './test/test_data/', 'pattern': '/dt/yy/mm/dd/'}},
+                          'MetaInfoProvider': {'type': 'JsonMetaInfoProvider',
+                                               'parameters': {'path_to_json_file':
+                                                              './test/test_data/test_meta_info.json'}},
+                          'Id': 'cached'}
+    with open(path_to_yaml_file_2, 'w') as stream:
+        yaml.safe_dump([{'DataStore': data_store_as_dict}], stream)
+    data_access_component = DataAccessComponent()
+    try:
+        data_store = data_access_component._read_data_stores(path_to_yaml_file_2)[0]
+        assert ['TYPE_A', 'TYPE_B', 'TYPE_C'] == data_store.get_provided_data_types()
+        assert not data_store.encapsulates_data_type('TYPE_D')
+        assert data_store.is_materialized
+
+        other_data_store = data_access_component._read_data_stores(path_to_yaml_file_2)[0]
+        assert ['TYPE_A', 'TYPE_B', 'TYPE_C'] == other_data_store.get_provided_data_types()
+        assert not other_data_store.encapsulates_data_type('TYPE_D')
+        assert not other_data_store.is_materialized
+
+        # the cached types are not used anymore when the description of the data store changes
+        data_store_as_dict['FileSystem']['parameters']['pattern'] = '/dt/yy/'
+        with open(path_to_yaml_file_2, 'w') as stream:
+            yaml.safe_dump([{'DataStore': data_store_as_dict}], stream)
+        changed_data_store = data_access_component._read_data_stores(path_to_yaml_file_2)[0]
+        assert not changed_data_store.is_materialized
+        assert ['TYPE_A', 'TYPE_B', 'TYPE_C'] == changed_data_store.get_provided_data_types()
+        assert changed_data_store.is_materialized
+        with open(data_store_types_file) as stream:
+            assert 1 == len(json.load(stream))
+    finally:
+        os.remove(path_to_yaml_file_2)
+
+
+class PutManyValidator(data_validation.DataValidator):
+
+    @classmethod
+    def name(cls) -> str:
+        return 'my_dac_put_many_data_type'
+
+    def is_valid(self, path: str) -> bool:
+        return path.endswith('.dacputmany')
+
+    def get_relative_path(self, path: str) -> str:
+        return ''
+
+    def get_file_pattern(self) -> str:
+        return '*.dacputmany'
+
+    def is_valid_for(self, path: str, roi: Polygon, start_time: datetime, end_time: datetime) -> bool:
+        return self.is_valid(path)
+
+    def differs_by_name(self):
+        return False
+
+
+class PuttingDataStore(object):
+
+    def __init__(self, id: str):
+        self.id = id
+        self.put_paths = []
+        self.put_modes = []
+
+    def provides_data_type(self, data_type: str) -> bool:
+        return data_type == 'my_dac_put_many_data_type'
+
+    def can_put(self) -> bool:
+        return True
+
+    def put_many(self, paths, put_mode=None):
+        self.put_paths.extend(paths)
+        self.put_modes.append(put_mode)
+        return [DataSetMetaInfo(None, None, None, 'my_dac_put_many_data_type', path) for path in paths]
+
+
+def test_put_many():
+    data_validation.add_validator(PutManyValidator())
+    data_access_component = DataAccessComponent()
+    first_data_store = PuttingDataStore('first')
+    second_data_store = PuttingDataStore('second')
+    data_access_component._data_stores = [first_data_store, second_data_store]
+
+    data_access_component.put_many(['a.dacputmany', 'b.unknown', 'c.dacputmany'], put_mode='move')
+    assert ['a.dacputmany', 'c.dacputmany'] == first_data_store.put_paths
+    assert ['move'] == first_data_store.put_modes
+    assert [] == second_data_store.put_paths
+
+    data_access_component.put_many(['d.dacputmany'], data_store_id='second')
+    assert ['d.dacputmany'] == second_data_store.put_paths
+    assert [None] == second_data_store.put_modes
@@ -1,3 +1,5 @@
+import copy
+import pickle
 import re
 
 from multiply_core.observations import DataValidator, add_validator
@@ -172,3 +174,121 @@ def test_meta_info_provider_equals_considers_different_name_with_realtive_path()
                                           identifier="/some/other/path/29/S/QB/2016/9/4/0")
     assert data_set_meta_info.equals(same_relative_path)
     assert not data_set_meta_info.equals(other_relative_path)
+
+
+def test_meta_info_provider_identity_key():
+    data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00",
+                                         end_time="2017-03-21 14:45:00",
+                                         data_type="TYPE_D",
+                                         identifier="dterftge")
+    equal_except_for_id = DataSetMetaInfo(coverage="POLYGON((15.0000001 15, 25 15, 25 25, 15 25, 15.0000001 15))",
+                                           start_time="2017-03-21T14:33:00",
+                                           end_time="2017-03-21 14:45:00",
+                                           data_type="TYPE_D",
+                                           identifier="tfgtzz")
+    other_coverage = DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                     start_time="2017-03-21 14:33:00",
+                                     end_time="2017-03-21 14:45:00",
+                                     data_type="TYPE_D",
+                                     identifier="ctfgb")
+    other_data_type = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                      start_time="2017-03-21 14:33:00",
+                                      end_time="2017-03-21 14:45:00",
+                                      data_type="TYPE_A",
+                                      identifier="drtwr")
+    without_coverage_and_times = DataSetMetaInfo(coverage=None, start_time=None, end_time=None, data_type="TYPE_D",
+                                                 identifier="dterftge")
+    assert data_set_meta_info.identity_key == equal_except_for_id.identity_key
+    assert data_set_meta_info.identity_key != other_coverage.identity_key
+    assert data_set_meta_info.identity_key != other_data_type.identity_key
+    assert data_set_meta_info.identity_key != without_coverage_and_times.identity_key
+    assert 3 == len({data_set_meta_info.identity_key, equal_except_for_id.identity_key,
+                     other_coverage.identity_key, other_data_type.identity_key})
+
+
+def test_meta_info_provider_identity_key_considers_footprint():
+    data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00",
+                                         end_time="2017-03-21 14:45:00",
+                                         data_type="TYPE_D",
+                                         identifier="dterftge")
+    same_bounds = DataSetMetaInfo(coverage="POLYGON((15 15, 25 25, 15 25, 15 15))",
+                                  start_time="2017-03-21 14:33:00",
+                                  end_time="2017-03-21 14:45:00",
+                                  data_type="TYPE_D",
+                                  identifier="tfgtzz")
+    other_starting_point_and_orientation = DataSetMetaInfo(coverage="POLYGON((25 25, 25 15, 15 15, 25 25))",
+                                                           start_time="2017-03-21 14:33:00",
+                                                           end_time="2017-03-21 14:45:00",
+                                                           data_type="TYPE_D",
+                                                           identifier="ctfgb")
+    assert data_set_meta_info.identity_key != same_bounds.identity_key
+    assert data_set_meta_info.identity_key == other_starting_point_and_orientation.identity_key
+
+
+def test_meta_info_provider_identity_key_considers_different_name_with_relative_path():
+    add_validator(TypeEValidator())
+    data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00",
+                                         end_time="2017-03-21 14:45:00",
+                                         data_type="TYPE_E",
+                                         identifier="/some/path/29/S/QB/2017/9/4/0")
+    same_relative_path = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00",
+                                         end_time="2017-03-21 14:45:00",
+                                         data_type="TYPE_E",
+                                         identifier="/some/other/path/29/S/QB/2017/9/4/0")
+    other_relative_path = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                          start_time="2017-03-21 14:33:00",
+                                          end_time="2017-03-21 14:45:00",
+                                          data_type="TYPE_E",
+                                          identifier="/some/other/path/29/S/QB/2016/9/4/0")
+    assert data_set_meta_info.identity_key == same_relative_path.identity_key
+    assert data_set_meta_info.identity_key != other_relative_path.identity_key
+
+
+def test_meta_info_provider_parsed_geometry_and_times():
+    data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00",
+                                         end_time="2017-03-21 14:45:00",
+                                         data_type="TYPE_D",
+                                         identifier="dterftge")
+    assert (15.0, 15.0, 25.0, 25.0) == data_set_meta_info.bounds
+    assert data_set_meta_info.geometry is data_set_meta_info.geometry
+    assert datetime(2017, 3, 21, 14, 33) == data_set_meta_info.start_datetime
+    assert datetime(2017, 3, 21, 14, 45) == data_set_meta_info.end_datetime
+    assert not hasattr(data_set_meta_info, '__dict__')
+
+
+def test_meta_info_provider_parsed_geometry_and_times_are_none():
+    data_set_meta_info = DataSetMetaInfo(coverage=None, start_time=None, end_time=None, data_type="TYPE_D",
+                                         identifier="dterftge")
+    assert data_set_meta_info.geometry is None
+    assert data_set_meta_info.bounds is None
+    assert data_set_meta_info.start_datetime is None
+    assert data_set_meta_info.end_datetime is None
+
+
+def test_meta_info_provider_coverages_are_interned():
+    coverage = "POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))"
+    data_set_meta_info = DataSetMetaInfo(coverage=''.join(list(coverage)), start_time="2017-03-21",
+                                         end_time="2017-03-21", data_type="TYPE_D", identifier="dterftge")
+    other_data_set_meta_info = DataSetMetaInfo(coverage=''.join(list(coverage)), start_time="2017-03-22",
+                                               end_time="2017-03-22", data_type="TYPE_D", identifier="frgswh")
+    assert data_set_meta_info.coverage is other_data_set_meta_info.coverage
+    assert data_set_meta_info.geometry is other_data_set_meta_info.geometry
+
+
+def test_meta_info_provider_can_be_pickled_and_copied():
+    data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                                         start_time="2017-03-21 14:33:00", end_time="2017-03-21 14:45:00",
+                                         data_type="TYPE_D", identifier="dterftge", referenced_data="ref")
+    data_set_meta_info.identity_key
+    for copied_data_set_meta_info in [pickle.loads(pickle.dumps(data_set_meta_info)),
+                                      copy.deepcopy(data_set_meta_info), copy.copy(data_set_meta_info)]:
+        assert "ref" == copied_data_set_meta_info.referenced_data
+        assert (15.0, 15.0, 25.0, 25.0) == copied_data_set_meta_info.bounds
+        assert datetime(2017, 3, 21, 14, 33) == copied_data_set_meta_info.start_datetime
+        assert datetime(2017, 3, 21, 14, 45) == copied_data_set_meta_info.end_datetime
+        assert data_set_meta_info.identity_key == copied_data_set_meta_info.identity_key
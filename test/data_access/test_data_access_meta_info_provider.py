@@ -1,4 +1,4 @@
-from multiply_data_access import MetaInfoProvider
+from multiply_data_access import MetaInfoProvider, Query
 from shapely.wkt import loads
 
 __author__ = "Tonio Fincke (Brockmann Consult GmbH)"
@@ -166,3 +166,34 @@ def test_meta_info_provider_get_data_types():
     query_string = ';;;'
     data_types = MetaInfoProvider.get_data_types_from_query_string(query_string)
     assert len(data_types) == 0
+
+
+def test_query():
+    query = Query('POLYGON ((35 10, 45 45, 15 40, 10 20, 35 10));2017-03-01;2017-03-31;TYPE_A, TYPE_B;EPSG:4326')
+    assert 'POLYGON ((35 10, 45 45, 15 40, 10 20, 35 10));2017-03-01;2017-03-31;TYPE_A, TYPE_B;EPSG:4326' == query
+    assert query.roi.geom_type == 'Polygon'
+    assert query.roi is query.roi
+    assert query.prepared_roi.intersects(loads('POINT (30 30)'))
+    assert 2017 == query.start_time.year
+    assert 3 == query.start_time.month
+    assert 1 == query.start_time.day
+    assert 31 == query.end_time.day
+    assert ('TYPE_A', 'TYPE_B') == query.data_types
+    assert frozenset(['TYPE_A', 'TYPE_B']) == query.data_type_set
+    assert query.roi is MetaInfoProvider.get_roi_from_query_string(query)
+    assert query is MetaInfoProvider.get_query_from_query_string(query)
+    assert ['TYPE_A', 'TYPE_B'] == MetaInfoProvider.get_data_types_from_query_string(query)
+    try:
+        query.roi = None
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_query_without_components():
+    query = Query(';;;')
+    assert query.roi is None
+    assert query.prepared_roi is None
+    assert query.start_time is None
+    assert query.end_time is None
+    assert () == query.data_types
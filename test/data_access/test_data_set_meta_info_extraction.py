@@ -1,9 +1,13 @@
+from multiply_data_access import DataSetMetaInfo
 from multiply_data_access.data_set_meta_info_extraction import AwsS2MetaInfoExtractor, S2L1CMetaInfoExtractor, \
     AwsS2L2MetaInfoExtractor, MODISMCD43MetaInfoExtractor, MODISMCD15A2MetaInfoExtractor, S1SlcMetaInfoExtractor, \
-    S1SpeckledMetaInfoExtractor, S2L2MetaInfoExtractor
+    S1SpeckledMetaInfoExtractor, S2L2MetaInfoExtractor, DataSetMetaInfoExtractor, add_data_set_meta_info_extractor, \
+    get_data_set_meta_infos, _get_epsg_code_from_tile_id
 
 from shapely import wkt
 from shapely.wkt import loads
+from unittest import mock
+from xml.etree import ElementTree
 
 __author__ = "Tonio Fincke (Brockmann Consult GmbH)"
 
@@ -73,6 +77,20 @@ def test_aws_s2_meta_info_extractor():
     assert coverage.almost_equals(expected_coverage)
 
 
+def test_aws_s2_meta_info_extractor_parses_metadata_once():
+    provider = AwsS2MetaInfoExtractor()
+    with mock.patch.object(ElementTree, 'parse', wraps=ElementTree.parse) as parse:
+        data_set_meta_info = provider.extract_meta_info(path_to_s2_dir)
+    assert '2017-09-04 11:18:25' == data_set_meta_info.start_time
+    assert 1 == parse.call_count
+
+
+def test_get_epsg_code_from_tile_id():
+    assert 32629 == _get_epsg_code_from_tile_id('S2B_OPER_MSI_L1C_TL_SGS__20170904T150224_A002594_T29SQB_N02.05')
+    assert 32734 == _get_epsg_code_from_tile_id('S2A_OPER_MSI_L1C_TL_SGS__20170119T164713_A008242_T34HBH_N02.04')
+    assert _get_epsg_code_from_tile_id('S2A_OPER_MSI_L1C_TL_SGS__20170119T164713_A008242_N02.04') is None
+
+
 def test_s2_l1c_meta_info_extractor():
     provider = S2L1CMetaInfoExtractor()
     assert 'S2_L1C' == provider.name()
@@ -100,6 +118,14 @@ def test_s2_l1c_meta_info_extractor():
     assert expected_wkt.almost_equals(coverage)
 
 
+def test_s2_l1c_meta_info_extractor_parses_metadata_once():
+    provider = S2L1CMetaInfoExtractor()
+    with mock.patch.object(ElementTree, 'parse', wraps=ElementTree.parse) as parse:
+        data_set_meta_info = provider.extract_meta_info(path_to_s2_l1c_dir)
+    assert '2017-09-10T10:40:21' == data_set_meta_info.start_time
+    assert 1 == parse.call_count
+
+
 def test_s2_l2_meta_info_extractor():
     provider = S2L2MetaInfoExtractor()
     assert 'S2_L2' == provider.name()
@@ -118,6 +144,14 @@ def test_s2_l2_meta_info_extractor():
     assert expected_wkt.almost_equals(coverage)
 
 
+def test_s2_l2_meta_info_extractor_parses_metadata_once():
+    provider = S2L2MetaInfoExtractor()
+    with mock.patch.object(ElementTree, 'parse', wraps=ElementTree.parse) as parse:
+        data_set_meta_info = provider.extract_meta_info(path_to_s2_l2_dir)
+    assert '2018-05-10T09:40:31' == data_set_meta_info.start_time
+    assert 1 == parse.call_count
+
+
 def test_aws_s2_l2_meta_info_extractor():
     provider = AwsS2L2MetaInfoExtractor()
     assert 'AWS_S2_L2' == provider.name()
@@ -133,6 +167,14 @@ def test_aws_s2_l2_meta_info_extractor():
     assert coverage.almost_equals(expected_wkt_coverage)
 
 
+def test_aws_s2_l2_meta_info_extractor_parses_metadata_once():
+    provider = AwsS2L2MetaInfoExtractor()
+    with mock.patch.object(ElementTree, 'parse', wraps=ElementTree.parse) as parse:
+        data_set_meta_info = provider.extract_meta_info(path_to_aws_s2_l2_dir)
+    assert '2017-01-19 11:05:33' == data_set_meta_info.start_time
+    assert 1 == parse.call_count
+
+
 def test_modis_mcd43a1_extractor():
     extractor = MODISMCD43MetaInfoExtractor()
     assert 'MCD43A1.006' == extractor.name()
@@ -161,3 +203,38 @@ def test_modis_mcd15a2_extractor():
                                   '1.127072786096139e-09 39.99999999616804, 9.96954409223065e-10 29.9999999970181, '
                                   '-11.54700538146705 29.9999999970181, -13.05407289035348 39.99999999616804))')
     assert coverage.almost_equals(expected_coverage)
+
+
+class PickyMetaInfoExtractor(DataSetMetaInfoExtractor):
+
+    @classmethod
+    def name(cls) -> str:
+        return 'picky_data_type'
+
+    def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+        if 'broken' in path:
+            raise ValueError('Cannot read {}'.format(path))
+        return DataSetMetaInfo('', None, None, 'picky_data_type', path)
+
+
+add_data_set_meta_info_extractor(PickyMetaInfoExtractor())
+
+
+def test_get_data_set_meta_infos():
+    data_types_and_paths = []
+    for i in range(20):
+        path = 'broken_{}'.format(i) if i % 5 == 0 else 'product_{}'.format(i)
+        data_types_and_paths.append(('picky_data_type', path))
+    data_types_and_paths.append(('unknown_data_type', 'product_20'))
+
+    for max_workers in [1, 2]:
+        data_set_meta_infos = get_data_set_meta_infos(data_types_and_paths, max_workers=max_workers, chunk_size=3)
+
+        assert 21 == len(data_set_meta_infos)
+        for i in range(20):
+            if i % 5 == 0:
+                assert data_set_meta_infos[i] is None
+            else:
+                assert 'picky_data_type' == data_set_meta_infos[i].data_type
+                assert 'product_{}'.format(i) == data_set_meta_infos[i].identifier
+        assert data_set_meta_infos[20] is None
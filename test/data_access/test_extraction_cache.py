@@ -0,0 +1,174 @@
+from multiply_data_access import DataSetMetaInfo
+from multiply_data_access.data_set_meta_info_extraction import DataSetMetaInfoExtractor, \
+    add_data_set_meta_info_extractor, get_data_set_meta_info, get_data_set_meta_infos
+from multiply_data_access.extraction_cache import ExtractionCache, get_extraction_cache, get_extraction_key
+from typing import List
+import os
+import time
+
+__author__ = "Tonio Fincke (Brockmann Consult GmbH)"
+
+path_to_cache_file = './test/test_data/test_extraction_cache.sqlite'
+path_to_data_set = './test/test_data/extraction_cache_data_set.nc'
+
+
+def _create_data_set_meta_info(identifier: str) -> DataSetMetaInfo:
+    return DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                           start_time="2017-03-11 14:33:00", end_time="2017-03-11 14:45:00", data_type="TYPE_C",
+                           identifier=identifier, referenced_data='ref_{}'.format(identifier))
+
+
+def _remove(path: str):
+    for file in [path, path + '-wal', path + '-shm']:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def test_put_and_get():
+    try:
+        extraction_cache = ExtractionCache(path_to_cache_file)
+        extraction_cache.put('key', _create_data_set_meta_info('dterftge'))
+
+        # use a second cache to ensure the meta information is persisted
+        data_set_meta_info = ExtractionCache(path_to_cache_file).get('key')
+        assert data_set_meta_info is not None
+        assert "POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))" == data_set_meta_info.coverage
+        assert "2017-03-11 14:33:00" == data_set_meta_info.start_time
+        assert "2017-03-11 14:45:00" == data_set_meta_info.end_time
+        assert "TYPE_C" == data_set_meta_info.data_type
+        assert "dterftge" == data_set_meta_info.identifier
+        assert "ref_dterftge" == data_set_meta_info.referenced_data
+
+        assert extraction_cache.get('other_key') is None
+        assert 0 == extraction_cache.hits
+        assert 1 == extraction_cache.misses
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_get_many():
+    try:
+        extraction_cache = ExtractionCache(path_to_cache_file)
+        extraction_cache.put_many([('key_1', _create_data_set_meta_info('first')),
+                                   ('key_2', _create_data_set_meta_info('second'))])
+
+        data_set_meta_infos = extraction_cache.get_many(['key_2', 'key_3', 'key_1'])
+        assert 3 == len(data_set_meta_infos)
+        assert 'second' == data_set_meta_infos[0].identifier
+        assert data_set_meta_infos[1] is None
+        assert 'first' == data_set_meta_infos[2].identifier
+        assert 2 == extraction_cache.hits
+        assert 1 == extraction_cache.misses
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_evict_least_recently_used():
+    try:
+        extraction_cache = ExtractionCache(path_to_cache_file, max_size=1000)
+        extraction_cache.put('key_1', _create_data_set_meta_info('first'))
+        time.sleep(0.01)
+        extraction_cache.put('key_2', _create_data_set_meta_info('second'))
+        for i in range(3, 10):
+            time.sleep(0.01)
+            extraction_cache.get('key_1')
+            time.sleep(0.01)
+            extraction_cache.put('key_{}'.format(i), _create_data_set_meta_info('other'))
+
+        assert extraction_cache.get('key_1') is not None
+        assert extraction_cache.get('key_2') is None
+        assert extraction_cache.get('key_9') is not None
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_get_extraction_key():
+    try:
+        with open(path_to_data_set, 'w') as data_set:
+            data_set.write('content')
+        key = get_extraction_key('TYPE_C', path_to_data_set, '1')
+        assert key is not None
+        assert key == get_extraction_key('TYPE_C', path_to_data_set, '1')
+        assert key != get_extraction_key('TYPE_C', path_to_data_set, '2')
+        assert key != get_extraction_key('TYPE_B', path_to_data_set, '1')
+
+        with open(path_to_data_set, 'w') as data_set:
+            data_set.write('changed content')
+        assert key != get_extraction_key('TYPE_C', path_to_data_set, '1')
+    finally:
+        os.remove(path_to_data_set)
+    assert get_extraction_key('TYPE_C', path_to_data_set, '1') is None
+
+
+class CountingMetaInfoExtractor(DataSetMetaInfoExtractor):
+
+    def __init__(self):
+        self.num_extractions = 0
+
+    @classmethod
+    def name(cls) -> str:
+        return 'counted_data_type'
+
+    def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+        self.num_extractions += 1
+        return DataSetMetaInfo('', None, None, 'counted_data_type', path)
+
+
+class CountingDirectoryMetaInfoExtractor(DataSetMetaInfoExtractor):
+
+    def __init__(self):
+        self.num_extractions = 0
+
+    @classmethod
+    def name(cls) -> str:
+        return 'counted_directory_data_type'
+
+    def get_files_to_extract_from(self, path: str) -> List[str]:
+        return [os.path.join(path, 'MTD_MSIL1C.xml')]
+
+    def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+        self.num_extractions += 1
+        return DataSetMetaInfo('', None, None, 'counted_directory_data_type', path)
+
+
+def test_get_data_set_meta_info_uses_extraction_cache():
+    extractor = CountingMetaInfoExtractor()
+    add_data_set_meta_info_extractor(extractor)
+    try:
+        open(path_to_data_set, 'w').close()
+
+        assert path_to_data_set == get_data_set_meta_info('counted_data_type', path_to_data_set).identifier
+        assert path_to_data_set == get_data_set_meta_info('counted_data_type', path_to_data_set).identifier
+        data_set_meta_infos = get_data_set_meta_infos([('counted_data_type', path_to_data_set)], max_workers=1)
+        assert path_to_data_set == data_set_meta_infos[0].identifier
+        assert 1 == extractor.num_extractions
+        assert 2 == get_extraction_cache().hits
+
+        with open(path_to_data_set, 'w') as data_set:
+            data_set.write('changed content')
+        data_set_meta_infos = get_data_set_meta_infos([('counted_data_type', path_to_data_set)], max_workers=1)
+        assert path_to_data_set == data_set_meta_infos[0].identifier
+        assert path_to_data_set == get_data_set_meta_info('counted_data_type', path_to_data_set).identifier
+        assert 2 == extractor.num_extractions
+    finally:
+        if os.path.exists(path_to_data_set):
+            os.remove(path_to_data_set)
+
+
+def test_get_data_set_meta_info_of_directory_is_extracted_again_when_metadata_file_changes(tmpdir):
+    extractor = CountingDirectoryMetaInfoExtractor()
+    add_data_set_meta_info_extractor(extractor)
+    path_to_directory = str(tmpdir.mkdir('S2A_MSIL1C_20170311.SAFE'))
+    metadata_file = tmpdir.join('S2A_MSIL1C_20170311.SAFE', 'MTD_MSIL1C.xml')
+    metadata_file.write('<metadata/>')
+
+    assert path_to_directory == get_data_set_meta_info('counted_directory_data_type', path_to_directory).identifier
+    assert path_to_directory == get_data_set_meta_info('counted_directory_data_type', path_to_directory).identifier
+    assert 1 == extractor.num_extractions
+
+    # writing to a file within the directory changes neither the size nor the modification time of the directory
+    directory_stat = os.stat(path_to_directory)
+    metadata_file.write('<metadata><changed/></metadata>')
+    os.utime(path_to_directory, ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns))
+    assert path_to_directory == get_data_set_meta_info('counted_directory_data_type', path_to_directory).identifier
+    assert 2 == extractor.num_extractions
@@ -0,0 +1,41 @@
+import pytest
+import subprocess
+import sys
+
+__author__ = "Tonio Fincke (Brockmann Consult GmbH)"
+
+HEAVY_MODULES = ['gdal', 'osr', 'xarray', 'lxml', 'bs4', 'html5lib', 'requests', 'shapely']
+
+
+def _get_loaded_modules(statement: str, modules: list) -> list:
+    script = '{}\nimport sys\nprint(",".join(m for m in {!r} if m in sys.modules))'.format(statement, modules)
+    output = subprocess.check_output([sys.executable, '-c', script]).decode().strip()
+    return [module for module in output.split(',') if module != '']
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='modules are imported lazily from Python 3.7 on')
+def test_import_package_does_not_load_heavy_modules():
+    assert [] == _get_loaded_modules('import multiply_data_access', HEAVY_MODULES)
+
+
+def test_import_extraction_does_not_load_extraction_dependencies():
+    loaded_modules = _get_loaded_modules('import multiply_data_access.data_set_meta_info_extraction',
+                                         ['xarray', 'lxml', 'bs4', 'requests'])
+    assert [] == loaded_modules
+
+
+def test_import_remote_data_access_does_not_load_remote_dependencies():
+    loaded_modules = _get_loaded_modules('import multiply_data_access.general_remote_access\n'
+                                         'import multiply_data_access.mundi_data_access\n'
+                                         'import multiply_data_access.scihub_data_access',
+                                         ['lxml', 'bs4', 'html5lib', 'requests'])
+    assert [] == loaded_modules
+
+
+def test_package_members_are_accessible():
+    import multiply_data_access
+
+    assert 'DataAccessComponent' in dir(multiply_data_access)
+    assert multiply_data_access.DataStore.__name__ == 'DataStore'
+    assert multiply_data_access.local_file_system.LocalFileSystemAccessor.name() == 'LocalFileSystem'
+
@@ -1,4 +1,7 @@
 from multiply_data_access import DataSetMetaInfo, JsonMetaInfoProvider
+from multiply_data_access.json_meta_info_provider import _CoverageIndex, _TimeIndex
+from datetime import datetime, timedelta
+from shapely.wkt import loads
 import os
 import shutil
 
@@ -163,6 +166,203 @@ def test_remove():
         os.remove(path_to_json_file_2)
 
 
+def test_query_after_update_and_remove():
+    # copy this so we don't mess up the original file
+    path_to_json_file_2 = path_to_json_file + '_5'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        provider = JsonMetaInfoProvider(path_to_json_file_2, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        query_string = "POLYGON((50 50, 60 50, 60 60, 50 60, 50 50));2017-03-01;2017-03-31;TYPE_D"
+        assert 0 == len(provider.query(query_string))
+        data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((55 55, 65 55, 65 65, 55 65, 55 55))",
+                                             start_time="2017-03-21 14:33:00",
+                                             end_time="2017-03-21 14:45:00",
+                                             data_type="TYPE_D",
+                                             identifier="ctfgb")
+        provider.update(data_set_meta_info)
+        query_result = provider.query(query_string)
+        assert 1 == len(query_result)
+        assert "ctfgb" == query_result[0].identifier
+
+        provider.remove(query_result[0])
+        assert 0 == len(provider.query(query_string))
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_update_and_remove_are_journaled():
+    # copy this so we don't mess up the original file
+    path_to_json_file_2 = path_to_json_file + '_6'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        provider = JsonMetaInfoProvider(path_to_json_file_2, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                             start_time="2017-03-21 14:33:00",
+                                             end_time="2017-03-21 14:45:00",
+                                             data_type="TYPE_D",
+                                             identifier="ctfgb")
+        provider.update(data_set_meta_info)
+        provider.remove(provider.get_all_data()[0])
+
+        with open(path_to_json_file) as original_file, open(path_to_json_file_2) as json_file:
+            assert original_file.read() == json_file.read()
+        assert os.path.exists(path_to_json_file_2 + '.journal')
+
+        provider_2 = JsonMetaInfoProvider(path_to_json_file_2, None)
+        all_data = provider_2.get_all_data()
+        assert 4 == len(all_data)
+        ensure_second_data_set(all_data[0])
+        assert 'ctfgb' == all_data[3].identifier
+
+        provider_2._update_json_file()
+        assert not os.path.exists(path_to_json_file_2 + '.journal')
+        provider_3 = JsonMetaInfoProvider(path_to_json_file_2, None)
+        assert 4 == len(provider_3.get_all_data())
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_outdated_journal_is_discarded():
+    # copy this so we don't mess up the original file
+    path_to_json_file_2 = path_to_json_file + '_7'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        provider = JsonMetaInfoProvider(path_to_json_file_2, None)
+        provider.remove(provider.get_all_data()[0])
+        assert os.path.exists(path_to_json_file_2 + '.journal')
+
+        with open(path_to_json_file_2, 'a') as json_file:
+            json_file.write('\n')
+        provider_2 = JsonMetaInfoProvider(path_to_json_file_2, None)
+        assert 4 == len(provider_2.get_all_data())
+        assert not os.path.exists(path_to_json_file_2 + '.journal')
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_incomplete_journal_entry_is_discarded():
+    # copy this so we don't mess up the original file
+    path_to_json_file_2 = path_to_json_file + '_9'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        provider = JsonMetaInfoProvider(path_to_json_file_2, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        provider.update(DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                        start_time="2017-03-21 14:33:00", end_time="2017-03-21 14:45:00",
+                                        data_type="TYPE_D", identifier="a"))
+        with open(path_to_json_file_2 + '.journal', 'a') as journal_file:
+            journal_file.write('{"operation": "add", "data_set": {"coverage": "POLY')
+
+        provider_2 = JsonMetaInfoProvider(path_to_json_file_2, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        assert 5 == len(provider_2.get_all_data())
+        for identifier in ['b', 'c']:
+            provider_2.update(DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                              start_time="2017-03-21 14:33:00", end_time="2017-03-21 14:45:00",
+                                              data_type="TYPE_D", identifier=identifier))
+
+        provider_3 = JsonMetaInfoProvider(path_to_json_file_2, None)
+        all_data = provider_3.get_all_data()
+        assert 7 == len(all_data)
+        assert ['a', 'b', 'c'] == [data_set_meta_info.identifier for data_set_meta_info in all_data[4:]]
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_update_many_and_remove_many():
+    # copy this so we don't mess up the original file
+    path_to_json_file_2 = path_to_json_file + '_8'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        provider = JsonMetaInfoProvider(path_to_json_file_2, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                             start_time="2017-03-21 14:33:00",
+                                             end_time="2017-03-21 14:45:00",
+                                             data_type="TYPE_D",
+                                             identifier="ctfgb")
+        other_data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                                   start_time="2017-03-22 14:33:00",
+                                                   end_time="2017-03-22 14:45:00",
+                                                   data_type="TYPE_D",
+                                                   identifier="dtghc")
+        provider.update_many([data_set_meta_info, other_data_set_meta_info, data_set_meta_info])
+        assert 6 == len(provider.get_all_data())
+        with open(path_to_json_file_2 + '.journal') as journal_file:
+            assert 3 == len(journal_file.readlines())
+
+        provider.remove_many(provider.get_all_data()[:3])
+        provider_2 = JsonMetaInfoProvider(path_to_json_file_2, None)
+        all_data = provider_2.get_all_data()
+        assert 3 == len(all_data)
+        ensure_fourth_data_set(all_data[0])
+        assert 'ctfgb' == all_data[1].identifier
+        assert 'dtghc' == all_data[2].identifier
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_coverage_index():
+    coverage_index = _CoverageIndex()
+    coverage_index.insert(0, 'POLYGON((0 0, 10 0, 10 10, 0 10, 0 0))')
+    coverage_index.insert(1, 'POLYGON((35 35, 45 35, 45 45, 35 45, 35 35))')
+    coverage_index.insert(2, None)
+    coverage_index.insert(3, 'POLYGON((-5 -5, 5 -5, 0 5, -5 -5))')
+
+    assert {0, 2, 3} == coverage_index.query(loads('POLYGON((1 1, 2 1, 2 2, 1 2, 1 1))'))
+    assert {1, 2} == coverage_index.query(loads('POLYGON((20 20, 35 20, 35 35, 20 35, 20 20))'))
+    assert {2} == coverage_index.query(loads('POLYGON((-4 4, -3 4, -3 3, -4 3, -4 4))'))
+
+    coverage_index.remove(0)
+    coverage_index.remove(2)
+    assert {3} == coverage_index.query(loads('POLYGON((1 1, 2 1, 2 2, 1 2, 1 1))'))
+
+
+def test_time_index():
+    time_index = _TimeIndex()
+    time_index.insert(0, datetime(2017, 3, 1), datetime(2017, 3, 2))
+    time_index.insert(1, datetime(2017, 3, 5), datetime(2017, 3, 25))
+    time_index.insert(2, None, None)
+    time_index.insert(3, datetime(2017, 3, 10), None)
+    time_index.insert(4, datetime(2017, 3, 12), datetime(2017, 3, 12))
+
+    assert {0, 2} == time_index.query(datetime(2017, 3, 2), datetime(2017, 3, 4))
+    assert {1, 2, 3, 4} == time_index.query(datetime(2017, 3, 12), datetime(2017, 3, 12))
+    assert {1, 2, 3} == time_index.query(datetime(2017, 3, 20), None)
+    assert {0, 1, 2} == time_index.query(None, datetime(2017, 3, 9))
+
+    time_index.remove(1)
+    time_index.remove(3)
+    assert {2, 4} == time_index.query(datetime(2017, 3, 12), datetime(2017, 3, 12))
+
+
+class _CountingDict(dict):
+
+    def __init__(self):
+        super().__init__()
+        self.num_lookups = 0
+
+    def __getitem__(self, key):
+        self.num_lookups += 1
+        return super().__getitem__(key)
+
+
+def test_time_index_is_not_widened_by_long_extents():
+    time_index = _TimeIndex()
+    time_index._extents = _CountingDict()
+    for day in range(1000):
+        time_index.insert(day, datetime(2015, 1, 1) + timedelta(days=day),
+                          datetime(2015, 1, 1) + timedelta(days=day, hours=12))
+    time_index.insert(1000, datetime(2015, 1, 1), datetime(2017, 12, 31))
+    time_index.insert(1001, datetime(2016, 1, 1), None)
+
+    assert {500, 1000, 1001} == time_index.query(datetime(2016, 5, 15, 6), datetime(2016, 5, 15, 7))
+    assert time_index._extents.num_lookups < 10
+
+    time_index.remove(1000)
+    time_index.remove(1001)
+    time_index._extents.num_lookups = 0
+    assert {500} == time_index.query(datetime(2016, 5, 15, 6), datetime(2016, 5, 15, 7))
+    assert time_index._extents.num_lookups < 10
+
+
 def test_provides_data_type():
     # copy this so we don't mess up the original file
     path_to_json_file_2 = path_to_json_file + '_4'
@@ -1,8 +1,12 @@
 from multiply_core.observations import data_validation
 from multiply_data_access import DataSetMetaInfo, LocalFileSystem, add_data_set_meta_info_extractor, \
     DataSetMetaInfoExtractor
+from multiply_data_access.local_file_system import LocalFileSystemAccessor
 from datetime import datetime
 from shapely.geometry import Polygon
+from unittest import mock
+import errno
+import json
 import os
 import shutil
 
@@ -90,6 +94,108 @@ def test_put():
             shutil.rmtree('./test/test_data/my_data_type/2016/')
 
 
+def test_put_move():
+    local_file_system = LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/')
+    url = open('gfhnfd.nc', 'w+').name
+    data_set_meta_info = DataSetMetaInfo('doesn\'t matter', '2016-12-15', '2016-12-16', 'my_data_type',
+                                         'doesn\'t matter')
+    try:
+        local_file_system.put(url, data_set_meta_info, put_mode='move')
+        assert not os.path.exists(url)
+        assert os.path.exists('./test/test_data/my_data_type/2016/12/15/gfhnfd.nc')
+    finally:
+        if os.path.exists(url):
+            os.remove(url)
+        if os.path.exists('./test/test_data/my_data_type/2016/'):
+            shutil.rmtree('./test/test_data/my_data_type/2016/')
+
+
+def test_put_move_across_file_systems():
+    local_file_system = LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/')
+    url = open('gfhnfd.nc', 'w+').name
+    data_set_meta_info = DataSetMetaInfo('doesn\'t matter', '2016-12-15', '2016-12-16', 'my_data_type',
+                                         'doesn\'t matter')
+    replace = os.replace
+
+    def _replace(from_path: str, to_path: str):
+        if from_path == url:
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        replace(from_path, to_path)
+
+    try:
+        with mock.patch('os.replace', side_effect=_replace):
+            local_file_system.put(url, data_set_meta_info, put_mode='move')
+        assert not os.path.exists(url)
+        assert os.path.exists('./test/test_data/my_data_type/2016/12/15/gfhnfd.nc')
+        assert [] == os.listdir(local_file_system.get_staging_dir())
+    finally:
+        if os.path.exists(url):
+            os.remove(url)
+        if os.path.exists('./test/test_data/my_data_type/2016/'):
+            shutil.rmtree('./test/test_data/my_data_type/2016/')
+        if os.path.exists(local_file_system.get_staging_dir()):
+            shutil.rmtree(local_file_system.get_staging_dir())
+
+
+def test_put_link():
+    url = open('gfhnfd.nc', 'w+').name
+    data_set_meta_info = DataSetMetaInfo('doesn\'t matter', '2016-12-15', '2016-12-16', 'my_data_type',
+                                         'doesn\'t matter')
+    target = './test/test_data/my_data_type/2016/12/15/gfhnfd.nc'
+    try:
+        local_file_system = LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/', put_mode='hardlink')
+        local_file_system.put(url, data_set_meta_info)
+        assert os.path.samefile(url, target)
+
+        local_file_system.put(url, data_set_meta_info, put_mode='symlink')
+        assert os.path.islink(target)
+        assert os.path.samefile(url, target)
+
+        local_file_system.put(url, data_set_meta_info, put_mode='reflink')
+        assert os.path.isfile(target)
+        assert not os.path.islink(target)
+        assert not os.path.samefile(url, target)
+        assert os.path.exists(url)
+    finally:
+        os.remove(url)
+        if os.path.exists('./test/test_data/my_data_type/2016/'):
+            shutil.rmtree('./test/test_data/my_data_type/2016/')
+
+
+def test_invalid_put_mode():
+    try:
+        LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/', put_mode='teleport')
+        assert False
+    except ValueError as e:
+        assert 'Invalid put mode: teleport' in str(e)
+
+
+def test_get_parameters_as_dict_with_put_mode():
+    local_file_system = LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/', put_mode='hardlink')
+
+    parameters_as_dict = local_file_system.get_parameters_as_dict()
+
+    assert 3 == len(parameters_as_dict)
+    assert 'hardlink' == parameters_as_dict['put_mode']
+
+
+def test_max_extraction_workers():
+    local_file_system = LocalFileSystem('./test/test_data/scanned_with_workers/', '/dt/yy/mm/dd/',
+                                        max_extraction_workers=2)
+    try:
+        parameters_as_dict = local_file_system.get_parameters_as_dict()
+        assert 3 == len(parameters_as_dict)
+        assert 2 == parameters_as_dict['max_extraction_workers']
+        assert 2 == LocalFileSystemAccessor.create_from_parameters(parameters_as_dict).max_extraction_workers
+
+        with mock.patch('multiply_data_access.local_file_system.get_data_set_meta_infos', return_value=[]) \
+                as get_data_set_meta_infos:
+            local_file_system.scan()
+            assert 2 == get_data_set_meta_infos.call_args[0][1]
+    finally:
+        shutil.rmtree('./test/test_data/scanned_with_workers/')
+
+
 def test_remove_one_file_in_folder():
     local_file_system = LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/')
     if not os.path.exists('./test/test_data/my_data_type/2015/12/15/'):
@@ -167,6 +273,126 @@ def test_scan():
     assert retrieved_data_set_meta_infos[1].identifier.endswith('other_small_product.nc')
 
 
+def test_scan_extracts_only_new_or_changed_files():
+
+    class MyValidator(data_validation.DataValidator):
+
+        @classmethod
+        def name(cls) -> str:
+            return 'my_scanned_data_type'
+
+        def is_valid(self, path: str) -> bool:
+            return path.endswith('.scanned')
+
+        def get_relative_path(self, path: str) -> str:
+            return ''
+
+        def get_file_pattern(self) -> str:
+            return '*.scanned'
+
+        def is_valid_for(self, path: str, roi: Polygon, start_time: datetime, end_time: datetime) -> bool:
+            return self.is_valid(path)
+
+        def differs_by_name(cls):
+            return False
+
+    data_validation.add_validator(MyValidator())
+    extracted_paths = []
+
+    class MyDataSetMetaInfoExtractor(DataSetMetaInfoExtractor):
+
+        @classmethod
+        def name(cls) -> str:
+            return 'my_scanned_data_type'
+
+        def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+            extracted_paths.append(path)
+            return DataSetMetaInfo('', None, None, 'my_scanned_data_type', path)
+
+    add_data_set_meta_info_extractor(MyDataSetMetaInfoExtractor())
+    path = './test/test_data/scanned/'
+    os.makedirs('{}my_scanned_data_type/2017/08/21/'.format(path))
+    try:
+        open('{}my_scanned_data_type/2017/08/21/first.scanned'.format(path), 'w+').close()
+        local_file_system = LocalFileSystem(path, '/dt/yy/mm/dd/')
+
+        assert 1 == len(local_file_system.scan())
+        assert 1 == len(extracted_paths)
+
+        # a second file system reads the manifest written by the first one
+        retrieved_data_set_meta_infos = LocalFileSystem(path, '/dt/yy/mm/dd/').scan()
+        assert 1 == len(retrieved_data_set_meta_infos)
+        assert retrieved_data_set_meta_infos[0].identifier.endswith('first.scanned')
+        assert 1 == len(extracted_paths)
+
+        with open('{}my_scanned_data_type/2017/08/21/first.scanned'.format(path), 'w') as changed_file:
+            changed_file.write('changed')
+        open('{}my_scanned_data_type/2017/08/21/second.scanned'.format(path), 'w+').close()
+        assert 2 == len(local_file_system.scan())
+        assert 3 == len(extracted_paths)
+
+        os.remove('{}my_scanned_data_type/2017/08/21/first.scanned'.format(path))
+        retrieved_data_set_meta_infos = local_file_system.scan()
+        assert 1 == len(retrieved_data_set_meta_infos)
+        assert retrieved_data_set_meta_infos[0].identifier.endswith('second.scanned')
+        assert 3 == len(extracted_paths)
+    finally:
+        shutil.rmtree(path)
+
+
+def test_scan_skips_files_inside_of_data_set_directories():
+
+    class MyValidator(data_validation.DataValidator):
+
+        @classmethod
+        def name(cls) -> str:
+            return 'my_product_data_type'
+
+        def is_valid(self, path: str) -> bool:
+            return path.endswith('.product')
+
+        def get_relative_path(self, path: str) -> str:
+            return ''
+
+        def get_file_pattern(self) -> str:
+            return '*.product'
+
+        def is_valid_for(self, path: str, roi: Polygon, start_time: datetime, end_time: datetime) -> bool:
+            return self.is_valid(path)
+
+        def differs_by_name(cls):
+            return False
+
+    data_validation.add_validator(MyValidator())
+
+    class MyDataSetMetaInfoExtractor(DataSetMetaInfoExtractor):
+
+        @classmethod
+        def name(cls) -> str:
+            return 'my_product_data_type'
+
+        def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+            return DataSetMetaInfo('', None, None, 'my_product_data_type', path)
+
+    add_data_set_meta_info_extractor(MyDataSetMetaInfoExtractor())
+    path = './test/test_data/scanned_products/'
+    product_dir = '{}my_product_data_type/2017/08/21/first.product/'.format(path)
+    os.makedirs(product_dir + 'granule')
+    try:
+        open(product_dir + 'granule/nested.product', 'w+').close()
+        open(product_dir + 'metadata.xml', 'w+').close()
+
+        retrieved_data_set_meta_infos = LocalFileSystem(path, '/dt/yy/mm/dd/').scan()
+        assert 1 == len(retrieved_data_set_meta_infos)
+        assert retrieved_data_set_meta_infos[0].identifier.endswith('first.product')
+        with open(path + '.scan_manifest.json') as manifest_file:
+            scanned_files = json.load(manifest_file)['files'].keys()
+        assert 0 == len([scanned_file for scanned_file in scanned_files if scanned_file.startswith(product_dir)])
+        assert 1 == len(LocalFileSystem(path, '/dt/yy/mm/dd/').scan())
+    finally:
+        shutil.rmtree(path)
+
+
 def test_get_parameters_as_dict():
     local_file_system = LocalFileSystem('./test/test_data/', '/dt/yy/mm/dd/')
 
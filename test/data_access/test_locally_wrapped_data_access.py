@@ -2,6 +2,7 @@ from multiply_core.observations import add_validator, DataValidator
 from multiply_core.util import get_mime_type, FileRef, get_time_from_string
 from multiply_data_access import DataSetMetaInfo
 from multiply_data_access.locally_wrapped_data_access import LocallyWrappedFileSystem, LocallyWrappedMetaInfoProvider
+from multiply_data_access.query_cache import get_query_cache
 from datetime import datetime
 from shapely.geometry import Polygon
 from shapely.wkt import loads
@@ -9,6 +10,8 @@ from typing import List, Sequence
 
 import os
 import shutil
+import threading
+import time
 
 __author__ = "Tonio Fincke (Brockmann Consult GmbH)"
 
@@ -197,6 +200,94 @@ def test_query_non_local():
         os.remove(path_to_json_file_2)
 
 
+
+class CountingWrappedMetaInfoProvider(TestWrappedMetaInfoProvider):
+
+    def _init_wrapped_meta_info_provider(self, parameters: dict) -> None:
+        super()._init_wrapped_meta_info_provider(parameters)
+        self.num_wrapped_queries = 0
+
+    def _query_wrapped_meta_info_provider(self, query_string: str, local_data_set_meta_infos: List[DataSetMetaInfo]) \
+            -> List[DataSetMetaInfo]:
+        self.num_wrapped_queries += 1
+        return super()._query_wrapped_meta_info_provider(query_string, local_data_set_meta_infos)
+
+
+def test_query_non_local_uses_query_cache():
+    path_to_json_file_2 = path_to_json_file + '_2'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        parameters = {'some_parameter': 'something', 'path_to_json_file': path_to_json_file_2}
+        wrapped_meta_info_provider = CountingWrappedMetaInfoProvider(parameters)
+        query_string = "POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2017-03-10;2017-03-11;TYPE_C"
+
+        assert 1 == len(wrapped_meta_info_provider.query_non_local(query_string))
+        assert 1 == wrapped_meta_info_provider.num_wrapped_queries
+        # an equivalent query is answered from the cache, also by another provider instance
+        other_query_string = "POLYGON ((5 5, 35 5, 35 35, 5 35, 5 5));2017-03-10;2017-03-11;TYPE_C"
+        other_wrapped_meta_info_provider = CountingWrappedMetaInfoProvider(parameters)
+        data_set_meta_infos = other_wrapped_meta_info_provider.query_non_local(other_query_string)
+        assert 1 == len(data_set_meta_infos)
+        assert 'dterftge' == data_set_meta_infos[0].identifier
+        assert 0 == other_wrapped_meta_info_provider.num_wrapped_queries
+        assert 1 == get_query_cache().hits
+
+        # data sets that have become locally available are not part of the non-local result
+        wrapped_meta_info_provider.notify_got(data_set_meta_infos[0])
+        assert 0 == len(wrapped_meta_info_provider.query_non_local(query_string))
+        assert 2 == len(wrapped_meta_info_provider.query(query_string))
+        assert 1 == wrapped_meta_info_provider.num_wrapped_queries
+
+        wrapped_meta_info_provider.invalidate_query_cache()
+        wrapped_meta_info_provider.query_non_local(query_string)
+        assert 2 == wrapped_meta_info_provider.num_wrapped_queries
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_query_non_local_answers_contained_query_from_query_cache():
+    path_to_json_file_2 = path_to_json_file + '_2'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        parameters = {'some_parameter': 'something', 'path_to_json_file': path_to_json_file_2}
+        wrapped_meta_info_provider = CountingWrappedMetaInfoProvider(parameters)
+        query_string = "POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2017-03-01;2017-03-31;TYPE_C"
+        assert 1 == len(wrapped_meta_info_provider.query_non_local(query_string))
+
+        contained_query_string = "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-03-11;2017-03-12;TYPE_C"
+        data_set_meta_infos = wrapped_meta_info_provider.query_non_local(contained_query_string)
+        assert 1 == len(data_set_meta_infos)
+        assert 'dterftge' == data_set_meta_infos[0].identifier
+        other_region_query_string = "POLYGON((26 26, 30 26, 30 30, 26 30, 26 26));2017-03-11;2017-03-12;TYPE_C"
+        assert 0 == len(wrapped_meta_info_provider.query_non_local(other_region_query_string))
+        other_time_query_string = "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-03-12;2017-03-13;TYPE_C"
+        assert 0 == len(wrapped_meta_info_provider.query_non_local(other_time_query_string))
+        assert 1 == wrapped_meta_info_provider.num_wrapped_queries
+
+        not_contained_query_string = "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-02-11;2017-03-12;TYPE_C"
+        wrapped_meta_info_provider.query_non_local(not_contained_query_string)
+        assert 2 == wrapped_meta_info_provider.num_wrapped_queries
+    finally:
+        os.remove(path_to_json_file_2)
+
+
+def test_query_cache_ttl():
+    path_to_json_file_2 = path_to_json_file + '_2'
+    shutil.copyfile(path_to_json_file, path_to_json_file_2)
+    try:
+        parameters = {'some_parameter': 'something', 'path_to_json_file': path_to_json_file_2, 'query_cache_ttl': 0}
+        wrapped_meta_info_provider = CountingWrappedMetaInfoProvider(parameters)
+        assert 0 == wrapped_meta_info_provider.get_query_cache_ttl()
+        assert 0 == wrapped_meta_info_provider.get_as_dict()['parameters']['query_cache_ttl']
+        query_string = "POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2017-03-10;2017-03-11;TYPE_C"
+
+        wrapped_meta_info_provider.query_non_local(query_string)
+        wrapped_meta_info_provider.query_non_local(query_string)
+        assert 2 == wrapped_meta_info_provider.num_wrapped_queries
+    finally:
+        os.remove(path_to_json_file_2)
+
+
 class TestWrappedFileSystem(LocallyWrappedFileSystem):
 
     @classmethod
@@ -301,3 +392,43 @@ def test_wrapped_file_system_get():
     finally:
         if os.path.exists('./test/test_data/TYPE_X'):
             shutil.rmtree('./test/test_data/TYPE_X')
+
+
+class SlowWrappedFileSystem(TestWrappedFileSystem):
+
+    def _init_wrapped_file_system(self, parameters: dict) -> None:
+        super()._init_wrapped_file_system(parameters)
+        self.num_gets_from_wrapped = 0
+
+    def _get_from_wrapped(self, data_set_meta_info: DataSetMetaInfo) -> Sequence[FileRef]:
+        self.num_gets_from_wrapped += 1
+        time.sleep(0.2)
+        return super()._get_from_wrapped(data_set_meta_info)
+
+
+def test_wrapped_file_system_get_concurrently():
+    try:
+        parameters = {'some_parameter': 'something', 'path': './test/test_data/', 'pattern': '/dt/yy/',
+                      'temp_dir': './test/test_data/a_temp_dir'}
+        wrapped_file_system = SlowWrappedFileSystem(parameters)
+        add_validator(TypeXValidator())
+        data_set_meta_info = DataSetMetaInfo('some_polygon', '2017-01-31', '2017-02-01', 'TYPE_X', 'some_wrapped_file')
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(wrapped_file_system.get(data_set_meta_info)))
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert 1 == wrapped_file_system.num_gets_from_wrapped
+        assert 3 == len(results)
+        for file_refs in results:
+            assert 1 == len(file_refs)
+            assert './test/test_data/TYPE_X/2017/some_wrapped_file' == file_refs[0].url
+    finally:
+        if os.path.exists('./test/test_data/TYPE_X'):
+            shutil.rmtree('./test/test_data/TYPE_X')
+        if os.path.exists('./test/test_data/a_temp_dir'):
+            shutil.rmtree('./test/test_data/a_temp_dir')
@@ -0,0 +1,140 @@
+from multiply_data_access import DataSetMetaInfo, Query
+from multiply_data_access.query_cache import QueryCache
+import os
+import time
+
+__author__ = "Tonio Fincke (Brockmann Consult GmbH)"
+
+path_to_cache_file = './test/test_data/test_query_cache.sqlite'
+query = Query("POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2017-03-01;2017-03-31;TYPE_B,TYPE_C")
+
+
+def _create_data_set_meta_info(identifier: str) -> DataSetMetaInfo:
+    return DataSetMetaInfo(coverage="POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))",
+                           start_time="2017-03-11 14:33:00", end_time="2017-03-11 14:45:00", data_type="TYPE_C",
+                           identifier=identifier, referenced_data='ref_{}'.format(identifier))
+
+
+def _remove(path: str):
+    for file in [path, path + '-wal', path + '-shm']:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def test_put_and_get():
+    try:
+        query_cache = QueryCache(path_to_cache_file)
+        local_data_set_meta_info = _create_data_set_meta_info('local')
+        query_cache.put('key', 'provider', query, [_create_data_set_meta_info('dterftge')],
+                        [local_data_set_meta_info])
+
+        # use a second cache to ensure the result is persisted
+        cached = QueryCache(path_to_cache_file).get('key', 60.)
+        assert cached is not None
+        data_set_meta_infos, local_data_set_meta_infos = cached
+        assert 1 == len(data_set_meta_infos)
+        assert "POLYGON((15 15, 25 15, 25 25, 15 25, 15 15))" == data_set_meta_infos[0].coverage
+        assert "2017-03-11 14:33:00" == data_set_meta_infos[0].start_time
+        assert "2017-03-11 14:45:00" == data_set_meta_infos[0].end_time
+        assert "TYPE_C" == data_set_meta_infos[0].data_type
+        assert "dterftge" == data_set_meta_infos[0].identifier
+        assert "ref_dterftge" == data_set_meta_infos[0].referenced_data
+        assert 1 == len(local_data_set_meta_infos)
+        assert 'local' == local_data_set_meta_infos[0].identifier
+
+        assert query_cache.get('other_key', 60.) is None
+        assert 0 == query_cache.hits
+        assert 1 == query_cache.misses
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_get_expired():
+    try:
+        query_cache = QueryCache(path_to_cache_file)
+        query_cache.put('key', 'provider', query, [_create_data_set_meta_info('dterftge')], [])
+        time.sleep(0.05)
+
+        assert query_cache.get('key', 0.01) is None
+        # expired entries are removed
+        assert query_cache.get('key', 60.) is None
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_evict_least_recently_used():
+    try:
+        query_cache = QueryCache(path_to_cache_file, max_size=1000)
+        query_cache.put('key_1', 'provider', query, [_create_data_set_meta_info('first')], [])
+        time.sleep(0.01)
+        query_cache.put('key_2', 'provider', query, [_create_data_set_meta_info('second')], [])
+        for i in range(3, 10):
+            time.sleep(0.01)
+            query_cache.get('key_1', 60.)
+            time.sleep(0.01)
+            query_cache.put('key_{}'.format(i), 'provider', query, [_create_data_set_meta_info('other')], [])
+
+        assert query_cache.get('key_1', 60.) is not None
+        assert query_cache.get('key_2', 60.) is None
+        assert query_cache.get('key_9', 60.) is not None
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_invalidate():
+    try:
+        query_cache = QueryCache(path_to_cache_file)
+        query_cache.put('key_1', 'provider_1', query, [_create_data_set_meta_info('first')], [])
+        query_cache.put('key_2', 'provider_2', query, [_create_data_set_meta_info('second')], [])
+
+        query_cache.invalidate('provider_1')
+        assert query_cache.get('key_1', 60.) is None
+        assert query_cache.get('key_2', 60.) is not None
+
+        query_cache.invalidate()
+        assert query_cache.get('key_2', 60.) is None
+    finally:
+        _remove(path_to_cache_file)
+
+
+def test_find():
+    try:
+        query_cache = QueryCache(path_to_cache_file)
+        local_data_set_meta_info = _create_data_set_meta_info('local')
+        data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((25 25, 30 25, 30 30, 25 30, 25 25))",
+                                             start_time="2017-03-21 14:33:00", end_time="2017-03-21 14:45:00",
+                                             data_type="TYPE_B", identifier='other')
+        query_cache.put('key', 'provider', query, [_create_data_set_meta_info('dterftge'), data_set_meta_info],
+                        [local_data_set_meta_info])
+        local_identity_keys = {local_data_set_meta_info.identity_key}
+
+        found = query_cache.find('key', 'provider', query, 60., local_identity_keys)
+        assert found is not None
+        assert 2 == len(found)
+
+        contained_query = Query("POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-03-10;2017-03-11;TYPE_C")
+        found = query_cache.find('contained_key', 'provider', contained_query, 60., local_identity_keys)
+        assert found is not None
+        assert 1 == len(found)
+        assert 'dterftge' == found[0].identifier
+
+        # data sets which were local at the time of the query must still be local
+        assert query_cache.find('contained_key', 'provider', contained_query, 60., set()) is None
+        # ... unless they are not relevant to the query
+        other_contained_query = Query("POLYGON((26 26, 29 26, 29 29, 26 29, 26 26));2017-03-20;2017-03-22;TYPE_B")
+        found = query_cache.find('other_contained_key', 'provider', other_contained_query, 60., set())
+        assert found is not None
+        assert 1 == len(found)
+        assert 'other' == found[0].identifier
+
+        assert query_cache.find('contained_key', 'other_provider', contained_query, 60., local_identity_keys) is None
+        for not_contained_query_string in ["POLYGON((10 10, 40 10, 40 20, 10 20, 10 10));2017-03-10;2017-03-11;TYPE_C",
+                                           "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-02-10;2017-03-11;TYPE_C",
+                                           "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-03-10;2017-04-11;TYPE_C",
+                                           "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));;2017-03-11;TYPE_C",
+                                           ";2017-03-10;2017-03-11;TYPE_C",
+                                           "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10));2017-03-10;2017-03-11;TYPE_A"]:
+            not_contained_query = Query(not_contained_query_string)
+            assert query_cache.find('other_key', 'provider', not_contained_query, 60., local_identity_keys) is None
+    finally:
+        _remove(path_to_cache_file)
@@ -0,0 +1,130 @@
+from importlib import import_module
+from multiply_data_access import registrations
+from multiply_data_access.local_file_system import LocalFileSystemAccessor
+from multiply_data_access.json_meta_info_provider import JsonMetaInfoProviderAccessor
+import re
+
+__author__ = "Tonio Fincke (Brockmann Consult GmbH)"
+
+
+class FakeEntryPoint(object):
+
+    def __init__(self, name: str, accessor):
+        self.name = name
+        self._accessor = accessor
+        self.num_loads = 0
+
+    def load(self):
+        self.num_loads += 1
+        return self._accessor
+
+
+class ManuallyRegisteredAccessor(object):
+
+    @classmethod
+    def name(cls):
+        return 'ManuallyRegistered'
+
+
+def test_get_accessor_loads_matching_entry_point_only():
+    group = 'test_plugins'
+    local_file_system_entry_point = FakeEntryPoint('local_file_system', LocalFileSystemAccessor)
+    json_entry_point = FakeEntryPoint('json_meta_info_provider', JsonMetaInfoProviderAccessor)
+    registrations._UNLOADED_ENTRY_POINTS[group] = {'json_meta_info_provider': json_entry_point,
+                                                   'local_file_system': local_file_system_entry_point}
+    registrations._LOADED_ACCESSORS[group] = {}
+    try:
+        assert LocalFileSystemAccessor == registrations._get_accessor(group, [], 'LocalFileSystem')
+        assert 1 == local_file_system_entry_point.num_loads
+        assert 0 == json_entry_point.num_loads
+
+        assert LocalFileSystemAccessor == registrations._get_accessor(group, [], 'LocalFileSystem')
+        assert 1 == local_file_system_entry_point.num_loads
+    finally:
+        del registrations._UNLOADED_ENTRY_POINTS[group]
+        del registrations._LOADED_ACCESSORS[group]
+
+
+def test_get_accessor_falls_back_to_other_entry_points():
+    group = 'test_plugins'
+    json_entry_point = FakeEntryPoint('my_provider', JsonMetaInfoProviderAccessor)
+    registrations._UNLOADED_ENTRY_POINTS[group] = {'my_provider': json_entry_point}
+    registrations._LOADED_ACCESSORS[group] = {}
+    try:
+        assert JsonMetaInfoProviderAccessor == registrations._get_accessor(group, [], 'JsonMetaInfoProvider')
+        assert registrations._get_accessor(group, [], 'UnknownMetaInfoProvider') is None
+        assert ManuallyRegisteredAccessor == \
+            registrations._get_accessor(group, [ManuallyRegisteredAccessor], 'ManuallyRegistered')
+    finally:
+        del registrations._UNLOADED_ENTRY_POINTS[group]
+        del registrations._LOADED_ACCESSORS[group]
+
+
+class BrokenEntryPoint(FakeEntryPoint):
+
+    def load(self):
+        self.num_loads += 1
+        if self.num_loads == 1:
+            raise ImportError('Plugin is broken')
+        return self._accessor
+
+
+def test_get_accessor_keeps_entry_points_that_could_not_be_loaded():
+    group = 'test_plugins'
+    broken_entry_point = BrokenEntryPoint('local_file_system', LocalFileSystemAccessor)
+    registrations._UNLOADED_ENTRY_POINTS[group] = {'local_file_system': broken_entry_point}
+    registrations._LOADED_ACCESSORS[group] = {}
+    try:
+        assert registrations._get_accessor(group, [], 'LocalFileSystem') is None
+        assert 'local_file_system' in registrations._UNLOADED_ENTRY_POINTS[group]
+
+        assert LocalFileSystemAccessor == registrations._get_accessor(group, [], 'LocalFileSystem')
+        assert 2 == broken_entry_point.num_loads
+        assert 'local_file_system' not in registrations._UNLOADED_ENTRY_POINTS[group]
+    finally:
+        del registrations._UNLOADED_ENTRY_POINTS[group]
+        del registrations._LOADED_ACCESSORS[group]
+
+
+class WrappingAccessor(object):
+
+    @classmethod
+    def name(cls):
+        return 'WrappingMetaInfoProvider'
+
+
+class WrappedAccessor(object):
+
+    @classmethod
+    def name(cls):
+        return 'WrappedDiasMetaInfoProvider'
+
+
+def test_get_accessor_with_entry_point_names_differing_from_accessor_names():
+    group = 'test_plugins'
+    wrapping_entry_point = FakeEntryPoint('locally_wrapping_meta_info_provider', WrappingAccessor)
+    wrapped_entry_point = FakeEntryPoint('wrapping_meta_info_provider', WrappedAccessor)
+    registrations._UNLOADED_ENTRY_POINTS[group] = {'locally_wrapping_meta_info_provider': wrapping_entry_point,
+                                                   'wrapping_meta_info_provider': wrapped_entry_point}
+    registrations._LOADED_ACCESSORS[group] = {}
+    try:
+        # the entry point matching the name yields another accessor, so all entry points need to be loaded
+        assert WrappingAccessor == registrations._get_accessor(group, [], 'WrappingMetaInfoProvider')
+        assert 1 == wrapped_entry_point.num_loads
+        assert 1 == wrapping_entry_point.num_loads
+
+        assert WrappedAccessor == registrations._get_accessor(group, [], 'WrappedDiasMetaInfoProvider')
+        assert 1 == wrapped_entry_point.num_loads
+    finally:
+        del registrations._UNLOADED_ENTRY_POINTS[group]
+        del registrations._LOADED_ACCESSORS[group]
+
+
+def test_entry_points_are_named_after_accessors():
+    with open('./setup.py') as setup_file:
+        setup = setup_file.read().replace("'\n              '", '')
+    entry_points = re.findall(r"'(\w+) = multiply_data_access:(\w+)\.(\w+)'", setup)
+    assert 17 == len(entry_points)
+    for entry_point_name, module_name, accessor_name in entry_points:
+        accessor = getattr(import_module('multiply_data_access.{}'.format(module_name)), accessor_name)
+        assert registrations._normalize(entry_point_name) == registrations._normalize(accessor.name())
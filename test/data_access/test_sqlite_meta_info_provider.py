@@ -0,0 +1,125 @@
+from multiply_data_access import DataSetMetaInfo, JsonMetaInfoProvider, SqliteMetaInfoProvider
+from multiply_data_access.sqlite_meta_info_provider import SqliteMetaInfoProviderAccessor
+import os
+
+__author__ = "Tonio Fincke (Brockmann Consult GmbH)"
+
+path_to_json_file = './test/test_data/test_meta_info.json'
+path_to_sqlite_file = './test/test_data/test_meta_info.sqlite'
+
+
+def _create_provider(path: str, supported_data_types: str = 'TYPE_A,TYPE_B,TYPE_C') -> SqliteMetaInfoProvider:
+    provider = SqliteMetaInfoProvider(path, supported_data_types)
+    provider.update_many(JsonMetaInfoProvider(path_to_json_file, None).get_all_data())
+    return provider
+
+
+def _remove(path: str):
+    for file in [path, path + '-wal', path + '-shm']:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def test_get_name():
+    assert 'SqliteMetaInfoProvider' == SqliteMetaInfoProvider.name()
+    assert 'SqliteMetaInfoProvider' == SqliteMetaInfoProviderAccessor.name()
+
+
+def test_sqlite_meta_info_provider_query_for_region():
+    try:
+        provider = _create_provider(path_to_sqlite_file)
+        query_string = "POLYGON((5 5, 20 5, 20 20, 5 20, 5 5));2017-03-01;2017-03-31;TYPE_A, TYPE_B, TYPE_C"
+        meta_data_infos = provider.query(query_string)
+        assert 2 == len(meta_data_infos)
+        assert 'dvgbvjn' == meta_data_infos[0].identifier
+        assert 'nkhmjzh' == meta_data_infos[1].identifier
+
+        query_string = "POLYGON((5 20, 35 20, 35 40, 5 40, 5 20));2017-03-01;2017-03-31;TYPE_A, TYPE_B, TYPE_C"
+        meta_data_infos = provider.query(query_string)
+        assert 3 == len(meta_data_infos)
+        assert 'nkhmjzh' == meta_data_infos[0].identifier
+        assert 'rtwgtnj' == meta_data_infos[1].identifier
+        assert 'vgfbhngf' == meta_data_infos[2].identifier
+
+        query_string = "POLYGON((35 0, 45 0, 45 10, 35 10, 35 0));2017-03-01;2017-03-31;TYPE_A, TYPE_B, TYPE_C"
+        assert 0 == len(provider.query(query_string))
+    finally:
+        _remove(path_to_sqlite_file)
+
+
+def test_sqlite_meta_info_provider_query_for_times_and_data_types():
+    try:
+        provider = _create_provider(path_to_sqlite_file)
+        query_string = "POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2017-03-19;2017-03-20;TYPE_A, TYPE_B, TYPE_C"
+        meta_data_infos = provider.query(query_string)
+        assert 3 == len(meta_data_infos)
+        assert 'nkhmjzh' == meta_data_infos[0].identifier
+        assert 'rtwgtnj' == meta_data_infos[1].identifier
+        assert 'vgfbhngf' == meta_data_infos[2].identifier
+
+        query_string = "POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2017-03;2017-03;TYPE_B"
+        meta_data_infos = provider.query(query_string)
+        assert 1 == len(meta_data_infos)
+        assert 'rtwgtnj' == meta_data_infos[0].identifier
+
+        query_string = "POLYGON((5 5, 35 5, 35 35, 5 35, 5 5));2016-03;2016-03;TYPE_A, TYPE_B, TYPE_C"
+        assert 0 == len(provider.query(query_string))
+    finally:
+        _remove(path_to_sqlite_file)
+
+
+def test_update_and_remove():
+    try:
+        provider = _create_provider(path_to_sqlite_file, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        data_set_meta_info = DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                             start_time="2017-03-21 14:33:00",
+                                             end_time="2017-03-21 14:45:00",
+                                             data_type="TYPE_D",
+                                             identifier="ctfgb")
+        provider.update(data_set_meta_info)
+        provider.update(data_set_meta_info)
+        assert 5 == len(provider.get_all_data())
+
+        # use a second provider to ensure the update is saved
+        provider_2 = SqliteMetaInfoProvider(path_to_sqlite_file, None)
+        assert ['TYPE_A', 'TYPE_B', 'TYPE_C', 'TYPE_D'] == provider_2.get_provided_data_types()
+        query_result = provider_2.query(";2017-03-21;2017-03-21;TYPE_D")
+        assert 1 == len(query_result)
+        assert "POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))" == query_result[0].coverage
+        assert "2017-03-21 14:33:00" == query_result[0].start_time
+        assert "2017-03-21 14:45:00" == query_result[0].end_time
+        assert "ctfgb" == query_result[0].identifier
+
+        provider_2.remove_many([query_result[0], provider_2.get_all_data()[0]])
+        all_data = provider.get_all_data()
+        assert 3 == len(all_data)
+        assert 'nkhmjzh' == all_data[0].identifier
+    finally:
+        _remove(path_to_sqlite_file)
+
+
+def test_update_many_accepts_start_time_later_than_end_time():
+    try:
+        provider = _create_provider(path_to_sqlite_file, 'TYPE_A,TYPE_B,TYPE_C,TYPE_D')
+        provider.update_many([DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                              start_time="2017-03-22 14:33:00", end_time="2017-03-21 14:45:00",
+                                              data_type="TYPE_D", identifier="reversed"),
+                              DataSetMetaInfo(coverage="POLYGON((10 10, 20 10, 20 20, 10 20, 10 10))",
+                                              start_time="2017-03-21 14:33:00", end_time="2017-03-21 14:45:00",
+                                              data_type="TYPE_D", identifier="ctfgb")])
+        assert 6 == len(provider.get_all_data())
+        assert ['ctfgb'] == [data_set_meta_info.identifier for data_set_meta_info in
+                             provider.query(";2017-03-21 14:40:00;2017-03-21 14:50:00;TYPE_D")]
+    finally:
+        _remove(path_to_sqlite_file)
+
+
+def test_get_parameters_as_dict():
+    try:
+        provider = _create_provider(path_to_sqlite_file)
+        parameters = provider._get_parameters_as_dict()
+        assert 2 == len(parameters.keys())
+        assert path_to_sqlite_file == parameters['path_to_sqlite_file']
+        assert 'TYPE_A,TYPE_B,TYPE_C' == parameters['supported_data_types']
+    finally:
+        _remove(path_to_sqlite_file)
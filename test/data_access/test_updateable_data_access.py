@@ -1,8 +1,12 @@
 import os
 import pytest
+from datetime import datetime
+from shapely.geometry import Polygon
 from shapely.wkt import loads
 import shutil
 
+from multiply_core.observations import data_validation
+from multiply_data_access import DataSetMetaInfo, DataSetMetaInfoExtractor, add_data_set_meta_info_extractor
 from multiply_data_access.data_store import DataStore
 from multiply_data_access.local_file_system import LocalFileSystem
 from multiply_data_access.json_meta_info_provider import JsonMetaInfoProvider
@@ -93,3 +97,65 @@ def test_update():
         assert covered_geometry_bounds[3] == pytest.approx(37.92559054724302)
     finally:
         os.remove(path_to_incorrect_json_file)
+
+
+class PutManyValidator(data_validation.DataValidator):
+
+    @classmethod
+    def name(cls) -> str:
+        return 'my_put_many_data_type'
+
+    def is_valid(self, path: str) -> bool:
+        return path.endswith('.putmany')
+
+    def get_relative_path(self, path: str) -> str:
+        return ''
+
+    def get_file_pattern(self) -> str:
+        return '*.putmany'
+
+    def is_valid_for(self, path: str, roi: Polygon, start_time: datetime, end_time: datetime) -> bool:
+        return self.is_valid(path)
+
+    def differs_by_name(self):
+        return False
+
+
+class PutManyMetaInfoExtractor(DataSetMetaInfoExtractor):
+
+    @classmethod
+    def name(cls) -> str:
+        return 'my_put_many_data_type'
+
+    def extract_meta_info(self, path: str) -> DataSetMetaInfo:
+        # data sets without start time cannot be put into a file system which orders data sets by time
+        start_times = {'first.putmany': '2017-08-21', 'second.putmany': '2017-08-22'}
+        start_time = start_times.get(path.split('/')[-1])
+        return DataSetMetaInfo('', start_time, start_time, 'my_put_many_data_type', path)
+
+
+def test_put_many():
+    data_validation.add_validator(PutManyValidator())
+    add_data_set_meta_info_extractor(PutManyMetaInfoExtractor())
+    from_path = './test/test_data/put_many_from/'
+    store_path = './test/test_data/put_many_store/'
+    os.makedirs(from_path)
+    try:
+        from_urls = []
+        for file_name in ['first.putmany', 'without_time.putmany', 'second.putmany', 'unknown.type']:
+            open(from_path + file_name, 'w+').close()
+            from_urls.append(from_path + file_name)
+        local_file_system = LocalFileSystem(store_path, '/dt/yy/mm/dd/')
+        meta_info_provider = JsonMetaInfoProvider(store_path + 'store.json', 'my_put_many_data_type')
+        writable_data_store = DataStore(local_file_system, meta_info_provider, 'put_many_test')
+
+        put_data_set_meta_infos = writable_data_store.put_many(from_urls, max_extraction_workers=1)
+
+        assert 2 == len(put_data_set_meta_infos)
+        registered_data_set_meta_infos = meta_info_provider.get_all_data()
+        assert 2 == len(registered_data_set_meta_infos)
+        assert os.path.exists(store_path + 'my_put_many_data_type/2017/08/21/first.putmany')
+        assert os.path.exists(store_path + 'my_put_many_data_type/2017/08/22/second.putmany')
+    finally:
+        shutil.rmtree(from_path)
+        shutil.rmtree(store_path)